@@ -1,2 +1,27 @@
-from .capture import *
-from .image_processor import *
+try:
+    from .capture import *
+    from .furniture_importer import *
+except ImportError:
+    # 라이노 밖(헤드리스 환경)에서는 라이노 전용 기능 없이 로드
+    pass
+from .worker import *
+
+# 라이노 안에서 워커 클라이언트만 쓰는 경우 외부 패키지 없이도 로드되도록,
+# 설치되지 않은 외부 패키지 때문에 실패한 하위 패키지만 건너뜀 (그 밖의 오류는 그대로 발생)
+_OPTIONAL_DEPENDENCIES = ("numpy", "PIL", "openai", "replicate", "requests")
+
+try:
+    from .plan_processor import *
+except ImportError as e:
+    if e.name not in _OPTIONAL_DEPENDENCIES:
+        raise
+try:
+    from .model_processor import *
+except ImportError as e:
+    if e.name not in _OPTIONAL_DEPENDENCIES:
+        raise
+try:
+    from .image_processor import *
+except ImportError as e:
+    if e.name not in _OPTIONAL_DEPENDENCIES:
+        raise
@@ -35,3 +35,50 @@ def capture_render_view(rhino_doc, width=1920, height=1080, dpi=96):
     if bmp is None:
         raise Exception("View capture failed.")
     return bmp
+
+
+def bitmap_to_bytes(bmp, format=None):
+    """System.Drawing.Bitmap → PNG bytes (임시 파일 없이 메모리에서 변환)"""
+    from System.IO import MemoryStream
+
+    ms = MemoryStream()
+    try:
+        bmp.Save(ms, format or drawing.Imaging.ImageFormat.Png)
+        return bytes(ms.ToArray())
+    finally:
+        ms.Close()
+
+
+def camera_key(rhino_doc, width=1920, height=1080, digits=3):
+    """현재 뷰 카메라(위치/타깃/렌즈)와 캡처 크기로 만든 키 — 같은 시점의 캡처끼리 비교할 때 사용"""
+    vp = rhino_doc.Views.ActiveView.ActiveViewport
+    location = vp.CameraLocation
+    target = vp.CameraTarget
+    values = (
+        location.X,
+        location.Y,
+        location.Z,
+        target.X,
+        target.Y,
+        target.Z,
+        vp.Camera35mmLensLength,
+    )
+    return f"{width}x{height}:" + ",".join(f"{v:.{digits}f}" for v in values)
+
+
+def capture_to_worker(
+    rhino_doc, client=None, width=1920, height=1080, incremental=True, **options
+):
+    """
+    현재 뷰를 캡처해 로컬 워커의 process_1로 보냄 → PendingCall
+
+    라이노 UI는 바로 돌아오고, 결과(가구 이미지 bytes 목록)는 PendingCall.result()로 받음
+    incremental=True면 카메라 키를 함께 보내서 같은 시점의 재캡처는 바뀐 가구만 다시 처리
+    """
+    from .worker import get_worker_client
+
+    client = client or get_worker_client()
+    if incremental:
+        options.setdefault("camera", camera_key(rhino_doc, width, height))
+    image = bitmap_to_bytes(capture_render_view(rhino_doc, width, height))
+    return client.call_async("process_1", options, [image])
@@ -0,0 +1,190 @@
+import os
+import json
+import math
+
+import Rhino
+import Rhino.Geometry as geo
+
+
+BLOCK_PREFIX = "digda_"
+
+
+def block_name_from_path(glb_path):
+    """GLB 파일명으로 블록(인스턴스 정의) 이름 생성"""
+    stem = os.path.splitext(os.path.basename(glb_path))[0]
+    return BLOCK_PREFIX + stem
+
+
+def load_glb_geometry(rhino_doc, glb_path):
+    """GLB 파일을 헤드리스 문서로 한 번만 읽어서 지오메트리/속성 목록 반환"""
+    headless = Rhino.RhinoDoc.CreateHeadless(None)
+    try:
+        if not headless.Import(glb_path):
+            raise Exception(f"GLB import failed: {glb_path}")
+
+        geometries = []
+        attributes = []
+        for obj in headless.Objects:
+            geometry = obj.Geometry.Duplicate()
+            attr = obj.Attributes.Duplicate()
+
+            # 재질은 대상 문서로 복사해서 연결
+            render_material = obj.RenderMaterial
+            if render_material is not None:
+                copied = render_material.MakeCopy()
+                rhino_doc.RenderMaterials.Add(copied)
+                attr.RenderMaterial = copied
+
+            geometries.append(geometry)
+            attributes.append(attr)
+        return geometries, attributes
+    finally:
+        headless.Dispose()
+
+
+def register_glb_block(rhino_doc, glb_path):
+    """GLB 하나를 블록 정의로 등록 (이미 있으면 기존 정의 재사용)"""
+    name = block_name_from_path(glb_path)
+    existing = rhino_doc.InstanceDefinitions.Find(name)
+    if existing is not None:
+        return existing.Index
+
+    geometries, attributes = load_glb_geometry(rhino_doc, glb_path)
+    if not geometries:
+        raise Exception(f"GLB has no geometry: {glb_path}")
+
+    index = rhino_doc.InstanceDefinitions.Add(
+        name, glb_path, geo.Point3d.Origin, geometries, attributes
+    )
+    if index < 0:
+        raise Exception(f"Block definition failed: {name}")
+    return index
+
+
+def register_glb_blocks(rhino_doc, glb_paths):
+    """여러 GLB를 파일당 한 번씩만 읽어서 블록 정의로 등록"""
+    definitions = {}
+    for glb_path in glb_paths:
+        if glb_path in definitions:
+            continue
+        try:
+            definitions[glb_path] = register_glb_block(rhino_doc, glb_path)
+            print(f"✅ 블록 등록: {block_name_from_path(glb_path)}")
+        except Exception as e:
+            print(f"❌ 블록 등록 실패 ({glb_path}): {e}")
+    return definitions
+
+
+def _to_transform(placement):
+    if isinstance(placement, geo.Transform):
+        return placement
+    if isinstance(placement, geo.Point3d):
+        return geo.Transform.Translation(geo.Vector3d(placement))
+    # (x, y) 또는 (x, y, z) 튜플
+    x, y = placement[0], placement[1]
+    z = placement[2] if len(placement) > 2 else 0.0
+    return geo.Transform.Translation(x, y, z)
+
+
+def import_furniture_blocks(rhino_doc, placements, undo_name="Digda furniture import"):
+    """
+    GLB 가구를 블록 인스턴스로 일괄 배치
+
+    placements: [(glb_path, Transform | Point3d | (x, y[, z])), ...]
+    모든 배치는 하나의 Undo 기록으로 묶이고, 작업 중에는 화면 갱신을 멈춤
+    """
+    views = rhino_doc.Views
+    undo_record = rhino_doc.BeginUndoRecord(undo_name)
+    views.RedrawEnabled = False
+
+    instance_ids = []
+    try:
+        glb_paths = [glb_path for glb_path, _ in placements]
+        definitions = register_glb_blocks(rhino_doc, glb_paths)
+
+        for glb_path, placement in placements:
+            index = definitions.get(glb_path)
+            if index is None:
+                continue
+            instance_id = rhino_doc.Objects.AddInstanceObject(
+                index, _to_transform(placement)
+            )
+            instance_ids.append(instance_id)
+    finally:
+        rhino_doc.EndUndoRecord(undo_record)
+        views.RedrawEnabled = True
+        views.Redraw()
+
+    print(
+        f"🎉 블록 {len(definitions)}종, 인스턴스 {len(instance_ids)}개 배치 완료"
+    )
+    return instance_ids
+
+
+def _grid_shape(count):
+    columns = max(1, int(count ** 0.5 + 0.5))
+    rows = (count + columns - 1) // columns
+    return columns, rows
+
+
+def _fit_scale(rooms, spacing):
+    """
+    이웃한 방의 가구 격자가 겹치지 않는 가장 작은 좌표 배율
+
+    rooms: [(x, y, 가구 수), ...] — 격자 반경(가구 반 칸 포함)의 합이 방 중심 거리보다 작도록
+    """
+    radii = []
+    for x, y, count in rooms:
+        columns, rows = _grid_shape(count)
+        radius = math.hypot(columns - 1, rows - 1) * spacing / 2 + spacing / 2
+        radii.append((x, y, radius))
+
+    scale = 0.0
+    for i in range(len(radii)):
+        for j in range(i + 1, len(radii)):
+            x1, y1, r1 = radii[i]
+            x2, y2, r2 = radii[j]
+            distance = math.hypot(x2 - x1, y2 - y1)
+            if distance > 0:
+                scale = max(scale, (r1 + r2) / distance)
+    return scale or 1.0
+
+
+def room_placements_from_connection(
+    connection_path, room_furniture, scale=None, spacing=1000.0
+):
+    """
+    connection.json 방 위치를 기준으로 배치 목록 생성
+
+    room_furniture: {"거실": [glb_path, ...], ...}
+    각 방의 가구는 방 중심에서 spacing 간격의 격자로 배치
+    scale: connection.json 좌표 → 라이노 좌표 배율
+           (None이면 이웃한 방의 격자가 겹치지 않도록 방 사이 거리로 계산)
+    """
+    with open(connection_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    rooms = []
+    for room in data.get("rooms", []):
+        glb_paths = room_furniture.get(room["name"]) or room_furniture.get(
+            room["id"], []
+        )
+        if glb_paths:
+            rooms.append((room, glb_paths))
+    if scale is None:
+        scale = _fit_scale(
+            [(room["x"], room["y"], len(paths)) for room, paths in rooms], spacing
+        )
+
+    placements = []
+    for room, glb_paths in rooms:
+        columns, rows = _grid_shape(len(glb_paths))
+        center_x = room["x"] * scale
+        center_y = -room["y"] * scale  # 화면 좌표(y 아래) → 라이노 좌표(y 위)
+
+        for i, glb_path in enumerate(glb_paths):
+            row, col = divmod(i, columns)
+            x = center_x + (col - (columns - 1) / 2) * spacing
+            y = center_y - (row - (rows - 1) / 2) * spacing
+            placements.append((glb_path, (x, y, 0.0)))
+    return placements
@@ -1,3 +1,22 @@
+from .generation_result import *
+from .upscale_policy import *
+from .encoding_policy import *
+from .crop_engine import *
+from .crop_archive import *
+from .change_detector import *
+from .tiled_detection import *
+from .room_profiles import *
 from .image_enhancer import *
+from .job_queue import *
+from .mesh_backends import *
+from .budget_planner import *
+from .speculative_3d import *
 from .image_to_3d import *
-from .utils import *
+from .upload_cache import *
+from .param_sweep import *
+
+try:
+    from .utils import *
+except ImportError:
+    # 라이노 밖(헤드리스 환경)에서는 .NET 변환 유틸 없이 로드
+    pass
@@ -0,0 +1,412 @@
+import os
+import math
+import time
+import threading
+
+from .job_queue import furniture_rank
+from .mesh_backends import LatencyStats
+from .room_profiles import get_room_profile, load_room_profiles, room_type_for
+
+
+# =============================================================================
+# 비용/시간 예산 계획 (기록된 실행 시간으로 단계별 비용을 추정하고 예산 안에서 작업 배분)
+# =============================================================================
+
+
+class StageEstimate:
+    def __init__(
+        self, name, price_per_call=0.0, price_per_second=0.0, default_seconds=10.0
+    ):
+        """
+        price_per_call: 호출당 가격 (USD)
+        price_per_second: 실행 시간당 가격 (USD/초, Replicate GPU 모델)
+        default_seconds: 기록이 부족할 때 사용할 실행 시간 (초)
+        """
+        self.name = name
+        self.price_per_call = price_per_call
+        self.price_per_second = price_per_second
+        self.default_seconds = default_seconds
+
+    def cost(self, seconds):
+        return self.price_per_call + self.price_per_second * seconds
+
+    def __repr__(self):
+        return f"StageEstimate({self.name!r})"
+
+
+# 단계별 기본 추정값 — 가격은 대략적인 공개 가격 기준이므로 실제 청구액에 맞게 바꿔서 사용
+STAGE_ESTIMATES = {
+    "detect": StageEstimate("detect", price_per_call=0.01, default_seconds=15.0),
+    "background": StageEstimate(
+        "background", price_per_call=0.018, default_seconds=6.0
+    ),
+    "upscale": StageEstimate("upscale", price_per_call=0.04, default_seconds=10.0),
+    "3d": StageEstimate("3d", price_per_second=0.0014, default_seconds=90.0),
+}
+
+# 방 종류별 예상 가구 수 (인식 기록이 없을 때)
+EXPECTED_OBJECTS = {
+    "living": 8,
+    "kitchen": 5,
+    "dining": 4,
+    "bedroom": 6,
+    "bathroom": 3,
+    "dressroom": 3,
+    "entrance": 2,
+    "pantry": 2,
+    "hallway": 2,
+}
+
+
+class RunHistory:
+    def __init__(self, history_dir="furniture_3d_models", backend="hunyuan3d"):
+        """
+        단계별 실행 시간 / 방 종류별 인식된 가구 수 기록
+
+        3D 실행 시간은 ImgToModeling이 기록하는 backend_latency.json을 같이 사용
+        """
+        self.backend = backend
+        self.stages = LatencyStats(os.path.join(history_dir, "stage_latency.json"))
+        self.backends = LatencyStats(os.path.join(history_dir, "backend_latency.json"))
+        self.objects = LatencyStats(os.path.join(history_dir, "room_objects.json"))
+
+    def seconds(self, stage, default):
+        """단계 한 번의 예상 실행 시간 (중앙값, 기록이 부족하면 default)"""
+        if stage == "3d":
+            value = self.backends.percentile(self.backend, 0.5, min_samples=3)
+        else:
+            value = self.stages.percentile(stage, 0.5, min_samples=3)
+        return value if value is not None else default
+
+    def expected_objects(self, room_type):
+        value = self.objects.percentile(room_type, 0.5, min_samples=3)
+        if value is not None:
+            return int(round(value))
+        return EXPECTED_OBJECTS.get(room_type, 4)
+
+    def record_stage(self, stage, seconds):
+        if stage == "3d":
+            self.backends.record(self.backend, seconds)
+        else:
+            self.stages.record(stage, seconds)
+
+    def record_objects(self, room_type, count):
+        self.objects.record(room_type, count)
+
+
+def match_room(room, names):
+    """
+    캡처의 방 이름/종류 → connection.json의 방 이름 (names)
+
+    이름이 같으면 그대로, 아니면 같은 방 종류의 첫 번째 방 ("kitchen" → "주방"),
+    맞는 방이 없으면 원래 값
+    """
+    if not names or room in names:
+        return room
+    room_type = room_type_for(room) if room is not None else None
+    if room_type is not None:
+        for name in names:
+            if room_type_for(name) == room_type:
+                return name
+    return room
+
+
+class BudgetPlan:
+    def __init__(
+        self, rooms, concurrency, upscale, budget_usd, deadline, room_names=None
+    ):
+        """
+        rooms: [{"room", "room_type", "captures", "objects", "models"}]
+               objects: 캡처 한 장의 예상 가구 수, models: 3D로 변환할 가구 수
+        upscale: 업스케일 단계 포함 여부 (False면 원격 없이 로컬 업스케일만)
+        room_names: connection.json의 방 이름 — 실행 중 캡처의 방을 이 이름에 맞춤
+        """
+        self.rooms = rooms
+        self.room_names = room_names or []
+        self.concurrency = concurrency
+        self.upscale = upscale
+        self.budget_usd = budget_usd
+        self.deadline = deadline
+        self.cost = 0.0
+        self.seconds = 0.0
+
+    def models_for(self, room):
+        for entry in self.rooms:
+            if entry["room"] == room:
+                return entry["models"]
+        return 0
+
+    def room_key(self, room):
+        """캡처의 방 → 계획의 방 키"""
+        return match_room(room, self.room_names)
+
+    @property
+    def upscale_policy(self):
+        return "balanced" if self.upscale else "fast"
+
+    def to_dict(self):
+        return {
+            "rooms": self.rooms,
+            "concurrency": self.concurrency,
+            "upscale": self.upscale,
+            "budget_usd": self.budget_usd,
+            "deadline": self.deadline,
+            "estimated_cost": round(self.cost, 3),
+            "estimated_seconds": round(self.seconds, 1),
+        }
+
+    def summary(self):
+        print("=" * 60)
+        print("💰 예산 계획")
+        budget = "제한 없음"
+        if self.budget_usd is not None:
+            budget = f"${self.budget_usd:.2f}"
+        deadline = "제한 없음"
+        if self.deadline is not None:
+            deadline = f"{self.deadline / 60:.0f}분"
+        print(f"   예산 {budget}, 마감 {deadline}")
+        print(
+            f"   예상 비용 ${self.cost:.2f}, 예상 시간 {self.seconds / 60:.1f}분, "
+            f"동시 실행 {self.concurrency}, 업스케일 {'원격' if self.upscale else '로컬'}"
+        )
+        for entry in self.rooms:
+            print(
+                f"   {entry['room'] or '(방 미지정)'} ({entry['room_type']}, "
+                f"캡처 {entry['captures']}장): "
+                f"가구 {entry['objects']}개 중 3D {entry['models']}개"
+            )
+        print("=" * 60)
+
+
+class BudgetPlanner:
+    def __init__(
+        self, history=None, estimates=None, max_concurrency=8, deadline_margin=0.3
+    ):
+        """
+        max_concurrency: 동시 실행 수 상한
+        deadline_margin: 동시 실행 수를 고를 때 예상 시간에 더하는 여유 비율
+                         (추정이 짧게 나와도 마감을 넘겨 작업을 건너뛰지 않도록)
+        """
+        self.history = history or RunHistory()
+        self.estimates = dict(STAGE_ESTIMATES, **(estimates or {}))
+        self.max_concurrency = max_concurrency
+        self.deadline_margin = deadline_margin
+
+    def stage_seconds(self, stage):
+        return self.history.seconds(stage, self.estimates[stage].default_seconds)
+
+    def stage_cost(self, stage):
+        return self.estimates[stage].cost(self.stage_seconds(stage))
+
+    def _totals(self, rooms, upscale, concurrency):
+        """배분 결과 → (비용, 예상 시간)"""
+        calls = {"detect": 0, "background": 0, "upscale": 0, "3d": 0}
+        critical = 0.0
+        for entry in rooms:
+            calls["detect"] += entry["captures"]
+            calls["background"] += entry["captures"] * entry["objects"]
+            if upscale:
+                calls["upscale"] += entry["models"]
+            calls["3d"] += entry["models"]
+            # 방 하나의 최소 경로: 인식 → 배경 제거 → (업스케일) → 3D
+            chain = self.stage_seconds("detect") + self.stage_seconds("background")
+            if entry["models"]:
+                chain += self.stage_seconds("3d")
+                if upscale:
+                    chain += self.stage_seconds("upscale")
+            critical = max(critical, chain)
+
+        cost = sum(n * self.stage_cost(stage) for stage, n in calls.items())
+        work = sum(n * self.stage_seconds(stage) for stage, n in calls.items())
+        return cost, max(critical, work / concurrency)
+
+    def _entry(self, room):
+        room_type = get_room_profile(room).room_type
+        return {
+            "room": room,
+            "room_type": room_type,
+            "captures": 1,
+            "objects": self.history.expected_objects(room_type),
+            "models": 0,
+        }
+
+    def plan(
+        self,
+        rooms,
+        budget_usd=None,
+        deadline=None,
+        upscale=True,
+        connection=None,
+        include_uncaptured=False,
+    ):
+        """
+        rooms: 방 이름 목록 (캡처마다 하나, 같은 방이 여러 번 나와도 됨) 또는 connection.json 경로/dict
+        budget_usd: 최대 비용 (USD), deadline: 최대 시간 (초) — None이면 제한 없음
+        connection: connection.json 경로/dict — 캡처의 방을 connection.json 방 이름에 맞춤
+        include_uncaptured: True면 connection.json의 방 중 캡처가 없는 방도 한 장씩 계획에 포함
+                            (실행 전 전체 아파트 계획용, 실제 실행에서는 예산을 빼앗지 않도록 False)
+
+        인식과 배경 제거는 모든 방에 포함하고, 3D는 방을 돌아가며 한 개씩 예산이 허락하는 만큼 배분
+        (각 방의 중요한 가구부터), 남는 예산이 있으면 업스케일 포함,
+        여유(deadline_margin)를 두고 마감에 맞는 가장 작은 동시 실행 수 선택 (없으면 상한)
+        """
+        if isinstance(rooms, (str, dict)):
+            rooms = list(load_room_profiles(rooms))
+        names = list(load_room_profiles(connection)) if connection is not None else []
+
+        entries = {}
+        for room in [match_room(room, names) for room in rooms]:
+            if room in entries:
+                entries[room]["captures"] += 1
+            else:
+                entries[room] = self._entry(room)
+        if include_uncaptured:
+            # connection.json의 방 중 아직 캡처가 없는 방도 한 장으로 계획
+            for name in names:
+                if name not in entries:
+                    entries[name] = self._entry(name)
+        entries = list(entries.values())
+
+        def fits(upscale_enabled):
+            cost, seconds = self._totals(entries, upscale_enabled, self.max_concurrency)
+            if budget_usd is not None and cost > budget_usd:
+                return False
+            return deadline is None or seconds <= deadline
+
+        if not fits(False):
+            print("⚠️  인식/배경 제거만으로도 예산 또는 마감을 넘습니다.")
+
+        # 3D 배분 (방을 돌아가며 한 개씩)
+        progressed = True
+        while progressed:
+            progressed = False
+            for entry in entries:
+                if entry["models"] >= entry["objects"]:
+                    continue
+                entry["models"] += 1
+                if fits(False):
+                    progressed = True
+                else:
+                    entry["models"] -= 1
+
+        upscale = upscale and fits(True)
+
+        # 여유를 더해도 마감 안에 끝나는 가장 작은 동시 실행 수 (없으면 상한)
+        concurrency = self.max_concurrency
+        if deadline is not None:
+            for c in range(1, self.max_concurrency + 1):
+                seconds = self._totals(entries, upscale, c)[1]
+                if seconds * (1 + self.deadline_margin) <= deadline:
+                    concurrency = c
+                    break
+        else:
+            concurrency = min(self.max_concurrency, 4)
+
+        plan = BudgetPlan(
+            entries, concurrency, upscale, budget_usd, deadline, room_names=names
+        )
+        plan.cost, plan.seconds = self._totals(entries, upscale, concurrency)
+        return plan
+
+
+def plan_apartment(
+    source="connection.json", budget_usd=None, deadline=None, history=None
+):
+    """connection.json의 모든 방에 대한 예산 계획 → BudgetPlan (요약 출력)"""
+    plan = BudgetPlanner(history=history).plan(
+        source, budget_usd=budget_usd, deadline=deadline
+    )
+    plan.summary()
+    return plan
+
+
+# =============================================================================
+# 실행 중 예산 집행 (넘을 것 같으면 우선순위 낮은 작업부터 줄이거나 건너뜀)
+# =============================================================================
+
+
+class BudgetTracker:
+    def __init__(self, plan, planner=None):
+        self.plan = plan
+        self.planner = planner or BudgetPlanner()
+        self.spent = 0.0
+        self.calls = {}
+        self.models_used = {}  # 방 → 지금까지 3D로 보낸 가구 수
+        self.skipped = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def remaining_money(self):
+        if self.plan.budget_usd is None:
+            return math.inf
+        return self.plan.budget_usd - self.spent
+
+    def remaining_time(self):
+        if self.plan.deadline is None:
+            return math.inf
+        return self.plan.deadline - (time.time() - self.started_at)
+
+    def allow(self, stage, furniture=None):
+        """
+        단계를 한 번 더 실행해도 되는지
+
+        비용은 엄격하게 지키고, 시간은 high 우선순위 가구만 마감을 넘겨도 허용
+        """
+        cost = self.planner.stage_cost(stage)
+        seconds = self.planner.stage_seconds(stage)
+        with self._lock:
+            allowed = cost <= self.remaining_money()
+            if allowed and seconds > self.remaining_time():
+                allowed = furniture is not None and furniture_rank(furniture)[0] == 0
+            if not allowed:
+                self.skipped[stage] = self.skipped.get(stage, 0) + 1
+                return False
+            # 실행 전에 추정 비용을 미리 잡아 두어 동시 실행이 예산을 넘지 않도록
+            self.spent += cost
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            return True
+
+    def charge(self, stage, seconds):
+        """
+        실제 실행 시간 기록 → allow에서 잡아 둔 추정 비용과의 차이만큼 정산
+
+        3D는 ImgToModeling이 실행 시간을 직접 기록하므로 호출하지 않음 (추정 비용 유지)
+        """
+        estimate = self.planner.estimates[stage]
+        actual = estimate.cost(seconds)
+        reserved = estimate.cost(self.planner.stage_seconds(stage))
+        with self._lock:
+            self.spent += actual - reserved
+        self.planner.history.record_stage(stage, seconds)
+
+    def upscale_policy(self, default="balanced"):
+        """계획이 업스케일을 빼거나 남은 예산이 모자라면 로컬 업스케일("fast")로 낮춤"""
+        if not self.plan.upscale:
+            return "fast"
+        if self.planner.stage_cost("upscale") > self.remaining_money():
+            return "fast"
+        return default
+
+    def select_models(self, room, furniture_list):
+        """
+        방에 배정된 3D 개수(같은 방의 이전 캡처에서 쓴 만큼 제외)만큼 중요한 가구부터 고름
+        → 선택된 인덱스 목록, 실행 시점의 남은 예산도 확인
+        """
+        order = sorted(
+            range(len(furniture_list)), key=lambda i: furniture_rank(furniture_list[i])
+        )
+        key = self.plan.room_key(room)
+        with self._lock:
+            limit = self.plan.models_for(key) - self.models_used.get(key, 0)
+            selected = order[: max(0, limit)]
+            self.models_used[key] = self.models_used.get(key, 0) + len(selected)
+        return sorted(i for i in selected if self.allow("3d", furniture_list[i]))
+
+    def summary(self):
+        elapsed = time.time() - self.started_at
+        print(
+            f"💰 사용 ${self.spent:.2f}"
+            + (f" / ${self.plan.budget_usd:.2f}" if self.plan.budget_usd else "")
+            + f", 경과 {elapsed / 60:.1f}분, 호출 {self.calls}"
+            + (f", 건너뜀 {self.skipped}" if self.skipped else "")
+        )
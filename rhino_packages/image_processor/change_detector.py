@@ -0,0 +1,225 @@
+import hashlib
+import threading
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from .upscale_policy import load_pil_image
+
+
+# =============================================================================
+# 캡처 변경 감지 (같은 카메라의 이전 캡처와 블록 단위로 비교)
+# =============================================================================
+
+
+class CaptureSignature:
+    def __init__(self, thumbnail, width, height, cell):
+        """
+        thumbnail: 블록마다 cell x cell 픽셀로 줄인 흑백 이미지 (uint8)
+        width/height: 원본 캡처 크기
+        """
+        self.thumbnail = thumbnail
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.digest = hashlib.sha256(thumbnail.tobytes()).hexdigest()
+
+    @property
+    def grid(self):
+        """(행 수, 열 수)"""
+        rows, cols = self.thumbnail.shape
+        return rows // self.cell, cols // self.cell
+
+
+def capture_signature(image, columns=48, cell=8):
+    """
+    캡처 → CaptureSignature
+
+    columns: 가로 블록 수 (세로는 비율에 맞춤), cell: 블록 하나를 줄인 크기 (픽셀)
+    """
+    img = load_pil_image(image)
+    width, height = img.size
+    rows = max(1, int(round(columns * height / float(width))))
+    thumb = img.convert("L").resize((columns * cell, rows * cell), Image.BOX)
+    return CaptureSignature(np.asarray(thumb, dtype=np.uint8), width, height, cell)
+
+
+class ChangeMap:
+    def __init__(self, changed, width, height):
+        """changed: (행, 열) bool 배열 — 바뀐 블록, width/height: 원본 캡처 크기"""
+        self.changed = changed
+        self.width = width
+        self.height = height
+        rows, cols = changed.shape
+        self.block_width = width / float(cols)
+        self.block_height = height / float(rows)
+
+    @property
+    def ratio(self):
+        """바뀐 블록 비율 (0~1)"""
+        return float(self.changed.mean()) if self.changed.size else 0.0
+
+    @property
+    def unchanged(self):
+        return not self.changed.any()
+
+    def _cells(self, box, margin=0):
+        x1, y1, x2, y2 = box
+        rows, cols = self.changed.shape
+        c1 = max(0, int((x1 - margin) // self.block_width))
+        r1 = max(0, int((y1 - margin) // self.block_height))
+        c2 = min(cols, int(np.ceil((x2 + margin) / self.block_width)))
+        r2 = min(rows, int(np.ceil((y2 + margin) / self.block_height)))
+        return r1, r2, c1, c2
+
+    def overlaps(self, box, margin=0):
+        """박스(원본 좌표)가 바뀐 블록과 겹치는지"""
+        r1, r2, c1, c2 = self._cells(box, margin)
+        return bool(self.changed[r1:r2, c1:c2].any())
+
+    def regions(self, margin=32, min_size=256):
+        """
+        바뀐 블록 덩어리(8방향 연결)별 박스 목록 (원본 좌표)
+
+        margin만큼 넓히고 min_size보다 작으면 주변을 포함하도록 키운 뒤, 겹치는 박스는 합침
+        """
+        rows, cols = self.changed.shape
+        seen = np.zeros_like(self.changed)
+        boxes = []
+        for r, c in zip(*np.nonzero(self.changed)):
+            if seen[r, c]:
+                continue
+            seen[r, c] = True
+            queue = deque([(r, c)])
+            r1, r2, c1, c2 = r, r, c, c
+            while queue:
+                y, x = queue.popleft()
+                r1, r2, c1, c2 = min(r1, y), max(r2, y), min(c1, x), max(c2, x)
+                for ny in range(max(0, y - 1), min(rows, y + 2)):
+                    for nx in range(max(0, x - 1), min(cols, x + 2)):
+                        if self.changed[ny, nx] and not seen[ny, nx]:
+                            seen[ny, nx] = True
+                            queue.append((ny, nx))
+            boxes.append(
+                self._grow(
+                    [
+                        c1 * self.block_width - margin,
+                        r1 * self.block_height - margin,
+                        (c2 + 1) * self.block_width + margin,
+                        (r2 + 1) * self.block_height + margin,
+                    ],
+                    min_size,
+                )
+            )
+        return _merge_boxes(boxes)
+
+    def _grow(self, box, min_size):
+        x1, y1, x2, y2 = box
+        if x2 - x1 < min_size:
+            cx = (x1 + x2) / 2
+            x1, x2 = cx - min_size / 2, cx + min_size / 2
+        if y2 - y1 < min_size:
+            cy = (y1 + y2) / 2
+            y1, y2 = cy - min_size / 2, cy + min_size / 2
+        return [
+            int(max(0, x1)),
+            int(max(0, y1)),
+            int(min(self.width, x2)),
+            int(min(self.height, y2)),
+        ]
+
+
+def _merge_boxes(boxes):
+    """겹치는 박스를 합칠 때까지 반복"""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [
+                        min(a[0], b[0]),
+                        min(a[1], b[1]),
+                        max(a[2], b[2]),
+                        max(a[3], b[3]),
+                    ]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+class ChangeDetector:
+    def __init__(self, columns=48, cell=8, threshold=6.0):
+        """
+        columns/cell: capture_signature 블록 설정
+        threshold: 블록 평균 밝기 차이(0~255)가 이보다 크면 바뀐 것으로 판단 (렌더 노이즈 허용)
+        """
+        self.columns = columns
+        self.cell = cell
+        self.threshold = threshold
+        self._previous = {}  # 카메라 키 → 마지막 CaptureSignature
+        self._lock = threading.Lock()
+
+    def signature(self, image):
+        """캡처 → 이 감지기 설정의 CaptureSignature"""
+        if isinstance(image, CaptureSignature):
+            return image
+        return capture_signature(image, self.columns, self.cell)
+
+    def compare(self, camera, image, update=True):
+        """
+        같은 카메라의 이전 캡처와 비교 → ChangeMap (이전 캡처가 없거나 크기가 다르면 None)
+
+        image: 캡처 또는 signature()로 만든 CaptureSignature
+        update=True면 이번 캡처를 다음 비교 기준으로 저장
+        (처리가 실패할 수 있으면 update=False로 비교하고 성공한 뒤 remember 호출)
+        """
+        signature = self.signature(image)
+        with self._lock:
+            previous = self._previous.get(camera)
+            if update:
+                self._previous[camera] = signature
+
+        if previous is None or previous.thumbnail.shape != signature.thumbnail.shape:
+            return None
+        if (previous.width, previous.height) != (signature.width, signature.height):
+            return None
+
+        rows, cols = signature.grid
+        if previous.digest == signature.digest:
+            changed = np.zeros((rows, cols), dtype=bool)
+        else:
+            diff = np.abs(
+                signature.thumbnail.astype(np.int16) - previous.thumbnail
+            ).reshape(rows, self.cell, cols, self.cell)
+            changed = diff.mean(axis=(1, 3)) > self.threshold
+        return ChangeMap(changed, signature.width, signature.height)
+
+    def remember(self, camera, image):
+        """캡처(또는 CaptureSignature)를 카메라의 다음 비교 기준으로 저장"""
+        signature = self.signature(image)
+        with self._lock:
+            self._previous[camera] = signature
+
+    def forget(self, camera=None):
+        """기준 캡처 삭제 (camera=None이면 전체)"""
+        with self._lock:
+            if camera is None:
+                self._previous.clear()
+            else:
+                self._previous.pop(camera, None)
+
+
+def offset_furniture(furniture_list, dx, dy):
+    """영역 크롭에서 찾은 가구 박스를 전체 캡처 좌표로 이동"""
+    moved = []
+    for furniture in furniture_list:
+        x1, y1, x2, y2 = furniture["box"]
+        moved.append(dict(furniture, box=[x1 + dx, y1 + dy, x2 + dx, y2 + dy]))
+    return moved
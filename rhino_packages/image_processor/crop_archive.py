@@ -0,0 +1,236 @@
+import io
+import os
+import json
+import mmap
+import uuid
+import hashlib
+import threading
+from datetime import datetime
+
+from PIL import Image
+
+
+# =============================================================================
+# 크롭 아카이브 (데이터 파일 하나 + 인덱스, 추가만 가능)
+# =============================================================================
+
+
+def new_run_id():
+    """실행마다 고유한 ID (예: 20250906_084304_1a2b3c)"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def _safe_name(name):
+    return name.replace(" ", "_").replace("/", "_").replace("\\", "_")
+
+
+class CropArchive:
+    def __init__(
+        self, archive_dir="furniture_crops_filtered", name="crops", compress_level=1
+    ):
+        """
+        archive_dir/{name}.pack: PNG 데이터를 이어 붙인 파일
+        archive_dir/{name}.index.jsonl: 항목마다 한 줄 (오프셋, 길이, 실행 ID, 이름, 박스, 해시 ...)
+
+        같은 해시의 크롭은 데이터를 다시 쓰지 않고 기존 오프셋을 가리킴
+        """
+        self.archive_dir = archive_dir
+        self.data_path = os.path.join(archive_dir, f"{name}.pack")
+        self.index_path = os.path.join(archive_dir, f"{name}.index.jsonl")
+        self.compress_level = compress_level
+
+        self.records = []
+        self._by_hash = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self.load()
+
+    def load(self):
+        self.records = []
+        self._by_hash = {}
+        self._next_id = 0
+        if not os.path.exists(self.index_path):
+            return
+
+        data_size = (
+            os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        )
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 마지막 줄이 쓰다가 끊긴 경우
+                    continue
+                # 건너뛰는 레코드의 id도 다시 쓰지 않음
+                self._next_id = max(self._next_id, record.get("id", -1) + 1)
+                if record["offset"] + record["length"] > data_size:
+                    continue
+                self.records.append(record)
+                self._by_hash.setdefault(record["sha256"], record)
+
+    # -------------------------------------------------------------------------
+    # 쓰기
+    # -------------------------------------------------------------------------
+
+    def append(self, image, furniture=None, run_id=None, crop_box=None):
+        """
+        크롭 이미지 하나를 추가 → 인덱스 레코드
+
+        image: PIL 이미지 또는 PNG bytes
+        furniture: FurnitureCropper 가구 dict (name, category, priority, box)
+        """
+        if isinstance(image, Image.Image):
+            buf = io.BytesIO()
+            image.save(buf, format="PNG", compress_level=self.compress_level)
+            data = buf.getvalue()
+            width, height = image.size
+        else:
+            data = bytes(image)
+            with Image.open(io.BytesIO(data)) as img:
+                width, height = img.size
+
+        furniture = furniture or {}
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            if not os.path.exists(self.archive_dir):
+                os.makedirs(self.archive_dir)
+
+            existing = self._by_hash.get(digest)
+            if existing is not None:
+                offset, length = existing["offset"], existing["length"]
+            else:
+                # 데이터를 먼저 쓰고 나서 인덱스 기록 (중간에 끊겨도 인덱스가 가리키는 데이터는 온전함)
+                self._close_mmap()
+                with open(self.data_path, "ab") as f:
+                    offset = f.tell()
+                    f.write(data)
+                length = len(data)
+
+            record = {
+                "id": self._next_id,
+                "offset": offset,
+                "length": length,
+                "run_id": run_id,
+                "name": furniture.get("name", "unknown"),
+                "category": furniture.get("category"),
+                "priority": furniture.get("priority"),
+                "box": furniture.get("box"),
+                "crop_box": list(crop_box) if crop_box is not None else None,
+                "size": [width, height],
+                "sha256": digest,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            with open(self.index_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+            self.records.append(record)
+            self._next_id += 1
+            self._by_hash.setdefault(digest, record)
+        return record
+
+    # -------------------------------------------------------------------------
+    # 읽기 (메모리 매핑)
+    # -------------------------------------------------------------------------
+
+    def _close_mmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+            self._file = None
+
+    def _mapped(self, end):
+        """end 위치까지 매핑된 mmap (파일이 커졌으면 다시 매핑)"""
+        if self._mmap is None or len(self._mmap) < end:
+            self._close_mmap()
+            self._file = open(self.data_path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def read(self, record):
+        """레코드의 PNG 바이트 (mmap에서 필요한 구간만 복사)"""
+        end = record["offset"] + record["length"]
+        with self._lock:
+            return self._mapped(end)[record["offset"] : end]
+
+    def image(self, record):
+        """레코드 → PIL 이미지"""
+        img = Image.open(io.BytesIO(self.read(record)))
+        img.load()
+        return img
+
+    def close(self):
+        with self._lock:
+            self._close_mmap()
+
+    # -------------------------------------------------------------------------
+    # 검색 / 내보내기
+    # -------------------------------------------------------------------------
+
+    def runs(self):
+        """실행 ID 목록 (오래된 순)"""
+        return list(dict.fromkeys(r["run_id"] for r in self.records))
+
+    def query(self, run_id=None, category=None, priority=None, name=None):
+        """조건에 맞는 레코드 목록 (값을 리스트로 주면 그 중 하나와 일치)"""
+
+        def matches(value, condition):
+            if condition is None:
+                return True
+            if isinstance(condition, (list, tuple, set)):
+                return value in condition
+            return value == condition
+
+        return [
+            r
+            for r in self.records
+            if matches(r["run_id"], run_id)
+            and matches(r["category"], category)
+            and matches(r["priority"], priority)
+            and matches(r["name"], name)
+        ]
+
+    def filename(self, record):
+        safe_name = _safe_name(record["name"])
+        return f"{record['run_id']}_{record['id']:05d}_{record['priority']}_{safe_name}.png"
+
+    def export(self, records, output_dir):
+        """레코드를 PNG 파일로 내보내기 (데이터를 그대로 씀, 다시 인코딩하지 않음) → 경로 목록"""
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        paths = []
+        for record in records:
+            path = os.path.join(output_dir, self.filename(record))
+            with open(path, "wb") as f:
+                f.write(self.read(record))
+            paths.append(path)
+        print(f"📤 크롭 {len(paths)}개 내보내기: {output_dir}/")
+        return paths
+
+    def stats(self):
+        data_size = (
+            os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        )
+        return {
+            "records": len(self.records),
+            "unique": len(self._by_hash),
+            "runs": len(self.runs()),
+            "data_bytes": data_size,
+        }
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# =============================================================================
+# 크롭 엔진 (크롭 좌표 일괄 계산 + 백그라운드 PNG 저장)
+# =============================================================================
+
+
+# 카테고리별 여백 비율 (큰 가구일수록 여백을 적게)
+MARGIN_RATIOS = {"large": 0.05, "medium": 0.1, "small": 0.15}
+
+
+def compute_crop_boxes(furniture_list, img_width, img_height):
+    """
+    모든 가구의 중심 맞춤 크롭 좌표를 한 번에 계산 → (N, 4) int 배열
+
+    카테고리별 여백을 두고 가구 중심에 맞춘 뒤, 이미지 경계를 넘으면 안쪽으로 밀어 넣음
+    """
+    if not furniture_list:
+        return np.zeros((0, 4), dtype=np.int64)
+
+    boxes = np.array([f["box"] for f in furniture_list], dtype=np.float64)
+    ratios = np.array(
+        [
+            MARGIN_RATIOS.get(f.get("category", "medium"), MARGIN_RATIOS["small"])
+            for f in furniture_list
+        ]
+    )
+    x1, y1, x2, y2 = boxes.T
+
+    # 원본 가구 크기와 중심
+    width = x2 - x1
+    height = y2 - y1
+    center_x = np.floor((x1 + x2) / 2)
+    center_y = np.floor((y1 + y2) / 2)
+
+    crop_width = width + 2 * np.floor(width * ratios)
+    crop_height = height + 2 * np.floor(height * ratios)
+
+    # 중심 맞춤 크롭 좌표
+    crop_x1 = np.maximum(0, center_x - np.floor(crop_width / 2))
+    crop_y1 = np.maximum(0, center_y - np.floor(crop_height / 2))
+    crop_x2 = np.minimum(img_width, crop_x1 + crop_width)
+    crop_y2 = np.minimum(img_height, crop_y1 + crop_height)
+
+    # 경계 조정 (오른쪽/아래가 잘렸으면 왼쪽/위로 확장)
+    crop_x1 = np.where(
+        crop_x2 - crop_x1 < crop_width, np.maximum(0, crop_x2 - crop_width), crop_x1
+    )
+    crop_y1 = np.where(
+        crop_y2 - crop_y1 < crop_height, np.maximum(0, crop_y2 - crop_height), crop_y1
+    )
+
+    crop_boxes = np.stack([crop_x1, crop_y1, crop_x2, crop_y2], axis=1)
+    return np.rint(crop_boxes).astype(np.int64)
+
+
+def crop_many(img, furniture_list):
+    """가구 목록을 한 번에 크롭 → [(크롭 이미지, (x1, y1, x2, y2)), ...] (메모리에서만)"""
+    crop_boxes = compute_crop_boxes(furniture_list, *img.size)
+    # 크롭마다 전체 이미지를 다시 디코딩하지 않도록 한 번만 로드
+    img.load()
+    return [(img.crop(tuple(box)), tuple(box)) for box in crop_boxes.tolist()]
+
+
+class CropWriter:
+    def __init__(self, max_workers=2, compress_level=1):
+        """
+        크롭 이미지를 백그라운드 스레드에서 PNG로 저장
+
+        compress_level: PNG 압축 수준 (0~9, 낮을수록 빠르고 파일이 큼)
+        """
+        self.compress_level = compress_level
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="crop-writer"
+        )
+        self._futures = []
+        self._lock = threading.Lock()
+        self.written = 0
+        self.write_seconds = 0.0
+
+    def _write(self, img, filepath, compress_level):
+        start = time.time()
+        directory = os.path.dirname(filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        img.save(filepath, format="PNG", compress_level=compress_level)
+        with self._lock:
+            self.written += 1
+            self.write_seconds += time.time() - start
+        return filepath
+
+    def run(self, fn, *args, **kwargs):
+        """임의의 저장 작업(예: CropArchive.append)을 백그라운드에서 실행 (Future)"""
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def submit(self, img, filepath, compress_level=None):
+        """저장 요청만 넣고 바로 반환 (Future)"""
+        if compress_level is None:
+            compress_level = self.compress_level
+        return self.run(self._write, img, filepath, compress_level)
+
+    def wait(self):
+        """지금까지 요청된 저장이 끝날 때까지 대기 → 결과(경로/레코드) 목록 (실패는 출력만)"""
+        with self._lock:
+            futures, self._futures = self._futures, []
+
+        paths = []
+        for future in futures:
+            try:
+                paths.append(future.result())
+            except Exception as e:
+                print(f"❌ 크롭 저장 실패: {e}")
+        return paths
+
+    def close(self, wait=True):
+        paths = self.wait() if wait else []
+        self._executor.shutdown(wait=wait)
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,184 @@
+import io
+import threading
+
+from PIL import Image
+
+from .upscale_policy import load_pil_image
+
+
+# =============================================================================
+# 모델별 업로드 인코딩 정책 (최대 크기, 포맷, 품질, 알파 필요 여부)
+# =============================================================================
+
+
+class EncodingSpec:
+    EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+    def __init__(self, format="JPEG", max_side=None, quality=90, alpha=False):
+        """
+        format: "JPEG" / "PNG" / "WEBP"
+        max_side: 긴 변 최대 크기 (None이면 줄이지 않음)
+        quality: JPEG/WEBP 품질
+        alpha: 알파 채널이 필요한 입력인지 (False면 흰 배경으로 합성 후 RGB)
+        """
+        self.format = format
+        self.max_side = max_side
+        self.quality = quality
+        self.alpha = alpha
+
+    @property
+    def extension(self):
+        return self.EXTENSIONS[self.format]
+
+    def __repr__(self):
+        return (
+            f"EncodingSpec({self.format}, max_side={self.max_side}, "
+            f"quality={self.quality}, alpha={self.alpha})"
+        )
+
+
+# 모델 이름(버전 제외) → 인코딩 정책
+ENCODING_POLICIES = {
+    # 배경 제거 입력은 원본 크롭 — 알파 불필요
+    "bria/remove-background": EncodingSpec("JPEG", max_side=2048, quality=92),
+    # 업스케일은 알파 유지, 크기는 줄이지 않음
+    "bria/increase-resolution": EncodingSpec("PNG", alpha=True),
+    # 배경이 제거된 이미지 — 알파 필요, 3D 모델 입력 해상도 이상은 의미 없음
+    "ndreca/hunyuan3d-2": EncodingSpec("PNG", max_side=1024, alpha=True),
+    "firtoz/trellis": EncodingSpec("PNG", max_side=1024, alpha=True),
+    "google/nano-banana": EncodingSpec("JPEG", max_side=2048, quality=90),
+    "black-forest-labs/flux-kontext-dev": EncodingSpec(
+        "JPEG", max_side=1440, quality=90
+    ),
+    "black-forest-labs/flux-dev": EncodingSpec("JPEG", max_side=1440, quality=90),
+    "youzu/stable-interiors-v2": EncodingSpec("JPEG", max_side=1024, quality=90),
+}
+
+
+class EncodingReport:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = {}  # 모델 → {"count", "original_bytes", "encoded_bytes"}
+
+    def record(self, model, original_bytes, encoded_bytes):
+        with self._lock:
+            entry = self.entries.setdefault(
+                model, {"count": 0, "original_bytes": 0, "encoded_bytes": 0}
+            )
+            entry["count"] += 1
+            # 원본 크기를 알 수 없는(PIL 입력) 경우 인코딩 결과와 같다고 봄
+            entry["original_bytes"] += (
+                original_bytes if original_bytes is not None else encoded_bytes
+            )
+            entry["encoded_bytes"] += encoded_bytes
+
+    @property
+    def bytes_saved(self):
+        return sum(
+            e["original_bytes"] - e["encoded_bytes"] for e in self.entries.values()
+        )
+
+    def summary(self):
+        print("📦 업로드 인코딩 요약")
+        for model, e in self.entries.items():
+            print(
+                f"   {model}: {e['count']}건, {e['original_bytes']:,} → {e['encoded_bytes']:,} bytes"
+            )
+        print(f"   절약: {self.bytes_saved:,} bytes")
+        return dict(self.entries, bytes_saved=self.bytes_saved)
+
+    def reset(self):
+        with self._lock:
+            self.entries = {}
+
+
+ENCODING_REPORT = EncodingReport()
+
+
+def get_encoding_spec(model):
+    if model is None:
+        return None
+    return ENCODING_POLICIES.get(model.split(":", 1)[0])
+
+
+def _byte_size(image):
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return len(image)
+    if isinstance(image, io.BytesIO):
+        with image.getbuffer() as view:
+            return view.nbytes
+    return None
+
+
+def encode_for_model(model, image):
+    """
+    모델 정책에 맞춰 이미지를 다시 인코딩한 BytesIO 반환
+
+    정책이 없거나 URL이면 그대로 반환, 다시 인코딩해도 작아지지 않으면 원본 유지
+    """
+    spec = get_encoding_spec(model)
+    if spec is None:
+        return image
+    pil_img = load_pil_image(image)
+    if pil_img is None:
+        return image
+
+    original_size = _byte_size(image)
+    img = pil_img
+    resized = False
+    if spec.max_side and max(img.size) > spec.max_side:
+        img = img.copy()
+        img.thumbnail((spec.max_side, spec.max_side), Image.LANCZOS)
+        resized = True
+
+    has_alpha = img.mode in ("RGBA", "LA") or (
+        img.mode == "P" and "transparency" in img.info
+    )
+    if spec.alpha and has_alpha:
+        img = img.convert("RGBA")
+    elif has_alpha:
+        # 알파가 필요 없는 모델 → 흰 배경으로 합성
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.split()[-1])
+        img = background
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    buf = io.BytesIO()
+    if spec.format == "PNG":
+        img.save(buf, format="PNG", optimize=False)
+    else:
+        img.save(buf, format=spec.format, quality=spec.quality)
+    encoded_size = buf.tell()
+
+    if original_size is not None and not resized and encoded_size >= original_size:
+        # 이미 충분히 작은 입력
+        ENCODING_REPORT.record(model, original_size, original_size)
+        if hasattr(image, "seek"):
+            image.seek(0)
+        return image
+
+    ENCODING_REPORT.record(model, original_size, encoded_size)
+    buf.seek(0)
+    buf.name = f"input.{spec.extension}"
+    return buf
+
+
+def prepare_model_input(model, input):
+    """모델 입력 dict의 이미지 값(리스트 포함)에 인코딩 정책 적용"""
+    if get_encoding_spec(model) is None:
+        return input
+
+    def encode(value):
+        if isinstance(value, (bytes, bytearray, io.IOBase, Image.Image)):
+            return encode_for_model(model, value)
+        return value
+
+    prepared = {}
+    for key, value in input.items():
+        if isinstance(value, list):
+            prepared[key] = [encode(v) for v in value]
+        else:
+            prepared[key] = encode(value)
+    return prepared
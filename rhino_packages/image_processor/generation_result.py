@@ -0,0 +1,140 @@
+import io
+import time
+import threading
+
+import requests
+from PIL import Image
+
+from .encoding_policy import prepare_model_input
+
+
+# =============================================================================
+# 생성 결과 (Replicate 출력을 한 번만 받아서 여러 방식으로 사용)
+# =============================================================================
+
+
+class GenerationResult:
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, output, model=None, run_seconds=None, metadata=None):
+        """
+        output: client.run / prediction.output 결과 (FileOutput, URL 문자열, 그 리스트, 또는 bytes)
+        리스트면 첫 번째 항목을 사용
+        """
+        if isinstance(output, (list, tuple)):
+            output = output[0] if output else None
+        if isinstance(output, dict):
+            output = next(iter(output.values()), None)
+
+        self.output = output
+        self.model = model
+        self.run_seconds = run_seconds
+        self.fetch_seconds = None
+        self.metadata = metadata or {}
+        self.created_at = time.time()
+
+        self._data = None
+        self._image = None
+        self._lock = threading.Lock()
+
+        if isinstance(output, (bytes, bytearray, memoryview)):
+            self._data = bytes(output)
+            self.fetch_seconds = 0.0
+        elif output is None:
+            raise ValueError("모델 출력이 비어 있습니다.")
+
+    @property
+    def url(self):
+        if isinstance(self.output, str):
+            return self.output
+        return getattr(self.output, "url", None)
+
+    @property
+    def fetched(self):
+        return self._data is not None
+
+    def _chunks(self):
+        output = self.output
+        if isinstance(output, str):
+            with requests.get(output, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                    yield chunk
+        elif hasattr(output, "__iter__"):
+            # replicate FileOutput: 반복하면 응답을 조각 단위로 스트리밍
+            for chunk in output:
+                yield chunk
+        else:
+            yield output.read()
+
+    def _fetch(self, sink=None):
+        """아직 받지 않았으면 한 번만 다운로드 (sink가 있으면 받으면서 바로 기록)"""
+        with self._lock:
+            if self._data is not None:
+                return False
+
+            start = time.time()
+            chunks = []
+            for chunk in self._chunks():
+                chunks.append(chunk)
+                if sink is not None:
+                    sink.write(chunk)
+            self._data = b"".join(chunks)
+            self.fetch_seconds = time.time() - start
+            return True
+
+    @property
+    def data(self):
+        """전체 바이트 (최초 접근 시 한 번만 다운로드, 이후 같은 객체를 반환)"""
+        self._fetch()
+        return self._data
+
+    def memoryview(self):
+        """복사 없는 읽기 전용 뷰"""
+        return memoryview(self.data)
+
+    def bytesio(self):
+        return io.BytesIO(self.data)
+
+    def save(self, path):
+        """파일로 저장 — 아직 받지 않았으면 다운로드하면서 바로 기록"""
+        with open(path, "wb") as f:
+            if not self._fetch(sink=f):
+                f.write(self.memoryview())
+        return path
+
+    @property
+    def image(self):
+        """디코딩된 PIL 이미지 (처음 접근할 때만 디코딩)"""
+        if self._image is None:
+            image = Image.open(io.BytesIO(self.data))
+            image.load()
+            self._image = image
+        return self._image
+
+    @property
+    def elapsed(self):
+        return (self.run_seconds or 0.0) + (self.fetch_seconds or 0.0)
+
+    def timing(self):
+        return {
+            "model": self.model,
+            "run_seconds": self.run_seconds,
+            "fetch_seconds": self.fetch_seconds,
+            "bytes": len(self._data) if self._data is not None else None,
+        }
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        size = f"{len(self._data):,} bytes" if self._data is not None else "not fetched"
+        return f"GenerationResult(model={self.model!r}, {size})"
+
+
+def run_model(client, model, input):
+    """client.run 실행 후 GenerationResult로 감싸서 반환 (실행 시간 기록)"""
+    input = prepare_model_input(model, input)
+    start = time.time()
+    output = client.run(model, input=input)
+    return GenerationResult(output, model=model, run_seconds=time.time() - start)
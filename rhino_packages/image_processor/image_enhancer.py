@@ -1,58 +1,176 @@
-import requests
 
 import os
 from PIL import Image
 import io
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+from .upload_cache import UploadManager
+from .encoding_policy import get_encoding_spec, prepare_model_input
+from .generation_result import GenerationResult, run_model
+from .upscale_policy import (
+    get_upscale_policy,
+    load_pil_image,
+    local_upscale,
+    encode_png,
+)
 
-def upscale(client, image: io.BytesIO):
+
+NANO_BANANA_MODEL = "google/nano-banana"
+KONTEXT_DEV_MODEL = "black-forest-labs/flux-kontext-dev"
+FLUX_DEV_MODEL = "black-forest-labs/flux-dev"
+YOUZU_MODEL = "youzu/stable-interiors-v2:4836eb257a4fb8b87bac9eacbef9292ee8e1a497398ab96207067403a4be2daf"
+
+
+# =============================================================================
+# 모델별 입력 구성
+# =============================================================================
+
+
+def nano_banana_input(image, prompt):
+    return {"prompt": prompt, "image_input": [image], "output_format": "jpg"}
+
+
+def kontext_dev_input(image, prompt):
+    return {
+        "prompt": prompt,
+        "go_fast": True,
+        "guidance": 2.5,
+        "input_image": image,
+        "aspect_ratio": "match_input_image",
+        "output_format": "jpg",
+        "output_quality": 80,
+        "num_inference_steps": 30,
+    }
+
+
+def flux_dev_input(
+    image,
+    prompt,
+    num_inference_steps=50,
+    guidance_scale=7.5,
+    prompt_strength=0.8,
+    seed=None,
+):
+    input = {
+        "image": image,
+        "prompt": prompt,
+        "output_format": "png",
+        "num_inference_steps": num_inference_steps,
+        "guidance_scale": guidance_scale,
+        "prompt_strength": prompt_strength,
+    }
+
+    if seed is not None:
+        input["seed"] = seed
+    return input
+
+
+def youzu_input(
+    image,
+    prompt,
+    negative_prompt="",
+    num_inference_steps=50,
+    guidance_scale=7.5,
+    prompt_strength=0.8,
+    seed=None,
+):
+    input = {
+        "image": image,
+        "prompt": prompt,
+        "num_inference_steps": num_inference_steps,
+        "guidance_scale": guidance_scale,
+        "prompt_strength": prompt_strength,
+    }
+
+    if negative_prompt:
+        input["negative_prompt"] = negative_prompt
+
+    if seed is not None:
+        input["seed"] = seed
+    return input
+
+
+# enhance_many에서 이름으로 고를 수 있는 모델 목록: 이름 → (모델, 입력 구성 함수)
+ENHANCE_MODELS = {
+    "nano_banana": (NANO_BANANA_MODEL, nano_banana_input),
+    "kontext_dev": (KONTEXT_DEV_MODEL, kontext_dev_input),
+    "flux_dev": (FLUX_DEV_MODEL, flux_dev_input),
+    "youzu": (YOUZU_MODEL, youzu_input),
+}
+
+
+# 모든 run_* 함수는 기본적으로 bytes를 반환하고,
+# return_result=True면 GenerationResult(지연 다운로드, 저장/PIL 변환, 시간 정보)를 반환
+
+
+def upscale(
+    client, image: io.BytesIO, uploader=None, return_result=False, policy=None
+):
+    """
+    policy: None이면 항상 Bria 4배 (기존 동작)
+            UpscalePolicy 또는 프리셋 이름("fast", "balanced", "quality")이면
+            짧은 변 기준으로 필요한 배율만 계산해서 건너뛰기 / 로컬 Lanczos / Bria 중 선택
+    """
+    desired_increase = 4
+    policy = get_upscale_policy(policy)
+    if policy is not None:
+        pil_img = load_pil_image(image)
+        if pil_img is not None:
+            action, factor = policy.plan(*pil_img.size)
+            if action == "skip":
+                print(f"   ⏭️  업스케일 생략 ({pil_img.width}x{pil_img.height})")
+                data = image if isinstance(image, bytes) else encode_png(pil_img)
+                result = GenerationResult(data, model="none", run_seconds=0.0)
+                return result if return_result else result.data
+            if action == "local":
+                start = time.time()
+                data = local_upscale(pil_img, factor)
+                result = GenerationResult(
+                    data, model="local-lanczos", run_seconds=time.time() - start
+                )
+                return result if return_result else result.data
+            desired_increase = factor
+            if isinstance(image, Image.Image):
+                image = io.BytesIO(encode_png(image))
+
+    if uploader is not None:
+        image = uploader.url_for(image, model="bria/increase-resolution")
 
     # Step2 폴더의 모든 이미지 파일 처리
     # 이미지 업스케일링
-    output = client.run(
+    result = run_model(
+        client,
         "bria/increase-resolution",
         input={
             "sync": True,
             "image": image,
             "preserve_alpha": True,
-            "desired_increase": 4,
+            "desired_increase": desired_increase,
             "content_moderation": False,
         },
     )
 
-    return output.read()
+    return result if return_result else result.data
 
 
-def run_flux_nano_banana(client, image, prompt):
-    output = client.run(
-        "google/nano-banana",
-        input={"prompt": prompt, "image_input": [image], "output_format": "jpg"},
-    )
-
-    # To access the file URL:
-    # => "http://example.com"
+def run_flux_nano_banana(client, image, prompt, uploader=None, return_result=False):
+    if uploader is not None:
+        image = uploader.url_for(image, model=NANO_BANANA_MODEL)
+    result = run_model(client, NANO_BANANA_MODEL, nano_banana_input(image, prompt))
 
-    # To write the file to disk:
+    return result if return_result else result.data
 
-    return output.read()
 
+def run_flux_kontext_dev(
+    client, image: io.BytesIO, prompt, uploader=None, return_result=False
+):
+    if uploader is not None:
+        image = uploader.url_for(image, model=KONTEXT_DEV_MODEL)
+    result = run_model(client, KONTEXT_DEV_MODEL, kontext_dev_input(image, prompt))
 
-def run_flux_kontext_dev(client, image: io.BytesIO, prompt):
-    output = client.run(
-        "black-forest-labs/flux-kontext-dev",
-        input={
-            "prompt": prompt,
-            "go_fast": True,
-            "guidance": 2.5,
-            "input_image": image,
-            "aspect_ratio": "match_input_image",
-            "output_format": "jpg",
-            "output_quality": 80,
-            "num_inference_steps": 30,
-        },
-    )
-
-    return output.read()
+    return result if return_result else result.data
 
 
 def run_flux_dev(
@@ -64,29 +182,31 @@ def run_flux_dev(
     guidance_scale=7.5,
     prompt_strength=0.8,
     seed=None,
+    uploader=None,
+    return_result=False,
 ):
     """
     Flux-dev 모델을 실행하는 함수
+
+    uploader: UploadManager — 같은 이미지를 여러 모델에 보낼 때 한 번만 업로드
     """
-    input = {
-        "image": image,
-        "prompt": prompt,
-        "output_format": "png",
-        "num_inference_steps": num_inference_steps,
-        "guidance_scale": guidance_scale,
-        "prompt_strength": prompt_strength,
-    }
+    if uploader is not None:
+        image = uploader.url_for(image, model=FLUX_DEV_MODEL)
 
-    if seed is not None:
-        input["seed"] = seed
+    input = flux_dev_input(
+        image,
+        prompt,
+        num_inference_steps=num_inference_steps,
+        guidance_scale=guidance_scale,
+        prompt_strength=prompt_strength,
+        seed=seed,
+    )
 
-    output = client.run("black-forest-labs/flux-dev", input=input)
+    # 첫 번째 출력만 사용 — 저장하면서 받은 바이트를 그대로 반환 (다운로드 1회)
+    result = run_model(client, FLUX_DEV_MODEL, input)
+    result.save(filename)
 
-    for index, item in enumerate(output):
-        if index == 0:
-            with open(filename, "wb") as file:
-                file.write(item.read())
-            return item.read()
+    return result if return_result else result.data
 
 
 def run_youzu(
@@ -99,28 +219,185 @@ def run_youzu(
     guidance_scale=7.5,
     prompt_strength=0.8,
     seed=None,
+    uploader=None,
+    return_result=False,
 ):
+    if uploader is not None:
+        image = uploader.url_for(image, model=YOUZU_MODEL)
 
-    input = {
-        "image": image,
-        "prompt": prompt,
-        "num_inference_steps": num_inference_steps,
-        "guidance_scale": guidance_scale,
-        "prompt_strength": prompt_strength,
-    }
+    input = youzu_input(
+        image,
+        prompt,
+        negative_prompt=negative_prompt,
+        num_inference_steps=num_inference_steps,
+        guidance_scale=guidance_scale,
+        prompt_strength=prompt_strength,
+        seed=seed,
+    )
 
-    if negative_prompt:
-        input["negative_prompt"] = negative_prompt
+    result = run_model(client, YOUZU_MODEL, input)
+    result.save(filename)
 
-    if seed is not None:
-        input["seed"] = seed
+    return result if return_result else result.data
 
-    output = client.run(
-        "youzu/stable-interiors-v2:4836eb257a4fb8b87bac9eacbef9292ee8e1a497398ab96207067403a4be2daf",
-        input=input,
+
+# =============================================================================
+# 여러 모델 동시 실행 (완료 순서대로 결과 반환)
+# =============================================================================
+
+
+def create_prediction(client, model, input):
+    """모델 이름(owner/name 또는 owner/name:version)으로 예측 생성 — 취소 가능한 핸들 반환"""
+    if ":" in model:
+        return client.predictions.create(version=model.split(":", 1)[1], input=input)
+    return client.models.predictions.create(model=model, input=input)
+
+
+def prediction_output_url(output):
+    """예측 결과에서 첫 번째 파일 URL 추출 (문자열/리스트/dict 결과 모두 처리)"""
+    if isinstance(output, (list, tuple)):
+        return prediction_output_url(output[0]) if output else None
+    if isinstance(output, dict):
+        return prediction_output_url(next(iter(output.values()), None))
+    if output is None:
+        return None
+    return getattr(output, "url", output)
+
+
+def run_prediction(
+    client,
+    model,
+    input,
+    name=None,
+    cancel_event=None,
+    poll_interval=1.0,
+    output_key=None,
+):
+    """
+    예측을 만들고 끝날 때까지 폴링 → 결과 dict
+
+    cancel_event가 설정되면 진행 중인 예측을 취소하고 status="canceled" 반환
+    output_key: 출력이 dict일 때 사용할 항목 (기본값: 첫 번째 항목)
+    """
+    name = name or model
+    start = time.time()
+    prediction = create_prediction(client, model, prepare_model_input(model, input))
+    print(f"🚀 {name} 시작: {prediction.id}")
+
+    while prediction.status not in ("succeeded", "failed", "canceled"):
+        if cancel_event is None:
+            time.sleep(poll_interval)
+        elif cancel_event.wait(poll_interval):
+            prediction.cancel()
+            print(f"🛑 {name} 취소됨")
+            return {"model": name, "status": "canceled", "elapsed": time.time() - start}
+        prediction.reload()
+
+    if prediction.status != "succeeded":
+        return {
+            "model": name,
+            "status": prediction.status,
+            "error": prediction.error,
+            "elapsed": time.time() - start,
+        }
+
+    output = prediction.output
+    if output_key is not None and isinstance(output, dict):
+        output = output.get(output_key)
+
+    run_seconds = time.time() - start
+    result = GenerationResult(
+        prediction_output_url(output),
+        model=name,
+        run_seconds=run_seconds,
+        metadata={"prediction_id": prediction.id},
     )
+    return {
+        "model": name,
+        "status": "succeeded",
+        "output": result.data,
+        "result": result,
+        "prediction_id": prediction.id,
+        "elapsed": result.elapsed,
+    }
+
+
+def enhance_many(
+    client,
+    image,
+    prompt,
+    models=None,
+    first_n=None,
+    deadline=None,
+    uploader=None,
+    model_options=None,
+    poll_interval=1.0,
+):
+    """
+    여러 스타일 모델을 동시에 실행하고 끝나는 순서대로 결과 dict를 yield
+
+    models: ENHANCE_MODELS 이름 목록 (기본값: 전체)
+    first_n: 성공한 결과가 이 개수만큼 모이면 나머지 모델은 취소
+    deadline: 시작 후 이 시간(초)이 지나면 남은 모델은 취소
+    model_options: {"flux_dev": {"seed": 1}, ...} 모델별 추가 입력
+    이미지는 인코딩 정책별로 한 번만 업로드해서 정책이 같은 모델끼리 같은 URL을 사용
+    """
+    models = list(models or ENHANCE_MODELS)
+    model_options = model_options or {}
+    uploader = uploader or UploadManager(client)
+    image_urls = {}
+
+    cancel_event = threading.Event()
+    start = time.time()
+    succeeded = 0
+
+    executor = ThreadPoolExecutor(max_workers=len(models))
+    try:
+        pending = set()
+        for name in models:
+            model, build_input = ENHANCE_MODELS[name]
+            spec_key = repr(get_encoding_spec(model))
+            if spec_key not in image_urls:
+                image_urls[spec_key] = uploader.url_for(image, model=model)
+            input = build_input(
+                image_urls[spec_key], prompt, **model_options.get(name, {})
+            )
+            pending.add(
+                executor.submit(
+                    run_prediction,
+                    client,
+                    model,
+                    input,
+                    name=name,
+                    cancel_event=cancel_event,
+                    poll_interval=poll_interval,
+                )
+            )
+
+        while pending:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0.0, deadline - (time.time() - start))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"⏰ 제한 시간 {deadline}초 초과 → 남은 {len(pending)}개 취소")
+                break
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ 모델 실행 실패: {e}")
+                    continue
+                if result["status"] == "succeeded":
+                    succeeded += 1
+                    print(f"✅ {result['model']} 완료 ({result['elapsed']:.1f}초)")
+                yield result
 
-    response = requests.get(output)
-    with open(filename, "wb") as file:
-        file.write(response.content)
-    return response.content
+            if first_n is not None and succeeded >= first_n:
+                print(f"🏁 {first_n}개 결과 확보 → 남은 {len(pending)}개 취소")
+                break
+    finally:
+        # 남은 예측은 취소 신호만 보내고 기다리지 않음
+        cancel_event.set()
+        executor.shutdown(wait=False)
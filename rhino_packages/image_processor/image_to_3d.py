@@ -4,12 +4,40 @@ import json
 from PIL import Image
 import os
 import replicate
-import requests
 import time
+import uuid
 import shutil
 from datetime import datetime
 import io
 from typing import Union, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .image_enhancer import upscale
+from .encoding_policy import encode_for_model
+from .crop_engine import CropWriter, compute_crop_boxes, crop_many
+from .crop_archive import new_run_id
+from .change_detector import ChangeDetector, offset_furniture
+from .upload_cache import image_digest
+from .upscale_policy import load_pil_image
+from .room_profiles import get_room_profile
+from .tiled_detection import (
+    TilePlan,
+    encode_jpeg,
+    merge_tile_detections,
+    place_tile_detections,
+    scale_furniture,
+    suppress_coarse,
+)
+from .speculative_3d import Speculative3D
+from .job_queue import get_job_queue
+from .mesh_backends import (
+    HUNYUAN3D_MODEL,
+    HedgedRunner,
+    LatencyStats,
+    get_mesh_backend,
+)
 
 # =============================================================================
 # 기본 유틸리티 함수들
@@ -38,6 +66,8 @@ def open_image_by_type(image_path: Union[str, bytes, io.BytesIO]):
         # 파일 경로
         _img = None
         with Image.open(image_path) as img:
+            # 파일을 닫기 전에 픽셀을 읽어 둠 (닫힌 뒤에도 crop 가능하도록)
+            img.load()
             _img = img
         return _img
 
@@ -54,14 +84,74 @@ def open_image_by_type(image_path: Union[str, bytes, io.BytesIO]):
 
 
 class ImageProcessor:
-    def __init__(self, OPENAI_API_KEY, REPLICATE_API_TOKEN):
+    def __init__(
+        self,
+        OPENAI_API_KEY,
+        REPLICATE_API_TOKEN,
+        crop_archive=None,
+        speculative_budget=0,
+        change_detector=None,
+        full_change_ratio=0.5,
+        tiling=None,
+    ):
+        """
+        crop_archive: CropArchive — 지정하면 크롭을 낱개 PNG 대신 아카이브에 저장
+        speculative_budget: process_1이 끝나자마자 large/high 가구의 3D 변환을 미리 시작할 최대 개수
+        change_detector: ChangeDetector — process_1(camera=...)에서 이전 캡처와 비교할 때 사용
+        full_change_ratio: 바뀐 블록 비율이 이보다 크면 증분 처리 없이 전체 다시 처리
+        tiling: TilePlan — 큰 캡처(8K, 파노라마)는 타일로 나눠 가구 인식
+        """
         self.open_ai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
         self.replicate_client = replicate.Client(api_token=REPLICATE_API_TOKEN)
+        self.crop_archive = crop_archive
+        self.speculative = Speculative3D(
+            self.replicate_client, HUNYUAN3D_MODEL, budget=speculative_budget
+        )
+        self.change_detector = change_detector or ChangeDetector()
+        self.full_change_ratio = full_change_ratio
+        self.tiling = tiling
+        self._capture_cache = {}  # 카메라 키 → [(가구 dict, 배경 제거 이미지)]
+        self._model_cache = {}  # 배경 제거 이미지 해시 → GLB 경로
+
+    def _upscale_stage(self, images, policy):
+        """단계 사이 업스케일 (정책에 따라 건너뛰기/로컬/Bria) → bytes 목록"""
+        print(f"\n🔍 업스케일 정책 적용: {policy}")
+        return [upscale(self.replicate_client, image, policy=policy) for image in images]
+
+    def process_1(
+        self, image, stream=False, upscale_policy=None, camera=None, room=None
+    ):
+        # 단계 1: 가구 인식 및 크롭 (stream=True: 항목이 도착하는 대로 크롭)
+        # upscale_policy: 배경 제거 전에 크롭 업스케일 (None이면 하지 않음)
+        # camera: 카메라 키 — 같은 카메라의 이전 캡처가 있으면 바뀐 영역의 가구만 다시 처리
+        # room: 방 이름/종류 ("안방화장실", "kitchen") — 방에 맞는 가구 목록으로 인식
+        # 비교 기준은 처리에 성공해서 _capture_cache가 갱신된 뒤에만 바꿈
+        # (실패한 캡처가 기준이 되면 다음 캡처가 오래된 결과를 재사용하게 됨)
+        if camera is not None:
+            signature = self.change_detector.signature(image)
+            change = self.change_detector.compare(camera, signature, update=False)
+            if (
+                change is not None
+                and camera in self._capture_cache
+                and change.ratio <= self.full_change_ratio
+            ):
+                result = self._process_1_incremental(
+                    camera, image, change, upscale_policy, room
+                )
+                self.change_detector.remember(camera, signature)
+                return result
 
-    def process_1(self, image):
-        # 단계 1: 가구 인식 및 크롭
         print("\n🔥 [단계 1] 가구 인식 및 크롭 시작...")
-        step1_result = FurnitureCropper(self.open_ai_client).process(image)
+        cropper = FurnitureCropper(
+            self.open_ai_client,
+            archive=self.crop_archive,
+            tiling=self.tiling,
+            room=room,
+        )
+        if stream:
+            step1_result = cropper.process_streaming(image)
+        else:
+            step1_result = cropper.process(image)
 
         if not step1_result:
             print("❌ 단계 1 실패: 가구 인식에 실패했습니다.")
@@ -70,16 +160,161 @@ class ImageProcessor:
         print(
             f"✅ 단계 1 완료: {len(step1_result['detected_furniture'])}개 가구 처리됨"
         )
+        cropped_images = step1_result.get("cropped_images")
+        if upscale_policy is not None:
+            cropped_images = [
+                Image.open(io.BytesIO(data))
+                for data in self._upscale_stage(cropped_images, upscale_policy)
+            ]
+
         # 단계 2: 배경 제거
         print("\n🔥 [단계 2] Bria 배경 제거 시작...")
-        step2_result = BackgroundRemover(self.replicate_client).process(
-            step1_result.get("cropped_images")
-        )
+        remover = BackgroundRemover(self.replicate_client)
+        step2_result = remover.process(cropped_images)
+
+        detected = step1_result["detected_furniture"]
+        furniture_list = [
+            detected[i] if i < len(detected) else None
+            for i in remover.processed_indices
+        ]
+        if camera is not None:
+            self._capture_cache[camera] = list(zip(furniture_list, step2_result))
+            self.change_detector.remember(camera, signature)
+
+        # 선행 3D 변환: 사용자가 고르기 전에 중요한 가구부터 시작
+        if self.speculative.budget > 0:
+            self.speculative.start(step2_result, furniture_list)
         return step2_result
 
-    def process_2(self, selected_images):
+    def _detect_regions(self, cropper, img, regions):
+        """바뀐 영역마다 동시에 가구 인식 → 전체 캡처 좌표의 가구 목록"""
+
+        def detect(box):
+            region = pil_to_filelike(img.crop(tuple(box)))
+            found = cropper._detect_furniture_with_gpt_filtered(region) or []
+            return offset_furniture(found, box[0], box[1])
+
+        with ThreadPoolExecutor(max_workers=max(1, len(regions))) as executor:
+            return [f for found in executor.map(detect, regions) for f in found]
+
+    def _process_1_incremental(self, camera, image, change, upscale_policy, room):
+        """이전 캡처 결과를 재사용하고 바뀐 영역에 걸친 가구만 인식/크롭/배경 제거"""
+        cached = self._capture_cache[camera]
+        if change.unchanged:
+            print("\n♻️  이전 캡처와 같음 → 캐시된 결과 재사용")
+            return [data for _, data in cached]
+
+        kept = [
+            (furniture, data)
+            for furniture, data in cached
+            if furniture is None or not change.overlaps(furniture["box"])
+        ]
+        regions = change.regions()
+        print(
+            f"\n🔥 [증분] 바뀐 영역 {len(regions)}곳 ({change.ratio:.1%}) → "
+            f"가구 {len(kept)}개 재사용, {len(cached) - len(kept)}개 다시 처리"
+        )
+
+        cropper = FurnitureCropper(self.open_ai_client, room=room)
+        img = load_pil_image(image)
+        img_width, img_height = img.size
+
+        # 영역에 일부 걸쳤지만 바뀌지 않은 가구는 캐시된 결과 사용
+        detected = [
+            f
+            for f in self._detect_regions(cropper, img, regions)
+            if change.overlaps(f["box"])
+        ]
+        cropper._categorize_furniture_by_size(detected, img_width, img_height)
+
+        # 재사용할 가구와 새로 찾은 가구를 합쳐서 중복 제거
+        kept_furniture = [f for f, _ in kept if f is not None]
+        merged = cropper._filter_overlapping_furniture(
+            kept_furniture + detected, overlap_threshold=0.6
+        )
+        merged_ids = {id(f) for f in merged}
+        kept_ids = {id(f) for f in kept_furniture}
+        kept = [(f, data) for f, data in kept if f is None or id(f) in merged_ids]
+        new_furniture = [f for f in merged if id(f) not in kept_ids]
+
+        new_entries = []
+        if new_furniture:
+            cropped_images = [crop for crop, _ in crop_many(img, new_furniture)]
+            if upscale_policy is not None:
+                cropped_images = [
+                    Image.open(io.BytesIO(data))
+                    for data in self._upscale_stage(cropped_images, upscale_policy)
+                ]
+            remover = BackgroundRemover(self.replicate_client)
+            removed = remover.process(cropped_images)
+            new_entries = [
+                (new_furniture[i], data)
+                for i, data in zip(remover.processed_indices, removed)
+            ]
+            if self.speculative.budget > 0 and new_entries:
+                self.speculative.start(
+                    [data for _, data in new_entries], [f for f, _ in new_entries]
+                )
+
+        entries = sorted(
+            kept + new_entries,
+            key=lambda entry: (entry[0] or {}).get("area", 0),
+            reverse=True,
+        )
+        self._capture_cache[camera] = entries
+        print(f"✅ [증분] 완료: 새로 처리 {len(new_entries)}개, 전체 {len(entries)}개")
+        return [data for _, data in entries]
+
+    def _model_stage(self, selected_images, indices, upscale_policy):
+        """선택된 이미지 중 indices만 3D 변환 → {인덱스: 결과}"""
+        if not indices:
+            return {}
+        images = [selected_images[i] for i in indices]
+        if upscale_policy is not None:
+            images = [
+                io.BytesIO(data) for data in self._upscale_stage(images, upscale_policy)
+            ]
+
         print("\n🔥 [단계 3] HunYuan3D 3D 변환 시작...")
-        processed_files = ImgToModeling(self.replicate_client).process(selected_images)
+        processed = ImgToModeling(self.replicate_client).process(images) or []
+        return dict(zip(indices, processed))
+
+    def process_2(self, selected_images, upscale_policy=None):
+        # upscale_policy: HunYuan3D 입력 전에 업스케일 (None이면 하지 않음)
+        # 선행 3D 작업이 있는 이미지는 그 결과를 사용 (업스케일 없이 시작된 결과),
+        # 선택되지 않은 선행 작업은 취소하고 선택된 작업은 대화형으로 올림
+        # 이전에 변환한 것과 같은 이미지(증분 처리에서 재사용된 가구)는 저장된 GLB 사용
+        digests = [image_digest(image) for image in selected_images]
+        reused = {}
+        for i, digest in enumerate(digests):
+            cached = self._model_cache.get(digest)
+            if isinstance(cached, str) and os.path.exists(cached):
+                reused[i] = cached
+        if reused:
+            print(f"\n♻️  이전 3D 결과 재사용: {len(reused)}개")
+
+        self.speculative.confirm(selected_images)
+        remaining = [
+            i
+            for i, image in enumerate(selected_images)
+            if i not in reused and self.speculative.attach(image) is None
+        ]
+        computed = self._model_stage(selected_images, remaining, upscale_policy)
+
+        # 선행 작업이 실패한 이미지는 다시 실행
+        resolved, retry = self.speculative.resolve(selected_images)
+        retry = [i for i in retry if i not in computed and i not in reused]
+        computed.update(self._model_stage(selected_images, retry, upscale_policy))
+
+        processed_files = []
+        for i in range(len(selected_images)):
+            for results in (reused, resolved, computed):
+                if i in results:
+                    # 실패/취소된 결과(dict)는 저장하지 않음 → 다음에 다시 변환
+                    if isinstance(results[i], str):
+                        self._model_cache[digests[i]] = results[i]
+                    processed_files.append(results[i])
+                    break
 
         if not processed_files:
             print("❌ 단계 3 실패: 3D 변환에 실패했습니다.")
@@ -502,38 +737,145 @@ class FurnitureRebuilder:
         return cropped_images
 
 
+# GPT 구조화 출력(JSON Schema) — 스트리밍/멀티뷰 모드에서 응답 형식을 강제
+FURNITURE_ITEM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "category": {"type": "string", "enum": ["large", "medium", "small"]},
+        "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+        "box": {"type": "array", "items": {"type": "number"}},
+        "confidence": {"type": "string", "enum": ["high", "medium", "low"]},
+    },
+    "required": ["name", "category", "priority", "box", "confidence"],
+    "additionalProperties": False,
+}
+
+FURNITURE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "furniture_detection",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "furniture_list": {"type": "array", "items": FURNITURE_ITEM_SCHEMA}
+            },
+            "required": ["furniture_list"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+MULTI_VIEW_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "multi_view_furniture_detection",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "views": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "view_index": {"type": "integer"},
+                            "furniture_list": {
+                                "type": "array",
+                                "items": FURNITURE_ITEM_SCHEMA,
+                            },
+                        },
+                        "required": ["view_index", "furniture_list"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["views"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class FurnitureStreamParser:
+    """스트리밍 응답에서 furniture_list 배열의 항목이 완성될 때마다 꺼내는 증분 JSON 파서"""
+
+    ITEM_DEPTH = 3  # {"furniture_list": [ {항목} ]}
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.item_start = None
+
+    def feed(self, chunk):
+        """새 텍스트 조각을 넣고 완성된 항목(dict) 목록 반환"""
+        self.text += chunk
+        items = []
+
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+                if ch == "{" and self.depth == self.ITEM_DEPTH:
+                    self.item_start = self.pos
+            elif ch in "}]":
+                if ch == "}" and self.depth == self.ITEM_DEPTH and self.item_start is not None:
+                    try:
+                        items.append(json.loads(self.text[self.item_start : self.pos + 1]))
+                    except json.JSONDecodeError as e:
+                        # 깨진 항목 하나만 버리고 나머지는 계속 처리
+                        print(f"⚠️  항목 파싱 실패: {e}")
+                    self.item_start = None
+                self.depth -= 1
+            self.pos += 1
+
+        # 이미 처리한 텍스트는 버려서 버퍼가 커지지 않도록
+        keep_from = self.item_start if self.item_start is not None else self.pos
+        self.text = self.text[keep_from:]
+        self.pos -= keep_from
+        if self.item_start is not None:
+            self.item_start = 0
+        return items
+
+
 class FurnitureCropper:
     GPT_MODEL = "gpt-4o"
 
-    def __init__(self, open_ai_client):
+    def __init__(self, open_ai_client, archive=None, tiling=None, room=None):
+        """
+        archive: CropArchive — 지정하면 크롭을 낱개 PNG 대신 아카이브에 추가
+        tiling: TilePlan — 지정하면 큰 이미지는 타일로 나눠 인식 (detect_furniture_tiled)
+        room: 방 이름("안방화장실") / 방 종류("bathroom") / RoomProfile — 프롬프트 가구 목록 선택
+        """
         self.open_ai_client = open_ai_client
+        self.archive = archive
+        self.tiling = tiling
+        self.profile = get_room_profile(room)
+        self.crop_writer = None  # 크롭 PNG 백그라운드 저장 (첫 저장 때 생성)
 
     def write_prompt(self, img_width, img_height):
-        # GPT 프롬프트 (주요 가구 중심)
+        # GPT 프롬프트 (방 종류별 주요 가구 중심, 기본값은 거실)
         return f"""
-당신은 인테리어 전문가입니다. 이 거실 사진에서 주요 가구들을 정확히 찾아주세요.
+당신은 인테리어 전문가입니다. 이 {self.profile.label} 사진에서 주요 가구들을 정확히 찾아주세요.
 
 이미지 크기: {img_width} x {img_height} 픽셀
 
 우선순위별 가구 목록:
 
-🏠 대형 가구 (최우선):
-- 소파, 쇼파 (sofa, couch, sectional)
-- 큰 테이블 (dining table, large coffee table)
-- 큰 선반/책장 (bookshelf, large cabinet)
-- 침대 (bed, mattress)
-
-🪑 중형 가구:
-- 의자 (chair, armchair, recliner)
-- 작은 테이블 (side table, coffee table)
-- TV/모니터 (television, monitor)
-- 사다리 (ladder, step)
-
-🧸 소형 가구/소품:
-- 조명 (lamp, floor lamp)
-- 식물/화분 (plant, pot)
-- 장식품 (decoration, vase)
-- 쿠션 (cushion, pillow)
+{self.profile.furniture_guide()}
 
 중요 지침:
 1. 큰 가구를 우선적으로 인식
@@ -571,7 +913,7 @@ JSON 형식으로만 응답:
 
         # 1. 가구 인식 (중복 제거 포함)
         print("\n📍 1단계: 가구 인식 및 중복 제거")
-        furniture_list = self._detect_furniture_with_gpt_filtered(image_path)
+        furniture_list = self.detect(image_path)
 
         if not furniture_list:
             print("❌ 가구를 찾지 못했습니다.")
@@ -585,8 +927,7 @@ JSON 형식으로만 응답:
 
         # 3. 상대적 크기 분석 추가
         print("\n📍 3단계: 상대적 크기 분석")
-        with Image.open(image_path) as img:
-            img_width, img_height = img.size
+        img_width, img_height = load_pil_image(image_path).size
 
         size_analysis = self.calculate_size_analysis(
             furniture_list, img_width, img_height
@@ -622,10 +963,80 @@ JSON 형식으로만 응답:
 
         return result_data
 
-    def _detect_furniture_with_gpt_filtered(self, image_path):
-        """GPT API를 사용하여 가구를 인식하고 중복 제거"""
-        print(f"🔍 이미지 분석 시작: {image_path}")
+    def process_streaming(self, image_path, on_crop=None, overlap_threshold=0.6):
+        """
+        단계 1 (스트리밍): 가구 항목이 도착하는 즉시 중복 검사 후 크롭
+
+        on_crop(furniture, cropped_img): 크롭이 끝날 때마다 호출 (다음 단계로 바로 넘길 때 사용)
+        중복 제거는 도착 순서 기준 — 이미 선택된 가구와 많이 겹치면 건너뜀
+        """
+        print("=" * 70)
+        print("🚀 단계 1 (스트리밍): GPT 가구 인식 + 즉시 크롭")
+        print("=" * 70)
+
+        img = open_image_by_type(image_path)
+        img_width, img_height = img.size
+        start = time.time()
+
+        furniture_list = []
+        cropped_images = []
+        for furniture in self.detect_furniture_streaming(image_path):
+            overlapped = next(
+                (
+                    selected
+                    for selected in furniture_list
+                    if calculate_overlap_ratio(furniture["box"], selected["box"])
+                    > overlap_threshold
+                ),
+                None,
+            )
+            if overlapped is not None:
+                print(f"❌ {furniture['name']} - {overlapped['name']}와 겹쳐서 제외")
+                continue
+
+            try:
+                cropped_img, _ = self._crop_centered(img, furniture)
+            except Exception as e:
+                print(f"❌ {furniture['name']} 크롭 실패: {e}")
+                continue
+
+            furniture_list.append(furniture)
+            cropped_images.append(cropped_img)
+            if len(cropped_images) == 1:
+                print(f"⏱️  첫 크롭까지 {time.time() - start:.2f}초")
+            if on_crop is not None:
+                on_crop(furniture, cropped_img)
+
+        if not furniture_list:
+            print("❌ 가구를 찾지 못했습니다.")
+            return None
+
+        size_analysis = self.calculate_size_analysis(
+            furniture_list, img_width, img_height
+        )
 
+        print(f"✅ 단계 1 완료: {len(cropped_images)}개 크롭 ({time.time() - start:.2f}초)")
+        return {
+            "detected_furniture": furniture_list,
+            "cropped_images": cropped_images,
+            "size_analysis": size_analysis,
+            "summary": {
+                "total_detected": len(furniture_list),
+                "successfully_cropped": len(cropped_images),
+                "large_furniture": len(
+                    [f for f in furniture_list if f.get("category") == "large"]
+                ),
+                "medium_furniture": len(
+                    [f for f in furniture_list if f.get("category") == "medium"]
+                ),
+                "small_furniture": len(
+                    [f for f in furniture_list if f.get("category") == "small"]
+                ),
+            },
+        }
+
+    def _encode_image(self, image_path):
+        """이미지 크기와 Base64 문자열 반환"""
         if isinstance(image_path, str):
             # 파일 경로
             with Image.open(image_path) as img:
@@ -648,27 +1059,77 @@ JSON 형식으로만 응답:
         else:
             raise TypeError(f"지원하지 않는 타입: {type(image_path)}")
 
+        return img_width, img_height, base64_image
+
+    def _build_messages(self, img_width, img_height, base64_image, detail="high"):
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": self.write_prompt(img_width, img_height),
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "detail": detail,
+                        },
+                    },
+                ],
+            }
+        ]
+
+    def _validate_furniture_item(self, item, img_width, img_height):
+        """좌표 검증 및 정리 (유효하지 않으면 None)"""
+        name = item.get("name", "unknown")
+        category = item.get("category", "medium")
+        priority = item.get("priority", "medium")
+        box = item.get("box", [])
+        confidence = item.get("confidence", "medium")
+
+        if len(box) != 4:
+            print(f"❌ {name}: 좌표 형식 오류")
+            return None
+
+        x1, y1, x2, y2 = box
+
+        # 좌표 범위 확인 및 수정
+        x1 = max(0, min(x1, img_width - 1))
+        x2 = max(x1 + 10, min(x2, img_width))
+        y1 = max(0, min(y1, img_height - 1))
+        y2 = max(y1 + 10, min(y2, img_height))
+
+        # 최소 크기 확인 (50x50 픽셀 이상)
+        if (x2 - x1) < 50 or (y2 - y1) < 50:
+            print(f"⚠️  {name}: 너무 작음 ({x2-x1}x{y2-y1})")
+            return None
+
+        area = (x2 - x1) * (y2 - y1)
+        print(
+            f"✅ {name} ({category}/{priority}): [{x1},{y1},{x2},{y2}] - {x2-x1}x{y2-y1}"
+        )
+        return {
+            "name": name,
+            "category": category,
+            "priority": priority,
+            "box": [x1, y1, x2, y2],
+            "confidence": confidence,
+            "area": area,
+            "size": f"{x2-x1}x{y2-y1}",
+        }
+
+    def _request_furniture(self, image_path, detail="high"):
+        """GPT 가구 인식 요청 → (검증 전 가구 목록, 이미지 너비, 높이), 파싱 실패 시 목록은 None"""
+        img_width, img_height, base64_image = self._encode_image(image_path)
+
         # GPT API 호출
         response = self.open_ai_client.chat.completions.create(
             model=self.GPT_MODEL,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": self.write_prompt(img_width, img_height),
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "high",
-                            },
-                        },
-                    ],
-                }
-            ],
+            messages=self._build_messages(
+                img_width, img_height, base64_image, detail=detail
+            ),
             max_tokens=3000,
             temperature=0.1,
         )
@@ -683,69 +1144,335 @@ JSON 형식으로만 응답:
         try:
             data = json.loads(json_str)
             furniture_list = data.get("furniture_list", [])
-
             print(f"✅ 총 {len(furniture_list)}개 가구 발견")
+            return furniture_list, img_width, img_height
 
-            # 좌표 검증 및 정리
-            valid_furniture = []
-            for item in furniture_list:
-                name = item.get("name", "unknown")
-                category = item.get("category", "medium")
-                priority = item.get("priority", "medium")
-                box = item.get("box", [])
-                confidence = item.get("confidence", "medium")
-
-                if len(box) == 4:
-                    x1, y1, x2, y2 = box
-
-                    # 좌표 범위 확인 및 수정
-                    x1 = max(0, min(x1, img_width - 1))
-                    x2 = max(x1 + 10, min(x2, img_width))
-                    y1 = max(0, min(y1, img_height - 1))
-                    y2 = max(y1 + 10, min(y2, img_height))
-
-                    # 최소 크기 확인 (50x50 픽셀 이상)
-                    if (x2 - x1) >= 50 and (y2 - y1) >= 50:
-                        area = (x2 - x1) * (y2 - y1)
-                        valid_furniture.append(
-                            {
-                                "name": name,
-                                "category": category,
-                                "priority": priority,
-                                "box": [x1, y1, x2, y2],
-                                "confidence": confidence,
-                                "area": area,
-                                "size": f"{x2-x1}x{y2-y1}",
-                            }
-                        )
-                        print(
-                            f"✅ {name} ({category}/{priority}): [{x1},{y1},{x2},{y2}] - {x2-x1}x{y2-y1}"
-                        )
-                    else:
-                        print(f"⚠️  {name}: 너무 작음 ({x2-x1}x{y2-y1})")
-                else:
-                    print(f"❌ {name}: 좌표 형식 오류")
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON 파싱 실패: {e}")
+            print(f"응답 내용: {response_text[:500]}...")
+            return None, img_width, img_height
 
-            # 크기별 분류
-            large_furniture, medium_furniture, small_furniture = (
-                self._categorize_furniture_by_size(
-                    valid_furniture, img_width, img_height
-                )
-            )
+    def _detect_furniture_with_gpt_filtered(self, image_path):
+        """GPT API를 사용하여 가구를 인식하고 중복 제거"""
+        print(f"🔍 이미지 분석 시작: {image_path}")
 
-            # 중복 제거 (큰 가구부터 우선)
-            all_furniture = large_furniture + medium_furniture + small_furniture
-            filtered_furniture = self._filter_overlapping_furniture(
-                all_furniture, overlap_threshold=0.6
-            )
+        furniture_list, img_width, img_height = self._request_furniture(image_path)
+        if furniture_list is None:
+            return []
+        return self._finalize_furniture(furniture_list, img_width, img_height)
+
+    def detect_furniture_tiled(self, image_path, plan=None):
+        """
+        큰 캡처/파노라마용 타일 인식 (저해상도 전체 → 관심 영역 타일 동시 인식 → 전체 좌표로 병합)
+
+        plan: TilePlan (기본값: TilePlan())
+        요청마다 이미지 크기가 plan.tile_size 이하라서 작은 가구도 원본 해상도로 보이고 전송량은 일정
+        """
+        plan = plan or TilePlan()
+        img = load_pil_image(image_path)
+        img.load()
+        img_width, img_height = img.size
+
+        # 1. 저해상도 전체 인식 → 큰 가구 + 관심 영역
+        scale = min(1.0, plan.coarse_side / float(max(img_width, img_height)))
+        coarse_img = img.resize(
+            (max(1, int(img_width * scale)), max(1, int(img_height * scale))),
+            Image.BOX,
+        )
+        print(f"🔍 저해상도 인식: {coarse_img.width}x{coarse_img.height}")
+        raw, _, _ = self._request_furniture(
+            io.BytesIO(encode_jpeg(coarse_img)), detail=plan.coarse_detail
+        )
+        coarse = []
+        for item in scale_furniture(raw or [], 1.0 / scale):
+            furniture = self._validate_furniture_item(item, img_width, img_height)
+            if furniture is not None:
+                coarse.append(furniture)
+
+        # 2. 관심 영역에 걸친 타일만 동시에 인식
+        tiles = plan.select_tiles(
+            img_width,
+            img_height,
+            [f["box"] for f in coarse],
+            coarse_pixels=np.asarray(coarse_img.convert("RGB"), dtype=np.float32),
+        )
+        print(f"🧩 타일 {len(tiles)}개 인식 (타일 {plan.tile_size}px, 겹침 {plan.overlap:.0%})")
+
+        def detect_tile(tile):
+            data = encode_jpeg(img.crop(tuple(tile)))
+            raw, tile_width, tile_height = self._request_furniture(io.BytesIO(data))
+            found = []
+            for item in raw or []:
+                furniture = self._validate_furniture_item(item, tile_width, tile_height)
+                if furniture is not None:
+                    found.append(furniture)
+            return place_tile_detections(found, tile, img_width, img_height)
+
+        with ThreadPoolExecutor(max_workers=plan.max_workers) as executor:
+            fine = [f for found in executor.map(detect_tile, tiles) for f in found]
+
+        # 3. 타일 경계에서 잘린 조각 합치기 → 저해상도 결과와 교차 억제 → 중복 제거
+        merged = suppress_coarse(coarse, merge_tile_detections(fine))
+        print(f"🧮 병합: 저해상도 {len(coarse)}개 + 타일 {len(fine)}개 → {len(merged)}개")
+        return self._finalize_furniture(merged, img_width, img_height)
+
+    def detect(self, image_path):
+        """tiling이 설정되어 있고 이미지가 충분히 크면 타일 인식, 아니면 한 번에 인식"""
+        if self.tiling is not None:
+            width, height = load_pil_image(image_path).size
+            if self.tiling.needs_tiling(width, height):
+                return self.detect_furniture_tiled(image_path, self.tiling)
+        return self._detect_furniture_with_gpt_filtered(image_path)
+
+    def _finalize_furniture(self, furniture_list, img_width, img_height):
+        """좌표 검증 → 크기별 분류 → 중복 제거"""
+        valid_furniture = []
+        for item in furniture_list:
+            furniture = self._validate_furniture_item(item, img_width, img_height)
+            if furniture is not None:
+                valid_furniture.append(furniture)
+
+        # 크기별 분류
+        large_furniture, medium_furniture, small_furniture = (
+            self._categorize_furniture_by_size(valid_furniture, img_width, img_height)
+        )
+
+        # 중복 제거 (큰 가구부터 우선)
+        all_furniture = large_furniture + medium_furniture + small_furniture
+        filtered_furniture = self._filter_overlapping_furniture(
+            all_furniture, overlap_threshold=0.6
+        )
+
+        print(f"📋 최종 선택된 가구: {len(filtered_furniture)}개")
+        return filtered_furniture
 
-            print(f"📋 최종 선택된 가구: {len(filtered_furniture)}개")
-            return filtered_furniture
+    def detect_furniture_streaming(self, image_path):
+        """
+        구조화 출력 + 스트리밍으로 가구 인식
+
+        응답 전체를 기다리지 않고 항목 하나가 완성될 때마다 검증된 가구 dict를 yield
+        응답 뒷부분이 깨져도 그 전까지 완성된 항목은 그대로 사용
+        """
+        print(f"🔍 이미지 분석 시작 (스트리밍): {image_path}")
 
+        img_width, img_height, base64_image = self._encode_image(image_path)
+
+        stream = self.open_ai_client.chat.completions.create(
+            model=self.GPT_MODEL,
+            messages=self._build_messages(img_width, img_height, base64_image),
+            max_tokens=3000,
+            temperature=0.1,
+            response_format=FURNITURE_RESPONSE_FORMAT,
+            stream=True,
+        )
+
+        parser = FurnitureStreamParser()
+        total_area = img_width * img_height
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                for item in parser.feed(delta):
+                    furniture = self._validate_furniture_item(
+                        item, img_width, img_height
+                    )
+                    if furniture is None:
+                        continue
+                    furniture["area_ratio"] = furniture["area"] / total_area
+                    yield furniture
+        except Exception as e:
+            # 스트림이 중간에 끊겨도 이미 넘긴 항목은 유효
+            print(f"❌ 스트리밍 중단: {e}")
+
+    # -------------------------------------------------------------------------
+    # 멀티뷰: 여러 캡처를 한 번의 요청으로 인식
+    # -------------------------------------------------------------------------
+
+    MAX_VIEWS_PER_REQUEST = 8
+
+    def write_multi_view_prompt(self, image_sizes):
+        # 공통 지침은 요청당 한 번만, 이미지별로는 번호와 크기만 전달 (가구 목록은 방 종류별)
+        size_lines = "\n".join(
+            f"- 이미지 {i}: {w} x {h} 픽셀" for i, (w, h) in enumerate(image_sizes)
+        )
+        return f"""
+당신은 인테리어 전문가입니다. 같은 공간({self.profile.label})을 여러 시점에서 찍은 사진 {len(image_sizes)}장이 순서대로 주어집니다.
+각 사진마다 주요 가구들을 정확히 찾아주세요.
+
+{size_lines}
+
+우선순위: {self.profile.priority_line()}
+
+중요 지침:
+1. 큰 가구를 우선적으로 인식
+2. 각 가구는 충분히 큰 크기여야 함 (최소 50x50 픽셀)
+3. 명확하게 구분되는 개별 가구만 포함
+4. 애매하거나 일부만 보이는 것은 제외
+5. 사진마다 views 항목 하나씩, view_index는 위 이미지 번호와 동일
+6. box 좌표 [x1, y1, x2, y2]는 해당 사진 기준 픽셀 (0 ≤ x1 < x2 ≤ 가로, 0 ≤ y1 < y2 ≤ 세로)
+        """
+
+    def _build_multi_view_body(self, encoded_views):
+        """encoded_views: [(img_width, img_height, base64_image), ...] → chat completion 요청 본문"""
+        content = []
+        for i, (_, _, base64_image) in enumerate(encoded_views):
+            content.append({"type": "text", "text": f"이미지 {i}"})
+            content.append(
+                {
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}",
+                        "detail": "high",
+                    },
+                }
+            )
+        image_sizes = [(w, h) for w, h, _ in encoded_views]
+        return {
+            "model": self.GPT_MODEL,
+            "messages": [
+                {"role": "system", "content": self.write_multi_view_prompt(image_sizes)},
+                {"role": "user", "content": content},
+            ],
+            "max_tokens": min(3000 * len(encoded_views), 16000),
+            "temperature": 0.1,
+            "response_format": MULTI_VIEW_RESPONSE_FORMAT,
+        }
+
+    def _parse_multi_view_response(self, response_text, image_sizes):
+        """응답 JSON → 이미지별 가구 목록 (누락된 시점은 빈 목록)"""
+        results = [[] for _ in image_sizes]
+        try:
+            data = json.loads(response_text)
         except json.JSONDecodeError as e:
             print(f"❌ JSON 파싱 실패: {e}")
-            print(f"응답 내용: {response_text[:500]}...")
-            return []
+            return results
+
+        for view in data.get("views", []):
+            index = view.get("view_index")
+            if not isinstance(index, int) or not 0 <= index < len(image_sizes):
+                print(f"⚠️  잘못된 view_index: {index}")
+                continue
+            img_width, img_height = image_sizes[index]
+            results[index] = self._finalize_furniture(
+                view.get("furniture_list", []), img_width, img_height
+            )
+        return results
+
+    def _chunk_views(self, images, views_per_request):
+        views_per_request = min(views_per_request, self.MAX_VIEWS_PER_REQUEST)
+        for start in range(0, len(images), views_per_request):
+            yield start, images[start : start + views_per_request]
+
+    def detect_furniture_multi_view(self, images, views_per_request=8):
+        """
+        여러 시점 캡처를 묶어서 인식 (요청당 최대 views_per_request장)
+
+        반환: 입력 순서와 같은 이미지별 가구 목록
+        """
+        print(f"🔍 멀티뷰 인식 시작: {len(images)}장")
+        results = []
+        for start, chunk in self._chunk_views(images, views_per_request):
+            encoded_views = [self._encode_image(image) for image in chunk]
+            response = self.open_ai_client.chat.completions.create(
+                **self._build_multi_view_body(encoded_views)
+            )
+            response_text = response.choices[0].message.content
+            print(
+                f"📝 이미지 {start}~{start + len(chunk) - 1} 응답 받음 (길이: {len(response_text)}자)"
+            )
+            results.extend(
+                self._parse_multi_view_response(
+                    response_text, [(w, h) for w, h, _ in encoded_views]
+                )
+            )
+        return results
+
+    def write_batch_file(self, images, batch_path, views_per_request=8):
+        """
+        OpenAI Batch API용 JSONL 파일 작성 (야간 일괄 처리용)
+
+        결과 해석에 필요한 이미지 크기는 batch_path + ".manifest.json"에 함께 저장
+        """
+        manifest = {}
+        with open(batch_path, "w", encoding="utf-8") as f:
+            for start, chunk in self._chunk_views(images, views_per_request):
+                encoded_views = [self._encode_image(image) for image in chunk]
+                custom_id = f"views-{start}"
+                request = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._build_multi_view_body(encoded_views),
+                }
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+                manifest[custom_id] = {
+                    "start": start,
+                    "image_sizes": [(w, h) for w, h, _ in encoded_views],
+                }
+
+        with open(batch_path + ".manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+        print(f"💾 배치 요청 {len(manifest)}개 저장: {batch_path}")
+        return manifest
+
+    def submit_batch(self, batch_path):
+        """배치 파일 업로드 후 작업 생성 → batch id"""
+        with open(batch_path, "rb") as f:
+            batch_file = self.open_ai_client.files.create(file=f, purpose="batch")
+        batch = self.open_ai_client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        print(f"📤 배치 작업 생성: {batch.id}")
+        return batch.id
+
+    def collect_batch(self, batch_id, batch_path):
+        """완료된 배치 결과 → 이미지별 가구 목록 (아직 진행 중이면 None)"""
+        batch = self.open_ai_client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            print(f"⏳ 배치 상태: {batch.status}")
+            return None
+
+        with open(batch_path + ".manifest.json", "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        total = sum(len(entry["image_sizes"]) for entry in manifest.values())
+        results = [[] for _ in range(total)]
+
+        # 모든 요청이 실패해도 "completed"가 되며 이때는 output_file_id가 없음
+        if batch.error_file_id:
+            errors = self.open_ai_client.files.content(batch.error_file_id).text
+            for line in errors.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                error = (record.get("response") or {}).get("body") or record.get("error")
+                print(f"❌ 배치 요청 실패: {record.get('custom_id')} ({error})")
+        if not batch.output_file_id:
+            print("❌ 배치 결과 파일이 없습니다 (모든 요청 실패).")
+            return results
+
+        output = self.open_ai_client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            entry = manifest.get(record.get("custom_id"))
+            response = record.get("response") or {}
+            if entry is None or response.get("status_code") != 200:
+                print(f"❌ 배치 요청 실패: {record.get('custom_id')}")
+                continue
+
+            response_text = response["body"]["choices"][0]["message"]["content"]
+            image_sizes = [tuple(size) for size in entry["image_sizes"]]
+            views = self._parse_multi_view_response(response_text, image_sizes)
+            results[entry["start"] : entry["start"] + len(views)] = views
+        return results
 
     def _filter_overlapping_furniture(self, furniture_list, overlap_threshold=0.7):
         """중복되는 가구 제거 (큰 가구 우선, 겹치는 비율이 높은 작은 가구 제거)"""
@@ -912,19 +1639,38 @@ JSON 형식으로만 응답:
 
         return size_analysis
 
+    def _crop_centered(self, img, furniture):
+        """가구 하나를 카테고리별 여백을 두고 중심 맞춤 크롭 → (크롭 이미지, 크롭 좌표)"""
+        box = tuple(compute_crop_boxes([furniture], *img.size)[0].tolist())
+        return img.crop(box), box
+
+    def wait_for_crops(self):
+        """백그라운드 크롭 저장이 끝날 때까지 대기 → 저장된 경로 목록"""
+        if self.crop_writer is None:
+            return []
+        return self.crop_writer.wait()
+
     def crop_furniture_centered_filtered(
-        self, image_path, furniture_list, output_dir="furniture_crops_filtered"
+        self,
+        image_path,
+        furniture_list,
+        output_dir="furniture_crops_filtered",
+        save=True,
+        compress_level=1,
+        run_id=None,
     ):
-        """각 가구를 중심에 맞춰서 크롭 (필터링된 버전)"""
-        # 출력 디렉토리 생성
-
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        """
+        각 가구를 중심에 맞춰서 크롭 (필터링된 버전)
 
+        크롭 좌표는 한 번에 계산하고 크롭 이미지는 메모리에서 바로 반환
+        save=True면 PNG 저장은 백그라운드 스레드에서 진행 (wait_for_crops로 대기)
+        compress_level: PNG 압축 수준 (0~9)
+        run_id: 아카이브에 기록할 실행 ID (기본값: 새로 생성)
+        """
         # 이미지 열기
         img = open_image_by_type(image_path)
         img_width, img_height = img.size
-        if isinstance(img, str):
+        if isinstance(image_path, str):
             base_name = os.path.splitext(os.path.basename(image_path))[0]
         else:
             base_name = "IMG_FROM_RHINO"
@@ -935,78 +1681,52 @@ JSON 형식으로만 응답:
             furniture_list, key=lambda x: x.get("area", 0), reverse=True
         )
 
-        cropped_images = []
+        if save and self.crop_writer is None:
+            self.crop_writer = CropWriter(compress_level=compress_level)
+        if save and self.archive is not None:
+            run_id = run_id or new_run_id()
 
-        for i, furniture in enumerate(sorted_furniture):
+        start = time.time()
+        try:
+            crops = crop_many(img, sorted_furniture)
+        except Exception as e:
+            print(f"❌ 크롭 실패: {e}")
+            return []
+
+        cropped_images = []
+        for i, (furniture, (cropped_img, box)) in enumerate(
+            zip(sorted_furniture, crops)
+        ):
             name = furniture["name"]
-            category = furniture.get("category", "medium")
             priority = furniture.get("priority", "medium")
-            x1, y1, x2, y2 = furniture["box"]
             area = furniture.get("area", 0)
-
-            try:
-                # 원본 가구 크기
-                furniture_width = x2 - x1
-                furniture_height = y2 - y1
-                furniture_center_x = (x1 + x2) // 2
-                furniture_center_y = (y1 + y2) // 2
-
-                # 크롭 크기 결정 (카테고리별 여백 조정)
-                if category == "large":
-                    margin_ratio = 0.05  # 큰 가구는 5% 여백
-                elif category == "medium":
-                    margin_ratio = 0.1  # 중간 가구는 10% 여백
-                else:
-                    margin_ratio = 0.15  # 작은 가구는 15% 여백
-
-                margin_x = int(furniture_width * margin_ratio)
-                margin_y = int(furniture_height * margin_ratio)
-                crop_width = furniture_width + 2 * margin_x
-                crop_height = furniture_height + 2 * margin_y
-
-                # 중심 맞춤 크롭 좌표 계산
-                crop_x1 = max(0, furniture_center_x - crop_width // 2)
-                crop_y1 = max(0, furniture_center_y - crop_height // 2)
-                crop_x2 = min(img_width, crop_x1 + crop_width)
-                crop_y2 = min(img_height, crop_y1 + crop_height)
-
-                # 경계 조정
-                if crop_x2 - crop_x1 < crop_width:
-                    crop_x1 = max(0, crop_x2 - crop_width)
-                if crop_y2 - crop_y1 < crop_height:
-                    crop_y1 = max(0, crop_y2 - crop_height)
-
-                # 이미지 크롭
-                cropped_img = img.crop((crop_x1, crop_y1, crop_x2, crop_y2))
-
-                # 파일명 정리 (우선순위 포함)
-                safe_name = name.replace(" ", "_").replace("/", "_").replace("\\", "_")
-                filename = f"{base_name}_{i+1:02d}_{priority}_{safe_name}.png"
-                filepath = os.path.join(output_dir, filename)
-
-                # 저장
-                cropped_img.save(filepath)
-
-                # # 결과 정보 저장
-                # crop_info = {
-                #     "original_furniture": furniture,
-                #     "crop_coordinates": [crop_x1, crop_y1, crop_x2, crop_y2],
-                #     "crop_size": f"{crop_x2-crop_x1}x{crop_y2-crop_y1}",
-                #     "filename": filename,
-                #     "filepath": filepath,
-                # }
-                cropped_images.append(cropped_img)
-
-                area_ratio = area / (img_width * img_height) * 100
-                print(
-                    f"✅ {i+1:2d}. {name:15s} ({priority:6s}) → {filename} ({crop_x2-crop_x1}x{crop_y2-crop_y1}, {area_ratio:.1f}%)"
+            crop_x1, crop_y1, crop_x2, crop_y2 = box
+
+            # 파일명 정리 (우선순위 포함)
+            safe_name = name.replace(" ", "_").replace("/", "_").replace("\\", "_")
+            filename = f"{base_name}_{i+1:02d}_{priority}_{safe_name}.png"
+            if save and self.archive is not None:
+                self.crop_writer.run(
+                    self.archive.append, cropped_img, furniture, run_id, box
+                )
+            elif save:
+                self.crop_writer.submit(
+                    cropped_img, os.path.join(output_dir, filename), compress_level
                 )
+            cropped_images.append(cropped_img)
 
-            except Exception as e:
-                print(f"❌ {name} 크롭 실패: {e}")
+            area_ratio = area / (img_width * img_height) * 100
+            print(
+                f"✅ {i+1:2d}. {name:15s} ({priority:6s}) → {filename} ({crop_x2-crop_x1}x{crop_y2-crop_y1}, {area_ratio:.1f}%)"
+            )
 
-        print(f"🎉 총 {len(cropped_images)}개 가구 크롭 완료!")
-        print(f"📁 저장 위치: {output_dir}/")
+        print(
+            f"🎉 총 {len(cropped_images)}개 가구 크롭 완료! ({time.time() - start:.2f}초)"
+        )
+        if save and self.archive is not None:
+            print(f"📦 아카이브 저장: {self.archive.data_path} (실행 {run_id})")
+        elif save:
+            print(f"📁 저장 위치: {output_dir}/ (백그라운드 저장 중)")
 
         return cropped_images
 
@@ -1017,6 +1737,7 @@ class BackgroundRemover:
     # =============================================================================
     def __init__(self, replicate_client):
         self.replicate_client = replicate_client
+        self.processed_indices = []
 
     def process(
         self,
@@ -1031,6 +1752,7 @@ class BackgroundRemover:
         print("=" * 60)
 
         processed_files = []
+        self.processed_indices = []  # 성공한 결과의 입력 인덱스 (processed_files와 같은 순서)
         success_count = 0
 
         for i, cropped_file in enumerate(cropped_files, 1):
@@ -1047,6 +1769,7 @@ class BackgroundRemover:
             if success:
                 success_count += 1
                 processed_files.append(background_removed_file_byte)
+                self.processed_indices.append(i - 1)
 
             else:
                 # 실패한 경우 원본 파일 복사
@@ -1070,7 +1793,10 @@ class BackgroundRemover:
         """Bria remove-background 모델을 사용하여 배경 제거"""
         print(f"🎭 Bria 배경 제거 시작: ")
 
-        cropped_image = pil_to_filelike(cropped_image)
+        # 모델별 인코딩 정책 적용 (크기 제한 + 포맷), 정책이 없으면 PNG
+        cropped_image = encode_for_model("bria/remove-background", cropped_image)
+        if isinstance(cropped_image, Image.Image):
+            cropped_image = pil_to_filelike(cropped_image)
         # Bria 모델 실행
         output = self.replicate_client.run(
             "bria/remove-background",
@@ -1102,36 +1828,54 @@ class BackgroundRemover:
 
 
 class ImgToModeling:
-    def __init__(self, replicate_client):
+    def __init__(
+        self,
+        replicate_client,
+        job_queue=None,
+        interactive=True,
+        backend="hunyuan3d",
+        hedge_backend=None,
+        latency=None,
+    ):
+        """
+        job_queue: 원격 작업 큐 (기본값: 프로세스 공유 큐)
+        interactive: 라이노 UI 요청이면 True (배치 작업보다 먼저 실행)
+        backend: 3D 백엔드 이름 ("hunyuan3d", "trellis") 또는 MeshBackend
+        hedge_backend: 지정하면 기본 백엔드가 p90 시간을 넘길 때 이 백엔드로 한 번 더 실행
+                       (기본 백엔드와 같으면 같은 모델로 다시 실행)
+        latency: LatencyStats — 백엔드별 실행 시간 기록 (기본값: furniture_3d_models/backend_latency.json)
+        """
         self.replicate_client = replicate_client
+        self.job_queue = job_queue or get_job_queue()
+        self.interactive = interactive
+        self.backend = get_mesh_backend(backend)
+        self.latency = latency if latency is not None else LatencyStats()
+        self.hedger = None
+        if hedge_backend is not None:
+            self.hedger = HedgedRunner(
+                replicate_client,
+                backends=(self.backend, hedge_backend),
+                latency=self.latency,
+                job_queue=self.job_queue,
+            )
+        self.handles = []
 
     # =============================================================================
     # 단계 3: HunYuan3D 모델을 사용한 3D 변환
     # =============================================================================
     def run_hunyuan3d(self, image, output_filename):
-        """HunYuan3D 모델을 사용하여 가구 이미지를 3D 모델로 변환"""
+        """가구 이미지 하나를 3D 모델로 변환해 저장 (작업 큐를 거쳐 실행) → 성공 여부"""
         try:
             print(f"🎨 3D 변환 시작:")
-
-            input_data = {
-                "image": image,
-                "remove_background": False,  # 이미 배경이 제거됨
-            }
-
-            # HunYuan3D 모델 실행
-            output = self.replicate_client.run(
-                "ndreca/hunyuan3d-2:0602bae6db1ce420f2690339bf2feb47e18c0c722a1f02e9db9abd774abaff5d",
-                input=input_data,
-            )
-
-            print(f"🔍 HunYuan3D 응답 타입: {type(output)}")
-
-            # 3D 메시 다운로드
-            mesh_url = output["mesh"]
-            response = requests.get(mesh_url)
+            handle = self.submit([image])[0]
+            result = handle.result()
+            if handle.status != "succeeded" or not result:
+                print(f"❌ 3D 변환 {handle.status}")
+                return False
+            self.latency.record(self.backend.name, handle.elapsed)
 
             with open(output_filename, "wb") as file:
-                file.write(response.content)
+                file.write(result["output"])
 
             print(f"✅ 3D 모델 생성 완료: {output_filename}")
             return True
@@ -1140,8 +1884,77 @@ class ImgToModeling:
             print(f"❌ 3D 변환 실패 : {e}")
             return False
 
-    def process(self, selected_images, output_dir="furniture_3d_models"):
-        """Bria 배경 제거된 가구들을 3D 모델로 변환"""
+    def submit(self, selected_images, furniture_list=None, priority=0):
+        """
+        3D 변환 작업을 큐에 넣고 JobHandle 목록 반환 (기다리지 않음)
+
+        furniture_list: 이미지와 같은 순서의 가구 dict — priority/category 순으로 실행
+        handle.cancel()로 대기/실행 중인 작업 취소
+        """
+        furniture_list = furniture_list or [None] * len(selected_images)
+        handles = [
+            self.backend.submit(
+                self.job_queue,
+                self.replicate_client,
+                image,
+                name=f"{self.backend.name} {(furniture or {}).get('name', i)}",
+                priority=priority,
+                furniture=furniture,
+                interactive=self.interactive,
+            )
+            for i, (image, furniture) in enumerate(
+                zip(selected_images, furniture_list), 1
+            )
+        ]
+        self.handles.extend(handles)
+        return handles
+
+    def cancel(self):
+        """이 변환기에서 넣은 작업 중 끝나지 않은 것 모두 취소 → 취소한 수"""
+        return sum(1 for handle in self.handles if handle.cancel())
+
+    def _start(self, selected_images, furniture_list):
+        """변환 시작 → 이미지마다 결과 dict를 기다리는 함수 목록"""
+        if self.hedger is None:
+
+            def waiter(handle):
+                def wait():
+                    result = handle.result() or {"status": handle.status}
+                    if handle.status == "succeeded":
+                        self.latency.record(self.backend.name, handle.elapsed)
+                    return dict(result, backend=self.backend.name)
+
+                return wait
+
+            return [waiter(h) for h in self.submit(selected_images, furniture_list)]
+
+        # 헤지 모드: 이미지마다 감시 스레드가 기본/헤지 작업 중 먼저 끝난 결과를 반환
+        furniture_list = furniture_list or [None] * len(selected_images)
+        executor = ThreadPoolExecutor(max_workers=max(1, len(selected_images)))
+        futures = [
+            executor.submit(
+                self.hedger.run,
+                image,
+                name=(furniture or {}).get("name", str(i)),
+                furniture=furniture,
+                interactive=self.interactive,
+                handles=self.handles,
+            )
+            for i, (image, furniture) in enumerate(
+                zip(selected_images, furniture_list), 1
+            )
+        ]
+        executor.shutdown(wait=False)
+        return [future.result for future in futures]
+
+    def process(
+        self, selected_images, output_dir="furniture_3d_models", furniture_list=None
+    ):
+        """
+        Bria 배경 제거된 가구들을 3D 모델로 변환
+
+        작업은 공유 큐에서 우선순위 순으로 실행되고, 다른 스레드에서 cancel()로 중단 가능
+        """
         try:
             # 출력 디렉토리 생성
             if not os.path.exists(output_dir):
@@ -1151,58 +1964,60 @@ class ImgToModeling:
             print(f"🎨 HunYuan3D 3D 변환 작업 시작")
             print(f"📁 출력 디렉토리: {output_dir}")
             print(f"📊 처리할 파일 수: {len(selected_images)}개")
-            print(f"🤖 모델: ndreca/hunyuan3d-2")
+            print(f"🤖 모델: {self.backend.model.split(':')[0]}")
+            if self.hedger is not None:
+                print(f"🔀 헤지: {[b.name for b in self.hedger.backends]}")
             print("=" * 60)
 
             processed_files = []
             success_count = 0
             time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # 워커가 동시에 처리하는 호출끼리 파일이 겹치지 않도록 호출마다 고유 id
+            call_id = uuid.uuid4().hex[:8]
+            waiters = self._start(selected_images, furniture_list)
 
-            for i, selected_image in enumerate(selected_images, 1):
+            for i, wait_result in enumerate(waiters, 1):
 
-                output_filename = f"3d_{i}_{time_str}.glb"
+                output_filename = f"3d_{i}_{time_str}_{call_id}.glb"
                 output_path = os.path.join(output_dir, output_filename)
 
-                print(f"\n🔄 [{i}/{len(selected_images)}] 3D 변환 중:")
+                print(f"\n🔄 [{i}/{len(selected_images)}] 3D 변환 대기 중")
 
-                # HunYuan3D 3D 변환 시도
-                success = self.run_hunyuan3d(selected_image, output_path)
+                try:
+                    result = wait_result()
+                except Exception as e:
+                    print(f"❌ 3D 변환 실패 : {e}")
+                    result = {"status": "failed", "backend": self.backend.name}
 
-                if success:
+                model_used = get_mesh_backend(result["backend"]).model.split(":")[0]
+                if result["status"] == "succeeded":
+                    with open(output_path, "wb") as file:
+                        file.write(result["output"])
                     success_count += 1
 
                     # 파일 크기 확인
-                    model_size = (
-                        os.path.getsize(output_path)
-                        if os.path.exists(output_path)
-                        else 0
-                    )
+                    model_size = os.path.getsize(output_path)
 
                     file_info = {
                         "output_file": output_filename,
                         "output_path": output_path,
                         "model_size": model_size,
-                        "model_used": "ndreca/hunyuan3d-2",
+                        "model_used": model_used,
                         "status": "success",
                     }
                     processed_files.append(output_path)
-                    print(f"   📊 3D 모델 크기: {model_size:,} bytes")
+                    print(f"   📊 3D 모델 크기: {model_size:,} bytes ({model_used})")
                     print(f"   💾 저장됨: {output_filename}")
 
                 else:
                     file_info = {
                         "output_file": output_filename,
                         "output_path": output_path,
-                        "model_used": "ndreca/hunyuan3d-2",
-                        "status": "failed",
+                        "model_used": model_used,
+                        "status": "canceled" if result["status"] == "canceled" else "failed",
                     }
                     processed_files.append(file_info)
-                    print(f"   ❌ 3D 변환 실패")
-
-                # API 호출 간 잠시 대기 (Rate Limit 방지)
-                if i < len(selected_images):
-                    print("   ⏳ 5초 대기 중...")
-                    time.sleep(5)  # 3D 변환은 더 많은 시간이 필요할 수 있음
+                    print(f"   ❌ 3D 변환 {file_info['status']}")
 
             print("\n" + "=" * 60)
             print(f"🎉 3D 변환 작업 완료!")
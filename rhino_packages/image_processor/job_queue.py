@@ -0,0 +1,310 @@
+import time
+import heapq
+import itertools
+import threading
+
+from .image_enhancer import run_prediction
+
+
+# =============================================================================
+# 원격 작업 큐 (우선순위 + 취소 + 대화형 작업 우선)
+# =============================================================================
+
+
+# 가구 priority / category → 정렬 값 (작을수록 먼저)
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+CATEGORY_ORDER = {"large": 0, "medium": 1, "small": 2}
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELED = "canceled"
+
+
+def furniture_rank(furniture):
+    """가구 dict의 priority / category → (우선순위, 크기) 정렬 값"""
+    if not furniture:
+        return (1, 1)
+    return (
+        PRIORITY_ORDER.get(furniture.get("priority"), 1),
+        CATEGORY_ORDER.get(furniture.get("category"), 1),
+    )
+
+
+class JobHandle:
+    def __init__(
+        self, queue, job_id, seq, name, fn, args, kwargs, priority, furniture, interactive
+    ):
+        self.queue = queue
+        self.id = job_id
+        self.seq = seq
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.furniture = furniture
+        self.interactive = interactive
+
+        self.status = QUEUED
+        self.value = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.preemptions = 0
+
+        self._cancel_event = threading.Event()
+        self._done = threading.Event()
+        self._canceled = False
+        self._preempted = False
+
+    def sort_key(self):
+        # 대화형 작업이 항상 먼저, 그 다음 사용자 우선순위 → 가구 우선순위/크기 → 제출 순서
+        lane = 0 if self.interactive else 1
+        return (lane, self.priority) + furniture_rank(self.furniture) + (self.seq,)
+
+    def cancel(self):
+        """대기 중이면 큐에서 빼고, 실행 중이면 원격 예측 취소"""
+        return self.queue.cancel(self)
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def result(self, timeout=None):
+        """완료될 때까지 대기 → 작업 반환값 (실패면 예외, 취소면 None)"""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"작업 대기 시간 초과: {self.name}")
+        if self.status == FAILED:
+            raise self.error
+        return self.value
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def __repr__(self):
+        lane = "interactive" if self.interactive else "batch"
+        return f"JobHandle(#{self.id} {self.name!r}, {lane}, {self.status})"
+
+
+class JobQueue:
+    def __init__(self, max_workers=2, preempt=True):
+        """
+        max_workers: 동시에 실행할 원격 작업 수
+        preempt: 대화형 작업이 들어왔는데 빈 자리가 없으면 실행 중인 배치 작업을 취소하고 다시 대기열에 넣음
+        """
+        self.max_workers = max_workers
+        self.preempt = preempt
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._running = set()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._workers = []
+
+    # -------------------------------------------------------------------------
+    # 제출
+    # -------------------------------------------------------------------------
+
+    def submit(
+        self,
+        fn,
+        *args,
+        name=None,
+        priority=0,
+        furniture=None,
+        interactive=False,
+        **kwargs,
+    ):
+        """
+        fn(*args, cancel_event=..., **kwargs)을 큐에 넣고 JobHandle 반환
+
+        fn은 cancel_event가 설정되면 최대한 빨리 중단해야 함 (run_prediction은 원격 예측 취소)
+        priority: 사용자 우선순위 (작을수록 먼저)
+        furniture: 가구 dict — priority/category로 같은 우선순위 안에서 정렬
+        interactive: 라이노 UI에서 온 요청 (배치 작업보다 먼저, 필요하면 배치 작업을 밀어냄)
+        """
+        with self._lock:
+            handle = JobHandle(
+                self,
+                next(self._ids),
+                next(self._seq),
+                name or getattr(fn, "__name__", "job"),
+                fn,
+                args,
+                kwargs,
+                priority,
+                furniture,
+                interactive,
+            )
+            self._push(handle)
+            self._ensure_workers()
+            if interactive and self.preempt:
+                self._preempt_batch()
+            self._available.notify()
+        return handle
+
+    def submit_prediction(self, client, model, input, name=None, **options):
+        """Replicate 예측을 큐에 넣기 → JobHandle (결과는 run_prediction 결과 dict)"""
+        return self.submit(
+            run_prediction,
+            client,
+            model,
+            input,
+            name=name or model,
+            poll_interval=options.pop("poll_interval", 2.0),
+            **options,
+        )
+
+    def _push(self, handle):
+        heapq.heappush(self._heap, (handle.sort_key(), handle))
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._worker,
+                name=f"job-queue-{len(self._workers) + 1}",
+                daemon=True,
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _preempt_batch(self):
+        """빈 자리가 없으면 가장 늦게 시작한 배치 작업 하나를 밀어냄"""
+        if len(self._running) < self.max_workers:
+            return
+        batch = [h for h in self._running if not h.interactive and not h._preempted]
+        if not batch:
+            return
+        victim = max(batch, key=lambda h: h.started_at)
+        victim._preempted = True
+        victim._cancel_event.set()
+        print(f"⏸️  대화형 작업 우선 → 배치 작업 일시 중단: {victim.name}")
+
+    # -------------------------------------------------------------------------
+    # 실행
+    # -------------------------------------------------------------------------
+
+    def _next(self):
+        with self._lock:
+            while True:
+                while self._heap:
+                    _, handle = heapq.heappop(self._heap)
+                    if handle._canceled:
+                        continue
+                    handle.status = RUNNING
+                    handle.started_at = time.time()
+                    self._running.add(handle)
+                    return handle
+                self._available.wait()
+
+    def _worker(self):
+        while True:
+            handle = self._next()
+            try:
+                value = handle.fn(
+                    *handle.args, cancel_event=handle._cancel_event, **handle.kwargs
+                )
+                error = None
+            except Exception as e:
+                value, error = None, e
+
+            with self._lock:
+                self._running.discard(handle)
+                if handle._preempted and not handle._canceled:
+                    # 밀려난 배치 작업은 처음부터 다시 대기
+                    handle._preempted = False
+                    handle._cancel_event = threading.Event()
+                    handle.status = QUEUED
+                    handle.started_at = None
+                    handle.preemptions += 1
+                    self._push(handle)
+                    self._available.notify()
+                    continue
+                self._finish(handle, value, error)
+
+    def _finish(self, handle, value, error):
+        handle.finished_at = time.time()
+        if handle._canceled:
+            handle.status = CANCELED
+        elif error is not None:
+            handle.status = FAILED
+            handle.error = error
+        elif isinstance(value, dict) and value.get("status") in (FAILED, CANCELED):
+            handle.status = value["status"]
+            handle.value = value
+        else:
+            handle.status = SUCCEEDED
+            handle.value = value
+        handle._done.set()
+
+    # -------------------------------------------------------------------------
+    # 취소 / 우선순위 변경
+    # -------------------------------------------------------------------------
+
+    def cancel(self, handle):
+        with self._lock:
+            if handle.done():
+                return False
+            handle._canceled = True
+            handle._cancel_event.set()
+            if handle.status == QUEUED:
+                # 힙에서는 꺼낼 때 건너뜀
+                self._finish(handle, None, None)
+        print(f"🛑 작업 취소: {handle.name}")
+        return True
+
+    def cancel_all(self, interactive=None):
+        """대기/실행 중인 작업 모두 취소 (interactive=False면 배치 작업만)"""
+        with self._lock:
+            handles = [h for _, h in self._heap] + list(self._running)
+        canceled = 0
+        for handle in handles:
+            if interactive is not None and handle.interactive != interactive:
+                continue
+            if self.cancel(handle):
+                canceled += 1
+        return canceled
+
+    def promote(self, handle, interactive=True, priority=None):
+        """배치 작업을 대화형으로 올리기 (실행 중이면 더 이상 밀려나지 않음)"""
+        with self._lock:
+            handle.interactive = interactive
+            if priority is not None:
+                handle.priority = priority
+            if handle.status == QUEUED and not handle._canceled:
+                self._heap = [(h.sort_key(), h) for _, h in self._heap]
+                heapq.heapify(self._heap)
+        return handle
+
+    def stats(self):
+        with self._lock:
+            queued = [h for _, h in self._heap if not h._canceled]
+            return {
+                "queued": len(queued),
+                "queued_interactive": sum(1 for h in queued if h.interactive),
+                "running": len(self._running),
+                "workers": len(self._workers),
+            }
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue(max_workers=2):
+    """프로세스 전체에서 공유하는 작업 큐 (처음 호출할 때 생성)"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(max_workers=max_workers)
+        return _job_queue
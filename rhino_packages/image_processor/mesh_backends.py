@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import threading
+
+from .job_queue import get_job_queue
+
+
+HUNYUAN3D_MODEL = "ndreca/hunyuan3d-2:0602bae6db1ce420f2690339bf2feb47e18c0c722a1f02e9db9abd774abaff5d"
+TRELLIS_MODEL = "firtoz/trellis:e8f6c45206993f297372f5436b90350817bd9b4a0d52d2a76df50c1c8afa2b3c"
+
+
+# =============================================================================
+# 이미지 → 3D 백엔드 (모델별 입력 구성 / 출력 항목)
+# =============================================================================
+
+
+def hunyuan3d_input(image):
+    return {"image": image, "remove_background": False}  # 이미 배경이 제거됨
+
+
+def trellis_input(image, seed=0):
+    return {
+        "seed": seed,
+        "images": [image],
+        "texture_size": 1024,
+        "mesh_simplify": 0.9,
+        "generate_color": False,
+        "generate_model": True,
+        "randomize_seed": False,
+        "generate_normal": False,
+        "save_gaussian_ply": False,
+        "ss_sampling_steps": 38,
+        "slat_sampling_steps": 12,
+        "return_no_background": False,
+        "ss_guidance_strength": 7.5,
+        "slat_guidance_strength": 3,
+    }
+
+
+class MeshBackend:
+    def __init__(self, name, model, build_input, output_key):
+        """
+        model: Replicate 모델 (owner/name:version)
+        build_input(image) → 모델 입력 dict
+        output_key: 출력 dict에서 GLB가 들어 있는 항목
+        """
+        self.name = name
+        self.model = model
+        self.build_input = build_input
+        self.output_key = output_key
+
+    def submit(self, job_queue, client, image, name=None, **options):
+        """작업 큐에 변환 작업 넣기 → JobHandle"""
+        return job_queue.submit_prediction(
+            client,
+            self.model,
+            self.build_input(image),
+            name=name or self.name,
+            output_key=self.output_key,
+            **options,
+        )
+
+    def __repr__(self):
+        return f"MeshBackend({self.name!r})"
+
+
+# 이름으로 고를 수 있는 3D 백엔드
+MESH_BACKENDS = {
+    "hunyuan3d": MeshBackend("hunyuan3d", HUNYUAN3D_MODEL, hunyuan3d_input, "mesh"),
+    "trellis": MeshBackend("trellis", TRELLIS_MODEL, trellis_input, "model_file"),
+}
+
+
+def get_mesh_backend(backend):
+    """이름 또는 MeshBackend → MeshBackend"""
+    if isinstance(backend, MeshBackend):
+        return backend
+    if backend in MESH_BACKENDS:
+        return MESH_BACKENDS[backend]
+    raise ValueError(f"알 수 없는 3D 백엔드: {backend}")
+
+
+# =============================================================================
+# 백엔드별 실행 시간 기록 (헤지 기준 시간 계산용)
+# =============================================================================
+
+
+class LatencyStats:
+    # 히스토그램 구간 경계 (초)
+    BUCKETS = (15, 30, 45, 60, 90, 120, 180, 300, 600)
+
+    def __init__(
+        self, path="furniture_3d_models/backend_latency.json", max_samples=200
+    ):
+        self.path = path
+        self.max_samples = max_samples
+        self.samples = {}  # 백엔드 이름 → 최근 실행 시간 목록 (초)
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.samples = json.load(f).get("samples", {})
+
+    def save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"samples": self.samples}, f)
+        os.replace(tmp_path, self.path)
+
+    def record(self, backend, seconds):
+        with self._lock:
+            samples = self.samples.setdefault(backend, [])
+            samples.append(round(seconds, 2))
+            del samples[: -self.max_samples]
+            self.save()
+
+    def percentile(self, backend, q, min_samples=5):
+        """q (0~1) 분위 실행 시간 (기록이 부족하면 None)"""
+        with self._lock:
+            samples = sorted(self.samples.get(backend, []))
+        if len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(q * (len(samples) - 1) + 0.5))
+        return samples[index]
+
+    def histogram(self, backend):
+        """구간별 개수 {"<=15s": n, ..., ">600s": n}"""
+        with self._lock:
+            samples = list(self.samples.get(backend, []))
+        counts = {f"<={b}s": 0 for b in self.BUCKETS}
+        counts[f">{self.BUCKETS[-1]}s"] = 0
+        for seconds in samples:
+            bucket = next((b for b in self.BUCKETS if seconds <= b), None)
+            key = f"<={bucket}s" if bucket is not None else f">{self.BUCKETS[-1]}s"
+            counts[key] += 1
+        return counts
+
+    def summary(self):
+        print("⏱️  3D 백엔드 실행 시간")
+        for backend, samples in self.samples.items():
+            p50 = self.percentile(backend, 0.5, min_samples=1)
+            p90 = self.percentile(backend, 0.9, min_samples=1)
+            print(f"   {backend}: {len(samples)}건, p50 {p50}초, p90 {p90}초")
+
+
+# =============================================================================
+# 헤지 실행 (p90 시간을 넘기면 다른 백엔드로 한 번 더 실행, 먼저 끝난 쪽 사용)
+# =============================================================================
+
+
+class HedgedRunner:
+    def __init__(
+        self,
+        client,
+        backends=("hunyuan3d", "trellis"),
+        latency=None,
+        hedge_percentile=0.9,
+        default_hedge_after=180.0,
+        job_queue=None,
+        poll_interval=2.0,
+    ):
+        """
+        backends: 첫 번째가 기본 백엔드, 두 번째가 헤지용 (하나뿐이면 같은 백엔드로 다시 실행)
+        hedge_percentile: 기본 백엔드의 이 분위 실행 시간을 넘기면 헤지 시작
+        default_hedge_after: 기록이 부족할 때 사용할 헤지 기준 시간 (초)
+        """
+        self.client = client
+        self.backends = [get_mesh_backend(b) for b in backends]
+        self.latency = latency if latency is not None else LatencyStats()
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_after = default_hedge_after
+        self.job_queue = job_queue or get_job_queue()
+        self.poll_interval = poll_interval
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_after(self, backend):
+        threshold = self.latency.percentile(backend.name, self.hedge_percentile)
+        return threshold if threshold is not None else self.default_hedge_after
+
+    def _submit(self, backend, image, name, handles, **options):
+        handle = backend.submit(
+            self.job_queue,
+            self.client,
+            image,
+            name=f"{backend.name} {name}",
+            poll_interval=self.poll_interval,
+            **options,
+        )
+        if handles is not None:
+            handles.append(handle)
+        return handle
+
+    def run(self, image, name="", furniture=None, interactive=True, handles=None):
+        """
+        이미지 하나를 3D 변환 → run_prediction 결과 dict (+ "backend")
+
+        handles: 리스트를 넘기면 만든 JobHandle을 추가 (밖에서 취소할 때 사용)
+        """
+        options = {"furniture": furniture, "interactive": interactive}
+        primary = self.backends[0]
+        secondary = self.backends[1] if len(self.backends) > 1 else primary
+        threshold = self.hedge_after(primary)
+
+        running = [(primary, self._submit(primary, image, name, handles, **options))]
+        hedge_started = False
+
+        while True:
+            for backend, handle in running:
+                if handle.done() and handle.status == "succeeded":
+                    for _, other in running:
+                        if other is not handle:
+                            other.cancel()
+                    self.latency.record(backend.name, handle.elapsed)
+                    if handle is not running[0][1]:
+                        self.hedge_wins += 1
+                    result = dict(handle.value)
+                    result["backend"] = backend.name
+                    return result
+
+            _, first = running[0]
+            if first.status == "canceled" and not hedge_started:
+                # 밖에서 취소한 작업은 헤지하지 않음
+                return {"status": "canceled", "backend": primary.name}
+
+            primary_failed = first.done() and first.status != "succeeded"
+            primary_slow = (
+                first.started_at is not None
+                and time.time() - first.started_at > threshold
+            )
+            if not hedge_started and (primary_failed or primary_slow):
+                hedge_started = True
+                self.hedged += 1
+                reason = "실패" if primary_failed else f"{threshold:.0f}초 초과"
+                print(f"🔀 {primary.name} {reason} → {secondary.name}로 헤지: {name}")
+                running.append(
+                    (secondary, self._submit(secondary, image, name, handles, **options))
+                )
+
+            if all(handle.done() for _, handle in running) and hedge_started:
+                # 모두 실패/취소
+                _, last = running[-1]
+                result = dict(last.value or {"status": last.status})
+                result["backend"] = running[-1][0].name
+                return result
+
+            pending = next(handle for _, handle in running if not handle.done())
+            pending.wait(0.5)
+
+    def stats(self):
+        return {"hedged": self.hedged, "hedge_wins": self.hedge_wins}
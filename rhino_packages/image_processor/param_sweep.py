@@ -0,0 +1,216 @@
+import io
+import os
+import json
+import time
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from PIL import Image, ImageDraw
+
+from .image_enhancer import ENHANCE_MODELS, run_prediction
+from .upload_cache import UploadManager, image_digest
+
+
+# =============================================================================
+# 파라미터 스윕 (run_youzu / run_flux_dev 값 조합을 병렬 실행)
+# =============================================================================
+
+
+def expand_grid(grid):
+    """{"seed": [1, 2], "guidance_scale": [7, 8]} → 모든 조합의 dict 목록"""
+    keys = sorted(grid)
+    values = [
+        grid[key] if isinstance(grid[key], (list, tuple)) else [grid[key]]
+        for key in keys
+    ]
+    return [dict(zip(keys, combo)) for combo in itertools.product(*values)]
+
+
+class ParameterSweep:
+    def __init__(
+        self,
+        client,
+        model="youzu",
+        max_concurrency=4,
+        cache_dir=None,
+        uploader=None,
+        poll_interval=2.0,
+    ):
+        """
+        model: ENHANCE_MODELS 이름 ("youzu", "flux_dev" 등)
+        max_concurrency: 동시에 실행할 예측 수
+        cache_dir: 지정하면 결과 이미지를 디스크에도 캐시 (다음 실행에서 재사용)
+        """
+        self.client = client
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.cache_dir = cache_dir
+        self.uploader = uploader or UploadManager(client)
+        self.poll_interval = poll_interval
+        self._cache = {}
+        self._lock = threading.Lock()
+
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _cache_key(self, image_hash, prompt, params):
+        payload = json.dumps(
+            {"model": self.model, "image": image_hash, "prompt": prompt, "params": params},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cached(self, key):
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        if self.cache_dir:
+            path = os.path.join(self.cache_dir, f"{key}.bin")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    output = f.read()
+                with self._lock:
+                    self._cache[key] = output
+                return output
+        return None
+
+    def _store(self, key, output):
+        with self._lock:
+            self._cache[key] = output
+        if self.cache_dir:
+            with open(os.path.join(self.cache_dir, f"{key}.bin"), "wb") as f:
+                f.write(output)
+
+    def run(self, image, prompt, grid, **fixed_params):
+        """
+        grid 조합을 모두 실행하고 결과 목록 반환 (입력 조합 순서 유지)
+
+        결과: {"params", "key", "status", "output"(bytes), "elapsed", "cached"}
+        이미 계산된 조합은 캐시에서 바로 반환
+        """
+        model, build_input = ENHANCE_MODELS[self.model]
+        image_hash = image_digest(image)
+        image_url = self.uploader.url_for(image, model=model)
+
+        points = [dict(fixed_params, **params) for params in expand_grid(grid)]
+        results = [None] * len(points)
+        todo = []
+        for i, params in enumerate(points):
+            key = self._cache_key(image_hash, prompt, params)
+            output = self._cached(key)
+            if output is not None:
+                results[i] = {
+                    "params": params,
+                    "key": key,
+                    "status": "succeeded",
+                    "output": output,
+                    "elapsed": 0.0,
+                    "cached": True,
+                }
+            else:
+                todo.append((i, key, params))
+
+        print(
+            f"🧪 스윕 시작: {len(points)}개 조합 (캐시 {len(points) - len(todo)}개, 실행 {len(todo)}개, 동시 {self.max_concurrency}개)"
+        )
+        start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {
+                executor.submit(
+                    run_prediction,
+                    self.client,
+                    model,
+                    build_input(image_url, prompt, **params),
+                    name=f"{self.model} {params}",
+                    poll_interval=self.poll_interval,
+                ): (i, key, params)
+                for i, key, params in todo
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                i, key, params = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"status": "failed", "error": str(e), "elapsed": 0.0}
+
+                if result["status"] == "succeeded":
+                    self._store(key, result["output"])
+                results[i] = {
+                    "params": params,
+                    "key": key,
+                    "status": result["status"],
+                    "output": result.get("output"),
+                    "error": result.get("error"),
+                    "elapsed": result["elapsed"],
+                    "cached": False,
+                }
+                print(
+                    f"   [{done}/{len(todo)}] {result['status']} {params} ({result['elapsed']:.1f}초)"
+                )
+
+        print(f"🎉 스윕 완료 ({time.time() - start:.1f}초)")
+        return results
+
+
+def contact_sheet(results, columns=5, thumb_size=256, label_keys=None):
+    """결과 썸네일을 격자로 배치한 PIL 이미지 (아래에 파라미터 표시)"""
+    succeeded = [r for r in results if r.get("output")]
+    if not succeeded:
+        return None
+
+    label_height = 18
+    rows = (len(succeeded) + columns - 1) // columns
+    cell_w, cell_h = thumb_size, thumb_size + label_height
+    sheet = Image.new("RGB", (columns * cell_w, rows * cell_h), "white")
+    draw = ImageDraw.Draw(sheet)
+
+    for index, result in enumerate(succeeded):
+        row, col = divmod(index, columns)
+        thumb = Image.open(io.BytesIO(result["output"])).convert("RGB")
+        thumb.thumbnail((thumb_size, thumb_size))
+        x = col * cell_w + (thumb_size - thumb.width) // 2
+        y = row * cell_h + (thumb_size - thumb.height) // 2
+        sheet.paste(thumb, (x, y))
+
+        params = result["params"]
+        keys = label_keys or sorted(params)
+        label = " ".join(f"{k}={params[k]}" for k in keys if k in params)
+        draw.text((col * cell_w + 4, row * cell_h + thumb_size + 2), label, fill="black")
+    return sheet
+
+
+def save_sweep(results, output_dir, columns=5, thumb_size=256, save_images=False):
+    """contact_sheet.jpg + manifest.json 저장 (save_images=True면 개별 이미지도)"""
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    manifest = []
+    for index, result in enumerate(results):
+        entry = {
+            "index": index,
+            "params": result["params"],
+            "key": result["key"],
+            "status": result["status"],
+            "elapsed": round(result["elapsed"], 2),
+            "cached": result["cached"],
+        }
+        if save_images and result.get("output"):
+            filename = f"sweep_{index:03d}.png"
+            with open(os.path.join(output_dir, filename), "wb") as f:
+                f.write(result["output"])
+            entry["filename"] = filename
+        manifest.append(entry)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    sheet = contact_sheet(results, columns=columns, thumb_size=thumb_size)
+    if sheet is not None:
+        sheet.save(os.path.join(output_dir, "contact_sheet.jpg"), quality=90)
+
+    print(f"💾 스윕 결과 저장: {output_dir}/")
+    return manifest
@@ -0,0 +1,379 @@
+import json
+
+
+# =============================================================================
+# 방 종류별 인식 프로필 (Grounding DINO 질의어 + GPT 프롬프트 가구 목록)
+# =============================================================================
+
+
+# 방 종류를 모를 때 사용하는 전체 질의어 (기존 image_detection_by_replicate 목록)
+ALL_QUERIES = [
+    # 가구
+    "sofa",
+    "armchair",
+    "dining table",
+    "coffee table",
+    "side table",
+    "bed",
+    "bunk bed",
+    "desk",
+    "office chair",
+    "wardrobe",
+    "dresser",
+    "bookshelf",
+    "cabinet",
+    "drawer",
+    # 주방 가구 및 가전
+    "kitchen cabinet",
+    "sink",
+    "stove",
+    "oven",
+    "microwave",
+    "refrigerator",
+    "dishwasher",
+    "kitchen island",
+    "range hood",
+    # 조명
+    "ceiling light",
+    "pendant light",
+    "chandelier",
+    "floor lamp",
+    "table lamp",
+    "wall sconce",
+    # 소품 / 장식
+    "curtain",
+    "rug",
+    "mirror",
+    "painting",
+    "clock",
+    "plant",
+    "vase",
+    "pillow",
+    "blanket",
+    # 욕실
+    "bathtub",
+    "shower",
+    "toilet",
+    "washbasin",
+    "mirror cabinet",
+    "towel rack",
+    # 전자기기
+    "television",
+    "monitor",
+    "speaker",
+    "air conditioner",
+    "heater",
+    "fan",
+]
+
+
+class RoomProfile:
+    def __init__(self, room_type, label, queries, large, medium, small):
+        """
+        room_type: 프로필 키 ("living", "kitchen", ...)
+        label: 프롬프트에 들어갈 방 이름 ("거실", "주방", ...)
+        queries: Grounding DINO 질의어 목록
+        large/medium/small: GPT 프롬프트의 우선순위별 가구 줄 목록
+        """
+        self.room_type = room_type
+        self.label = label
+        self.queries = list(queries)
+        self.large = list(large)
+        self.medium = list(medium)
+        self.small = list(small)
+
+    def furniture_guide(self):
+        """GPT 프롬프트의 '우선순위별 가구 목록' 부분"""
+        sections = [
+            ("🏠 대형 가구 (최우선):", self.large),
+            ("🪑 중형 가구:", self.medium),
+            ("🧸 소형 가구/소품:", self.small),
+        ]
+        return "\n\n".join(
+            header + "".join(f"\n- {line}" for line in lines)
+            for header, lines in sections
+            if lines
+        )
+
+    def priority_line(self):
+        """멀티뷰 프롬프트용 한 줄 요약 ("대형 가구(소파, 쇼파, ...) > 중형 가구(...) > ...")"""
+        sections = [
+            ("대형 가구", self.large),
+            ("중형 가구", self.medium),
+            ("소형 가구/소품", self.small),
+        ]
+        return " > ".join(
+            f"{header}({', '.join(line.split(' (')[0] for line in lines)})"
+            for header, lines in sections
+            if lines
+        )
+
+    def __repr__(self):
+        return f"RoomProfile({self.room_type!r}, {len(self.queries)} queries)"
+
+
+ROOM_PROFILES = {
+    "living": RoomProfile(
+        "living",
+        "거실",
+        [
+            "sofa",
+            "armchair",
+            "coffee table",
+            "side table",
+            "bookshelf",
+            "cabinet",
+            "television",
+            "floor lamp",
+            "table lamp",
+            "plant",
+            "rug",
+            "painting",
+            "pillow",
+            "speaker",
+        ],
+        [
+            "소파, 쇼파 (sofa, couch, sectional)",
+            "큰 테이블 (dining table, large coffee table)",
+            "큰 선반/책장 (bookshelf, large cabinet)",
+            "침대 (bed, mattress)",
+        ],
+        [
+            "의자 (chair, armchair, recliner)",
+            "작은 테이블 (side table, coffee table)",
+            "TV/모니터 (television, monitor)",
+            "사다리 (ladder, step)",
+        ],
+        [
+            "조명 (lamp, floor lamp)",
+            "식물/화분 (plant, pot)",
+            "장식품 (decoration, vase)",
+            "쿠션 (cushion, pillow)",
+        ],
+    ),
+    "kitchen": RoomProfile(
+        "kitchen",
+        "주방",
+        [
+            "kitchen cabinet",
+            "kitchen island",
+            "refrigerator",
+            "sink",
+            "stove",
+            "oven",
+            "microwave",
+            "dishwasher",
+            "range hood",
+            "bar stool",
+            "pendant light",
+        ],
+        [
+            "냉장고 (refrigerator)",
+            "아일랜드 식탁 (kitchen island)",
+            "주방 수납장 (kitchen cabinet)",
+        ],
+        [
+            "오븐/전자레인지 (oven, microwave)",
+            "식기세척기 (dishwasher)",
+            "바 의자 (bar stool)",
+        ],
+        [
+            "펜던트 조명 (pendant light)",
+            "주방 소품 (kettle, toaster)",
+        ],
+    ),
+    "dining": RoomProfile(
+        "dining",
+        "식당",
+        [
+            "dining table",
+            "dining chair",
+            "sideboard",
+            "cabinet",
+            "pendant light",
+            "chandelier",
+            "painting",
+            "plant",
+            "vase",
+        ],
+        [
+            "식탁 (dining table)",
+            "찬장/사이드보드 (sideboard, cabinet)",
+        ],
+        [
+            "식탁 의자 (dining chair)",
+        ],
+        [
+            "펜던트 조명/샹들리에 (pendant light, chandelier)",
+            "식물/화분 (plant, pot)",
+            "장식품 (decoration, vase)",
+        ],
+    ),
+    "bedroom": RoomProfile(
+        "bedroom",
+        "침실",
+        [
+            "bed",
+            "wardrobe",
+            "dresser",
+            "nightstand",
+            "desk",
+            "office chair",
+            "bookshelf",
+            "table lamp",
+            "floor lamp",
+            "mirror",
+            "curtain",
+            "rug",
+            "pillow",
+            "plant",
+        ],
+        [
+            "침대 (bed, mattress)",
+            "옷장 (wardrobe)",
+            "서랍장 (dresser)",
+        ],
+        [
+            "협탁 (nightstand, side table)",
+            "책상/의자 (desk, chair)",
+            "책장 (bookshelf)",
+        ],
+        [
+            "조명 (table lamp, floor lamp)",
+            "거울 (mirror)",
+            "식물/화분 (plant, pot)",
+            "쿠션 (cushion, pillow)",
+        ],
+    ),
+    "bathroom": RoomProfile(
+        "bathroom",
+        "욕실",
+        [
+            "bathtub",
+            "shower",
+            "toilet",
+            "washbasin",
+            "vanity cabinet",
+            "mirror cabinet",
+            "mirror",
+            "towel rack",
+        ],
+        [
+            "욕조 (bathtub)",
+            "샤워부스 (shower)",
+            "세면대/하부장 (washbasin, vanity cabinet)",
+        ],
+        [
+            "변기 (toilet)",
+            "거울/수납장 (mirror, mirror cabinet)",
+        ],
+        [
+            "수건걸이 (towel rack)",
+        ],
+    ),
+    "dressroom": RoomProfile(
+        "dressroom",
+        "드레스룸",
+        [
+            "wardrobe",
+            "clothes rack",
+            "dresser",
+            "shelf",
+            "mirror",
+            "ottoman",
+        ],
+        [
+            "옷장/붙박이장 (wardrobe)",
+            "행거 (clothes rack)",
+        ],
+        [
+            "서랍장 (dresser)",
+            "선반 (shelf)",
+            "전신 거울 (mirror)",
+        ],
+        [
+            "스툴 (ottoman, stool)",
+        ],
+    ),
+    "entrance": RoomProfile(
+        "entrance",
+        "현관",
+        ["shoe cabinet", "bench", "mirror", "umbrella stand", "ceiling light"],
+        ["신발장 (shoe cabinet)"],
+        ["벤치 (bench)", "거울 (mirror)"],
+        ["우산꽂이 (umbrella stand)"],
+    ),
+    "pantry": RoomProfile(
+        "pantry",
+        "팬트리",
+        ["shelf", "cabinet", "refrigerator", "storage box"],
+        ["선반/수납장 (shelf, cabinet)", "냉장고 (refrigerator)"],
+        [],
+        ["수납 박스 (storage box)"],
+    ),
+    "hallway": RoomProfile(
+        "hallway",
+        "복도",
+        ["console table", "cabinet", "painting", "wall sconce", "plant", "rug"],
+        ["수납장 (cabinet)"],
+        ["콘솔 테이블 (console table)"],
+        ["액자 (painting)", "벽 조명 (wall sconce)", "식물/화분 (plant, pot)"],
+    ),
+}
+
+
+# 방 이름에 들어 있는 단어 → 방 종류 (위에서부터 먼저 맞는 것, "안방화장실"은 욕실)
+ROOM_NAME_KEYWORDS = [
+    ("화장실", "bathroom"),
+    ("욕실", "bathroom"),
+    ("드레스", "dressroom"),
+    ("팬트리", "pantry"),
+    ("현관", "entrance"),
+    ("복도", "hallway"),
+    ("주방", "kitchen"),
+    ("부엌", "kitchen"),
+    ("식당", "dining"),
+    ("다이닝", "dining"),
+    ("거실", "living"),
+    ("안방", "bedroom"),
+    ("침실", "bedroom"),
+    ("방", "bedroom"),
+]
+
+DEFAULT_ROOM_TYPE = "living"
+
+
+def room_type_for(name):
+    """방 이름 ("안방화장실", "침실1" ...) → 방 종류 (모르면 None)"""
+    if name in ROOM_PROFILES:
+        return name
+    for keyword, room_type in ROOM_NAME_KEYWORDS:
+        if keyword in (name or ""):
+            return room_type
+    return None
+
+
+def get_room_profile(room=None):
+    """
+    방 종류 키 / 방 이름 / RoomProfile → RoomProfile
+
+    None이거나 알 수 없는 이름이면 기본(거실) 프로필
+    """
+    if isinstance(room, RoomProfile):
+        return room
+    room_type = room_type_for(room) if room is not None else None
+    if room is not None and room_type is None:
+        print(f"⚠️  알 수 없는 방 종류: {room} → 기본 프로필 사용")
+    return ROOM_PROFILES[room_type or DEFAULT_ROOM_TYPE]
+
+
+def load_room_profiles(source="connection.json"):
+    """connection.json 경로 또는 dict → {방 이름: RoomProfile}"""
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            source = json.load(f)
+    return {
+        room["name"]: get_room_profile(room["name"])
+        for room in source.get("rooms", [])
+        if room.get("name")
+    }
@@ -0,0 +1,179 @@
+import os
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+from .job_queue import get_job_queue
+
+
+# =============================================================================
+# 선행 3D 변환 (사용자가 고르기 전에 중요한 가구부터 미리 시작)
+# =============================================================================
+
+
+def _image_key(image):
+    """배경 제거 결과(bytes) → 해시 (process_2에서 같은 이미지를 찾을 때 사용)"""
+    if hasattr(image, "getbuffer"):
+        with image.getbuffer() as view:
+            return hashlib.sha256(view).hexdigest()
+    return hashlib.sha256(image).hexdigest()
+
+
+class Speculative3D:
+    def __init__(
+        self,
+        replicate_client,
+        model,
+        budget=2,
+        categories=("large",),
+        priorities=("high",),
+        poll_interval=2.0,
+        job_queue=None,
+    ):
+        """
+        model: 3D 변환 모델 (예: HUNYUAN3D_MODEL)
+        budget: 미리 시작할 최대 작업 수 (0이면 사용 안 함)
+        categories / priorities: 이 카테고리 또는 우선순위의 가구만 미리 시작
+        job_queue: 원격 작업 큐 (기본값: 프로세스 공유 큐) — 선행 작업은 배치 작업으로 넣음
+        """
+        self.replicate_client = replicate_client
+        self.model = model
+        self.budget = budget
+        self.categories = set(categories)
+        self.priorities = set(priorities)
+        self.poll_interval = poll_interval
+        self.job_queue = job_queue or get_job_queue()
+
+        self.jobs = {}  # 이미지 해시 → {"handle", "furniture", "started"}
+        self._lock = threading.Lock()
+
+    def eligible(self, furniture):
+        return (
+            furniture.get("category") in self.categories
+            or furniture.get("priority") in self.priorities
+        )
+
+    def _rank(self, furniture):
+        # large + high 가 먼저, 그 다음 면적이 큰 순
+        return (
+            furniture.get("category") not in self.categories,
+            furniture.get("priority") not in self.priorities,
+            -furniture.get("area", 0),
+        )
+
+    def start(self, images, furniture_list):
+        """
+        배경 제거된 이미지와 가구 정보(같은 순서)로 선행 작업 시작 → 시작한 작업 수
+
+        이미 시작한 이미지는 다시 시작하지 않음
+        """
+        candidates = [
+            (furniture, image)
+            for furniture, image in zip(furniture_list, images)
+            if furniture is not None and self.eligible(furniture)
+        ]
+        candidates.sort(key=lambda pair: self._rank(pair[0]))
+
+        started = 0
+        with self._lock:
+            for furniture, image in candidates:
+                if len(self.jobs) >= self.budget:
+                    break
+                key = _image_key(image)
+                if key in self.jobs:
+                    continue
+
+                handle = self.job_queue.submit_prediction(
+                    self.replicate_client,
+                    self.model,
+                    {"image": image, "remove_background": False},
+                    name=f"선행 3D {furniture.get('name', '')}".strip(),
+                    furniture=furniture,
+                    interactive=False,
+                    poll_interval=self.poll_interval,
+                )
+                self.jobs[key] = {
+                    "handle": handle,
+                    "furniture": furniture,
+                    "started": time.time(),
+                }
+                started += 1
+
+        if started:
+            print(f"🚀 선행 3D 변환 {started}개 시작 (예산 {self.budget}개)")
+        return started
+
+    def attach(self, image):
+        """선택된 이미지에 해당하는 선행 작업 (없으면 None)"""
+        with self._lock:
+            return self.jobs.get(_image_key(image))
+
+    def cancel_unselected(self, selected_images):
+        """선택되지 않은 선행 작업 취소 → 취소한 작업 수"""
+        selected = {_image_key(image) for image in selected_images}
+        canceled = 0
+        with self._lock:
+            for key, job in list(self.jobs.items()):
+                if key in selected:
+                    continue
+                job["handle"].cancel()
+                del self.jobs[key]
+                canceled += 1
+        if canceled:
+            print(f"🛑 선택되지 않은 선행 3D 변환 {canceled}개 취소")
+        return canceled
+
+    def confirm(self, selected_images):
+        """선택되지 않은 작업은 취소, 선택된 작업은 대화형으로 올려서 밀려나지 않게 함"""
+        self.cancel_unselected(selected_images)
+        with self._lock:
+            for job in self.jobs.values():
+                self.job_queue.promote(job["handle"])
+
+    def resolve(self, selected_images, output_dir="furniture_3d_models"):
+        """
+        선택된 이미지 중 선행 작업이 있는 것은 결과를 기다려 저장
+
+        → ({선택 인덱스: 저장 경로}, 선행 작업이 없거나 실패한 인덱스 목록)
+        선택되지 않은 작업은 먼저 취소
+        """
+        self.cancel_unselected(selected_images)
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        time_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        resolved = {}
+        remaining = []
+        for i, image in enumerate(selected_images):
+            job = self.attach(image)
+            if job is None:
+                remaining.append(i)
+                continue
+
+            waited = time.time()
+            try:
+                result = job["handle"].result() or {"status": job["handle"].status}
+            except Exception as e:
+                result = {"status": "failed", "error": str(e)}
+
+            if result.get("status") != "succeeded":
+                print(f"⚠️  선행 3D 변환 실패 → 다시 실행: {result.get('error')}")
+                remaining.append(i)
+                continue
+
+            path = os.path.join(output_dir, f"3d_spec_{i + 1}_{time_str}.glb")
+            with open(path, "wb") as f:
+                f.write(result["output"])
+            resolved[i] = path
+            print(
+                f"⚡ 선행 3D 결과 사용: {job['furniture'].get('name')} (대기 {time.time() - waited:.1f}초)"
+            )
+
+        with self._lock:
+            self.jobs = {}
+        return resolved, remaining
+
+    def shutdown(self):
+        """남은 작업을 모두 취소"""
+        self.cancel_unselected([])
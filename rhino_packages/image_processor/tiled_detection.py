@@ -0,0 +1,216 @@
+import io
+
+import numpy as np
+
+
+# =============================================================================
+# 타일 인식 (큰 캡처/파노라마를 겹치는 타일로 나눠 인식한 뒤 전체 좌표로 병합)
+# =============================================================================
+
+
+class TilePlan:
+    def __init__(
+        self,
+        tile_size=1024,
+        overlap=0.2,
+        coarse_side=512,
+        coarse_detail="low",
+        min_side=2560,
+        roi_margin=0.15,
+        min_detail=12.0,
+        all_tiles=False,
+        max_workers=4,
+    ):
+        """
+        tile_size: 타일 한 변 (픽셀) — 요청 하나의 전송량 상한
+        overlap: 이웃 타일과 겹치는 비율 (경계에 걸친 가구가 한쪽에는 온전히 들어가도록)
+        coarse_side / coarse_detail: 저해상도 전체 인식의 긴 변 크기와 GPT detail
+        min_side: 긴 변이 이보다 클 때만 타일 인식 사용
+        roi_margin: 저해상도에서 찾은 가구 박스를 관심 영역으로 넓히는 비율
+        min_detail: 저해상도에서 이웃 픽셀 색 차이(경계)가 이 이상인 타일도 관심 영역
+                    (빈 벽/천장은 제외)
+        all_tiles: True면 관심 영역과 관계없이 모든 타일 인식 (파노라마 등)
+        max_workers: 동시에 보낼 타일 요청 수
+        """
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.coarse_side = coarse_side
+        self.coarse_detail = coarse_detail
+        self.min_side = min_side
+        self.roi_margin = roi_margin
+        self.min_detail = min_detail
+        self.all_tiles = all_tiles
+        self.max_workers = max_workers
+
+    def needs_tiling(self, width, height):
+        return max(width, height) > self.min_side
+
+    def tiles(self, width, height):
+        """이미지 전체를 덮는 겹치는 타일 박스 목록 (마지막 타일은 이미지 끝에 맞춤)"""
+        return [
+            [x, y, min(width, x + self.tile_size), min(height, y + self.tile_size)]
+            for y in _tile_starts(height, self.tile_size, self.overlap)
+            for x in _tile_starts(width, self.tile_size, self.overlap)
+        ]
+
+    def select_tiles(self, width, height, boxes, coarse_pixels=None):
+        """
+        관심 영역 타일만 선택 (all_tiles면 전체)
+
+        boxes: 저해상도 인식에서 찾은 가구 박스 (원본 좌표) — 넓혀서 겹치는 타일 선택
+        coarse_pixels: 저해상도 RGB 배열 — 경계(물체)가 있는 타일도 선택
+                     (저해상도에서는 안 보이는 작은 소품을 놓치지 않도록)
+        """
+        tiles = self.tiles(width, height)
+        if self.all_tiles:
+            return tiles
+        regions = [_expand(box, self.roi_margin, width, height) for box in boxes]
+        selected = []
+        for tile in tiles:
+            if any(_intersects(tile, r) for r in regions):
+                selected.append(tile)
+            elif coarse_pixels is not None and self._detail(tile, width, coarse_pixels):
+                selected.append(tile)
+        return selected
+
+    def _detail(self, tile, width, coarse_pixels):
+        scale = coarse_pixels.shape[1] / float(width)
+        x1, y1, x2, y2 = [int(v * scale) for v in tile]
+        patch = coarse_pixels[y1 : max(y1 + 2, y2), x1 : max(x1 + 2, x2)]
+        if patch.shape[0] < 2 or patch.shape[1] < 2:
+            return False
+        edges = max(
+            float(np.abs(np.diff(patch, axis=0)).max()),
+            float(np.abs(np.diff(patch, axis=1)).max()),
+        )
+        return edges >= self.min_detail
+
+    def __repr__(self):
+        return f"TilePlan(tile_size={self.tile_size}, overlap={self.overlap})"
+
+
+def _tile_starts(length, tile_size, overlap):
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    starts = list(range(0, length - tile_size, stride))
+    starts.append(length - tile_size)
+    return starts
+
+
+def _expand(box, ratio, width, height):
+    x1, y1, x2, y2 = box
+    dx = (x2 - x1) * ratio
+    dy = (y2 - y1) * ratio
+    return [
+        max(0, x1 - dx),
+        max(0, y1 - dy),
+        min(width, x2 + dx),
+        min(height, y2 + dy),
+    ]
+
+
+def _intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def box_iou(a, b):
+    """두 박스의 IoU (교집합 / 합집합)"""
+    if not _intersects(a, b):
+        return 0.0
+    inter = (min(a[2], b[2]) - max(a[0], b[0])) * (min(a[3], b[3]) - max(a[1], b[1]))
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / float(union) if union > 0 else 0.0
+
+
+def encode_jpeg(pil_img, quality=90):
+    """GPT 전송용 JPEG bytes (알파는 버림)"""
+    buf = io.BytesIO()
+    pil_img.convert("RGB").save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def scale_furniture(furniture_list, factor):
+    """저해상도에서 찾은 가구 박스를 원본 좌표로 확대"""
+    return [
+        dict(f, box=[int(round(v * factor)) for v in f.get("box", [])])
+        for f in furniture_list
+    ]
+
+
+def place_tile_detections(furniture_list, tile, img_width, img_height, tolerance=4):
+    """
+    타일 좌표 → 전체 좌표로 이동하고, 타일 안쪽 경계에 닿은 박스는 "truncated"로 표시
+
+    이미지 바깥 경계에 닿은 것은 잘린 것이 아니므로 표시하지 않음
+    """
+    tx1, ty1, tx2, ty2 = tile
+    placed = []
+    for furniture in furniture_list:
+        x1, y1, x2, y2 = furniture["box"]
+        box = [x1 + tx1, y1 + ty1, x2 + tx1, y2 + ty1]
+        truncated = (
+            (tx1 > 0 and box[0] - tx1 <= tolerance)
+            or (ty1 > 0 and box[1] - ty1 <= tolerance)
+            or (tx2 < img_width and tx2 - box[2] <= tolerance)
+            or (ty2 < img_height and ty2 - box[3] <= tolerance)
+        )
+        placed.append(dict(furniture, box=box, truncated=truncated, tile=list(tile)))
+    return placed
+
+
+def merge_tile_detections(furniture_list):
+    """
+    타일 경계에서 잘린 같은 이름의 조각끼리 겹치면 하나의 박스로 합침 (여러 타일에 걸치면 반복)
+
+    잘리지 않은 박스는 그대로 둠
+    """
+    whole = [f for f in furniture_list if not f.get("truncated")]
+    pieces = [dict(f) for f in furniture_list if f.get("truncated")]
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(pieces)):
+            for j in range(i + 1, len(pieces)):
+                a, b = pieces[i], pieces[j]
+                # 같은 타일 안의 두 박스는 서로 다른 물체
+                same_tile = a["tile"] is not None and a["tile"] == b["tile"]
+                if a["name"] != b["name"] or same_tile:
+                    continue
+                if not _intersects(a["box"], b["box"]):
+                    continue
+                a["box"] = [
+                    min(a["box"][0], b["box"][0]),
+                    min(a["box"][1], b["box"][1]),
+                    max(a["box"][2], b["box"][2]),
+                    max(a["box"][3], b["box"][3]),
+                ]
+                a["tile"] = None
+                del pieces[j]
+                merged = True
+                break
+            if merged:
+                break
+
+    for piece in pieces:
+        x1, y1, x2, y2 = piece["box"]
+        piece["area"] = (x2 - x1) * (y2 - y1)
+    return whole + pieces
+
+
+def suppress_coarse(coarse, fine, iou_threshold=0.5):
+    """
+    교차 억제: 저해상도 박스와 같은 물체로 보이는 타일 박스가 있으면 더 정확한 타일 박스를 사용
+
+    저해상도에서만 찾은 가구(타일에서 놓친 큰 가구 등)는 그대로 유지
+    """
+    kept = [
+        c
+        for c in coarse
+        if not any(
+            not f.get("truncated") and box_iou(c["box"], f["box"]) > iou_threshold
+            for f in fine
+        )
+    ]
+    return kept + fine
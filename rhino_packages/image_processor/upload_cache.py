@@ -0,0 +1,170 @@
+import io
+import os
+import hashlib
+import threading
+from PIL import Image
+from datetime import datetime, timedelta, timezone
+
+from .encoding_policy import encode_for_model
+
+
+# =============================================================================
+# Replicate 입력 업로드 캐시 (같은 이미지는 한 번만 업로드)
+# =============================================================================
+
+
+def _parse_expiry(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _as_buffer(image):
+    """업로드 대상 → (해시용 버퍼, 파일 이름). URL 문자열은 None"""
+    if isinstance(image, str):
+        if image.startswith(("http://", "https://", "data:")):
+            return None, None
+        with open(image, "rb") as f:
+            return f.read(), os.path.basename(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return memoryview(image), None
+    if isinstance(image, Image.Image):
+        buf = io.BytesIO()
+        image.save(buf, format="PNG")
+        return buf.getvalue(), "input.png"
+    if isinstance(image, io.BytesIO):
+        # getbuffer()는 복사 없이 내부 버퍼를 그대로 참조
+        return image.getbuffer(), getattr(image, "name", None)
+    if hasattr(image, "read"):
+        position = image.tell() if hasattr(image, "tell") else None
+        data = image.read()
+        if position is not None:
+            image.seek(position)
+        return data, getattr(image, "name", None)
+    return None, None
+
+
+def image_digest(image):
+    """이미지 내용의 sha256 (URL 문자열이면 URL 자체의 해시)"""
+    buffer, _ = _as_buffer(image)
+    if buffer is None:
+        return hashlib.sha256(str(image).encode("utf-8")).hexdigest()
+    try:
+        return hashlib.sha256(buffer).hexdigest()
+    finally:
+        if isinstance(buffer, memoryview):
+            buffer.release()
+
+
+class UploadManager:
+    def __init__(
+        self,
+        replicate_client,
+        default_ttl=timedelta(hours=23),
+        margin=timedelta(minutes=10),
+    ):
+        """
+        replicate_client: replicate.Client
+        default_ttl: 응답에 만료 시각이 없을 때 사용할 유효 기간
+        margin: 만료 직전 URL은 다시 업로드 (예측 실행 중 만료 방지)
+        """
+        self.replicate_client = replicate_client
+        self.default_ttl = default_ttl
+        self.margin = margin
+        self._cache = {}  # sha256 → (url, expires_at)
+        self._pending = {}  # sha256 → threading.Event (동시 업로드 중복 방지)
+        self._lock = threading.Lock()
+        self.upload_count = 0
+        self.hit_count = 0
+        self.uploaded_bytes = 0
+
+    def url_for(self, image, model=None):
+        """
+        이미지(BytesIO/bytes/경로)를 업로드하고 URL 반환 — 캐시된 URL이 있으면 재사용
+
+        model: 지정하면 업로드 전에 해당 모델의 인코딩 정책 적용
+        """
+        if model is not None:
+            image = encode_for_model(model, image)
+        buffer, name = _as_buffer(image)
+        if buffer is None:
+            return image
+
+        try:
+            return self._url_for_buffer(buffer, name)
+        finally:
+            if isinstance(buffer, memoryview):
+                # BytesIO 내부 버퍼 참조 해제 (이후 BytesIO 크기 변경 가능하도록)
+                buffer.release()
+
+    def _url_for_buffer(self, buffer, name):
+        digest = hashlib.sha256(buffer).hexdigest()
+        while True:
+            with self._lock:
+                cached = self._cache.get(digest)
+                now = datetime.now(timezone.utc)
+                if cached is not None and cached[1] - self.margin > now:
+                    self.hit_count += 1
+                    return cached[0]
+
+                pending = self._pending.get(digest)
+                if pending is None:
+                    pending = threading.Event()
+                    self._pending[digest] = pending
+                    break
+            # 다른 스레드가 같은 이미지를 업로드 중이면 끝날 때까지 기다렸다가 캐시 확인
+            pending.wait()
+
+        try:
+            url, expires_at = self._upload(buffer, name, digest)
+            with self._lock:
+                self._cache[digest] = (url, expires_at)
+            return url
+        finally:
+            with self._lock:
+                del self._pending[digest]
+            pending.set()
+
+    def _upload(self, buffer, name, digest):
+        upload = io.BytesIO(buffer)
+        upload.name = name or f"{digest[:16]}.bin"
+        uploaded = self.replicate_client.files.create(
+            upload, metadata={"sha256": digest}
+        )
+
+        url = uploaded.urls["get"]
+        expires_at = _parse_expiry(getattr(uploaded, "expires_at", None))
+        if expires_at is None:
+            expires_at = datetime.now(timezone.utc) + self.default_ttl
+
+        self.upload_count += 1
+        self.uploaded_bytes += len(buffer)
+        print(f"📤 업로드 완료: {upload.name} ({len(buffer):,} bytes)")
+        return url, expires_at
+
+    def prepare_input(self, input):
+        """모델 입력 dict의 파일 값(리스트 포함)을 업로드 URL로 교체한 사본 반환"""
+        prepared = {}
+        for key, value in input.items():
+            if isinstance(value, list):
+                prepared[key] = [self._prepare_value(v) for v in value]
+            else:
+                prepared[key] = self._prepare_value(value)
+        return prepared
+
+    def _prepare_value(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview, io.IOBase)):
+            return self.url_for(value)
+        return value
+
+    def stats(self):
+        return {
+            "uploads": self.upload_count,
+            "cache_hits": self.hit_count,
+            "uploaded_bytes": self.uploaded_bytes,
+        }
@@ -0,0 +1,102 @@
+import io
+import time
+
+from PIL import Image
+
+
+# =============================================================================
+# 업스케일 정책 (필요한 만큼만, 작은 배율은 로컬에서)
+# =============================================================================
+
+
+class UpscalePolicy:
+    # bria/increase-resolution이 지원하는 배율
+    REMOTE_FACTORS = (2, 4)
+
+    def __init__(self, target_short_side=1024, local_max_factor=2.0, min_factor=1.1):
+        """
+        target_short_side: 짧은 변이 이 크기보다 작을 때만 업스케일
+        local_max_factor: 이 배율 이하는 원격 호출 없이 로컬 Lanczos로 처리 (1.0이면 항상 원격)
+        min_factor: 필요한 배율이 이보다 작으면 그대로 둠
+        """
+        self.target_short_side = target_short_side
+        self.local_max_factor = local_max_factor
+        self.min_factor = min_factor
+
+    def plan(self, width, height):
+        """→ ("skip" | "local" | "remote", 배율)"""
+        needed = self.target_short_side / float(min(width, height))
+        if needed <= self.min_factor:
+            return "skip", 1.0
+        if needed <= self.local_max_factor:
+            return "local", needed
+        for factor in self.REMOTE_FACTORS:
+            if factor >= needed:
+                return "remote", factor
+        return "remote", self.REMOTE_FACTORS[-1]
+
+    def __repr__(self):
+        return (
+            f"UpscalePolicy(target_short_side={self.target_short_side}, "
+            f"local_max_factor={self.local_max_factor})"
+        )
+
+
+# 단계별로 이름으로 고를 수 있는 기본 정책
+UPSCALE_PRESETS = {
+    # 원격 호출 없이 로컬 리샘플만 (지연 최소)
+    "fast": UpscalePolicy(target_short_side=768, local_max_factor=float("inf")),
+    # 2배 이하는 로컬, 그 이상만 Bria
+    "balanced": UpscalePolicy(target_short_side=1024, local_max_factor=2.0),
+    # 필요하면 항상 Bria (품질 우선)
+    "quality": UpscalePolicy(target_short_side=2048, local_max_factor=1.0),
+}
+
+
+def get_upscale_policy(policy):
+    """None / 프리셋 이름 / UpscalePolicy → UpscalePolicy 또는 None"""
+    if policy is None or isinstance(policy, UpscalePolicy):
+        return policy
+    if policy in UPSCALE_PRESETS:
+        return UPSCALE_PRESETS[policy]
+    raise ValueError(f"알 수 없는 업스케일 정책: {policy}")
+
+
+def load_pil_image(image):
+    """BytesIO / bytes / 경로 / PIL 이미지 → PIL 이미지 (URL이면 None)"""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, str):
+        if image.startswith(("http://", "https://", "data:")):
+            return None
+        return Image.open(image)
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(image))
+    if hasattr(image, "read"):
+        if hasattr(image, "seek"):
+            image.seek(0)
+        img = Image.open(image)
+        img.load()
+        if hasattr(image, "seek"):
+            image.seek(0)
+        return img
+    return None
+
+
+def encode_png(pil_img):
+    buf = io.BytesIO()
+    pil_img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def local_upscale(pil_img, factor):
+    """Lanczos 리샘플로 배율만큼 확대 → PNG bytes (알파 유지)"""
+    start = time.time()
+    width, height = pil_img.size
+    size = (max(1, round(width * factor)), max(1, round(height * factor)))
+    resized = pil_img.resize(size, Image.LANCZOS)
+    data = encode_png(resized)
+    print(
+        f"   🖼️  로컬 업스케일 {width}x{height} → {size[0]}x{size[1]} ({time.time() - start:.2f}초)"
+    )
+    return data
@@ -15,66 +15,14 @@ from io import BytesIO
 import os
 import json
 
+from .room_profiles import ALL_QUERIES, get_room_profile
 
-def image_detection_by_replicate(client, img_file, count=5, confidence_thrshold=0.45):
-    queries = [
-        # 가구
-        "sofa",
-        "armchair",
-        "dining table",
-        "coffee table",
-        "side table",
-        "bed",
-        "bunk bed",
-        "desk",
-        "office chair",
-        "wardrobe",
-        "dresser",
-        "bookshelf",
-        "cabinet",
-        "drawer",
-        # 주방 가구 및 가전
-        "kitchen cabinet",
-        "sink",
-        "stove",
-        "oven",
-        "microwave",
-        "refrigerator",
-        "dishwasher",
-        "kitchen island",
-        "range hood",
-        # 조명
-        "ceiling light",
-        "pendant light",
-        "chandelier",
-        "floor lamp",
-        "table lamp",
-        "wall sconce",
-        # 소품 / 장식
-        "curtain",
-        "rug",
-        "mirror",
-        "painting",
-        "clock",
-        "plant",
-        "vase",
-        "pillow",
-        "blanket",
-        # 욕실
-        "bathtub",
-        "shower",
-        "toilet",
-        "washbasin",
-        "mirror cabinet",
-        "towel rack",
-        # 전자기기
-        "television",
-        "monitor",
-        "speaker",
-        "air conditioner",
-        "heater",
-        "fan",
-    ]
+
+def image_detection_by_replicate(
+    client, img_file, count=5, confidence_thrshold=0.45, room=None
+):
+    # room: 방 이름/종류 — 지정하면 그 방에 있을 만한 가구만 질의 (없으면 전체 목록)
+    queries = get_room_profile(room).queries if room is not None else ALL_QUERIES
     dino_output = client.run(
         "adirik/grounding-dino:efd10a8ddc57ea28773327e881ce95e20cc1d734c589f7dd01d2036921ed78aa",
         input={
@@ -0,0 +1,2 @@
+from .glb_inspector import *
+from .ply_reader import *
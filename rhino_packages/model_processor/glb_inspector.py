@@ -0,0 +1,365 @@
+import os
+import json
+import mmap
+import struct
+import time
+
+
+# =============================================================================
+# GLB 헤더/메타데이터 검사 (바이너리 페이로드는 읽지 않음)
+# =============================================================================
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+# glTF primitive mode → 삼각형 수 계산식
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+INDEX_VERSION = 1
+
+
+def read_glb_json(glb_path):
+    """GLB 파일을 메모리 매핑해서 JSON 청크만 파싱"""
+    with open(glb_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            gltf, bin_offset = _parse_json_chunk(mm, glb_path)
+            image_sizes = _peek_image_sizes(mm, gltf, bin_offset)
+    return gltf, image_sizes
+
+
+def _parse_json_chunk(mm, glb_path):
+    if len(mm) < 20:
+        raise ValueError(f"GLB 파일이 너무 작음: {glb_path}")
+
+    magic, version, length = struct.unpack_from("<4sII", mm, 0)
+    if magic != GLB_MAGIC:
+        raise ValueError(f"GLB 파일이 아님: {glb_path}")
+    if version != 2:
+        raise ValueError(f"지원하지 않는 glTF 버전 {version}: {glb_path}")
+
+    chunk_length, chunk_type = struct.unpack_from("<II", mm, 12)
+    if chunk_type != CHUNK_JSON:
+        raise ValueError(f"첫 청크가 JSON이 아님: {glb_path}")
+
+    gltf = json.loads(mm[20 : 20 + chunk_length].decode("utf-8"))
+
+    # BIN 청크 시작 위치 (데이터는 읽지 않고 오프셋만 기록)
+    bin_offset = None
+    next_chunk = 20 + chunk_length
+    if next_chunk + 8 <= min(length, len(mm)):
+        _, next_type = struct.unpack_from("<II", mm, next_chunk)
+        if next_type == CHUNK_BIN:
+            bin_offset = next_chunk + 8
+    return gltf, bin_offset
+
+
+def _peek_image_sizes(mm, gltf, bin_offset):
+    """텍스처 크기: 이미지 헤더 몇십 바이트만 확인 (픽셀 데이터는 건드리지 않음)"""
+    sizes = []
+    buffer_views = gltf.get("bufferViews", [])
+    for image in gltf.get("images", []):
+        view_index = image.get("bufferView")
+        if view_index is None or bin_offset is None:
+            # 외부 URI 이미지는 크기를 알 수 없음
+            sizes.append({"mime_type": image.get("mimeType"), "bytes": None})
+            continue
+
+        view = buffer_views[view_index]
+        start = bin_offset + view.get("byteOffset", 0)
+        byte_length = view["byteLength"]
+        width, height = _image_header_size(mm, start, byte_length)
+        sizes.append(
+            {
+                "mime_type": image.get("mimeType"),
+                "bytes": byte_length,
+                "width": width,
+                "height": height,
+            }
+        )
+    return sizes
+
+
+def _image_header_size(mm, start, byte_length):
+    head = mm[start : start + min(byte_length, 32)]
+
+    # PNG: IHDR 청크에 가로/세로 저장
+    if head[:8] == b"\x89PNG\r\n\x1a\n" and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+
+    # JPEG: SOF 마커까지 세그먼트 헤더만 건너뛰며 탐색
+    if head[:2] == b"\xff\xd8":
+        pos = start + 2
+        end = start + byte_length
+        while pos + 9 <= end:
+            if mm[pos] != 0xFF:
+                break
+            marker = mm[pos + 1]
+            segment_length = struct.unpack(">H", mm[pos + 2 : pos + 4])[0]
+            if marker in (0xC0, 0xC1, 0xC2):
+                height, width = struct.unpack(">HH", mm[pos + 5 : pos + 9])
+                return width, height
+            pos += 2 + segment_length
+    return None, None
+
+
+# -----------------------------------------------------------------------------
+# 행렬 유틸 (노드 변환을 적용한 바운딩 박스 계산용)
+# -----------------------------------------------------------------------------
+
+
+def _identity():
+    return [[1.0 if i == j else 0.0 for j in range(4)] for i in range(4)]
+
+
+def _matmul(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+
+
+def _node_matrix(node):
+    if "matrix" in node:
+        m = node["matrix"]  # column-major
+        return [[m[col * 4 + row] for col in range(4)] for row in range(4)]
+
+    tx, ty, tz = node.get("translation", [0.0, 0.0, 0.0])
+    qx, qy, qz, qw = node.get("rotation", [0.0, 0.0, 0.0, 1.0])
+    sx, sy, sz = node.get("scale", [1.0, 1.0, 1.0])
+
+    r = [
+        [1 - 2 * (qy * qy + qz * qz), 2 * (qx * qy - qz * qw), 2 * (qx * qz + qy * qw)],
+        [2 * (qx * qy + qz * qw), 1 - 2 * (qx * qx + qz * qz), 2 * (qy * qz - qx * qw)],
+        [2 * (qx * qz - qy * qw), 2 * (qy * qz + qx * qw), 1 - 2 * (qx * qx + qy * qy)],
+    ]
+    return [
+        [r[0][0] * sx, r[0][1] * sy, r[0][2] * sz, tx],
+        [r[1][0] * sx, r[1][1] * sy, r[1][2] * sz, ty],
+        [r[2][0] * sx, r[2][1] * sy, r[2][2] * sz, tz],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+
+
+def _transform_box(matrix, box_min, box_max):
+    corners = [
+        (x, y, z)
+        for x in (box_min[0], box_max[0])
+        for y in (box_min[1], box_max[1])
+        for z in (box_min[2], box_max[2])
+    ]
+    points = []
+    for corner in corners:
+        p = list(corner) + [1.0]
+        points.append([sum(matrix[row][k] * p[k] for k in range(4)) for row in range(3)])
+    return (
+        [min(p[i] for p in points) for i in range(3)],
+        [max(p[i] for p in points) for i in range(3)],
+    )
+
+
+def _mesh_instances(gltf):
+    """(mesh_index, world_matrix) 목록 — 씬 그래프가 없으면 모든 메시를 원점에 둠"""
+    nodes = gltf.get("nodes", [])
+    scenes = gltf.get("scenes", [])
+    if not nodes:
+        return [(i, _identity()) for i in range(len(gltf.get("meshes", [])))]
+
+    if scenes:
+        roots = scenes[gltf.get("scene", 0)].get("nodes", [])
+    else:
+        children = {c for node in nodes for c in node.get("children", [])}
+        roots = [i for i in range(len(nodes)) if i not in children]
+
+    instances = []
+    stack = [(root, _identity()) for root in roots]
+    while stack:
+        node_index, parent_matrix = stack.pop()
+        node = nodes[node_index]
+        world = _matmul(parent_matrix, _node_matrix(node))
+        if "mesh" in node:
+            instances.append((node["mesh"], world))
+        for child in node.get("children", []):
+            stack.append((child, world))
+    return instances
+
+
+def _primitive_triangles(gltf, primitive):
+    accessors = gltf.get("accessors", [])
+    mode = primitive.get("mode", MODE_TRIANGLES)
+    if "indices" in primitive:
+        count = accessors[primitive["indices"]]["count"]
+    else:
+        position = primitive.get("attributes", {}).get("POSITION")
+        count = accessors[position]["count"] if position is not None else 0
+
+    if mode == MODE_TRIANGLES:
+        return count // 3
+    if mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+        return max(0, count - 2)
+    return 0
+
+
+def inspect_glb(glb_path):
+    """GLB 메타데이터 (삼각형/정점 수, 바운딩 박스, 텍스처, 재질 수) 반환"""
+    gltf, image_sizes = read_glb_json(glb_path)
+    accessors = gltf.get("accessors", [])
+    meshes = gltf.get("meshes", [])
+
+    triangle_count = 0
+    vertex_count = 0
+    bbox_min = [float("inf")] * 3
+    bbox_max = [float("-inf")] * 3
+
+    for mesh_index, world in _mesh_instances(gltf):
+        for primitive in meshes[mesh_index].get("primitives", []):
+            triangle_count += _primitive_triangles(gltf, primitive)
+
+            position = primitive.get("attributes", {}).get("POSITION")
+            if position is None:
+                continue
+            accessor = accessors[position]
+            vertex_count += accessor["count"]
+            if "min" in accessor and "max" in accessor:
+                box_min, box_max = _transform_box(world, accessor["min"], accessor["max"])
+                bbox_min = [min(a, b) for a, b in zip(bbox_min, box_min)]
+                bbox_max = [max(a, b) for a, b in zip(bbox_max, box_max)]
+
+    has_bbox = bbox_min[0] != float("inf")
+    return {
+        "generator": gltf.get("asset", {}).get("generator"),
+        "triangle_count": triangle_count,
+        "vertex_count": vertex_count,
+        "bbox_min": bbox_min if has_bbox else None,
+        "bbox_max": bbox_max if has_bbox else None,
+        "size": [b - a for a, b in zip(bbox_min, bbox_max)] if has_bbox else None,
+        "mesh_count": len(meshes),
+        "material_count": len(gltf.get("materials", [])),
+        "texture_count": len(gltf.get("textures", [])),
+        "textures": image_sizes,
+        "buffer_bytes": sum(b.get("byteLength", 0) for b in gltf.get("buffers", [])),
+    }
+
+
+# =============================================================================
+# 영구 인덱스 (mtime/size 기준 증분 갱신)
+# =============================================================================
+
+
+class GLBIndex:
+    def __init__(self, index_path="furniture_3d_models/index.json"):
+        self.index_path = index_path
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == INDEX_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        index_dir = os.path.dirname(self.index_path)
+        if index_dir and not os.path.exists(index_dir):
+            os.makedirs(index_dir)
+
+        # 중간에 끊겨도 기존 인덱스가 깨지지 않도록 임시 파일 후 교체
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": INDEX_VERSION, "entries": self.entries},
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self, model_dir="furniture_3d_models", recursive=True):
+        """폴더를 스캔해서 새로 생기거나 바뀐 파일만 다시 검사"""
+        start = time.time()
+        seen = set()
+        updated = 0
+        failed = 0
+
+        for path, stat in _scan_glb_files(model_dir, recursive):
+            key = os.path.abspath(path)
+            seen.add(key)
+            entry = self.entries.get(key)
+            if (
+                entry is not None
+                and entry["mtime"] == stat.st_mtime
+                and entry["file_size"] == stat.st_size
+            ):
+                continue
+
+            try:
+                meta = inspect_glb(path)
+            except Exception as e:
+                print(f"❌ GLB 검사 실패 ({path}): {e}")
+                failed += 1
+                continue
+
+            meta["mtime"] = stat.st_mtime
+            meta["file_size"] = stat.st_size
+            self.entries[key] = meta
+            updated += 1
+
+        # 폴더 밖으로 사라진 파일 정리
+        root = os.path.abspath(model_dir)
+        removed = [
+            key
+            for key in self.entries
+            if key.startswith(root + os.sep) and key not in seen
+        ]
+        for key in removed:
+            del self.entries[key]
+
+        if updated or removed:
+            self.save()
+
+        print(
+            f"📊 GLB 인덱스: {len(seen)}개 중 {updated}개 갱신, {len(removed)}개 삭제, {failed}개 실패 ({time.time() - start:.2f}초)"
+        )
+        return self.entries
+
+    def query(self, max_triangles=None, max_file_size=None, max_texture_size=None):
+        """예산 조건에 맞는 에셋 목록"""
+        results = []
+        for path, meta in self.entries.items():
+            if max_triangles is not None and meta["triangle_count"] > max_triangles:
+                continue
+            if max_file_size is not None and meta["file_size"] > max_file_size:
+                continue
+            if max_texture_size is not None and any(
+                max(t.get("width") or 0, t.get("height") or 0) > max_texture_size
+                for t in meta["textures"]
+            ):
+                continue
+            results.append((path, meta))
+        return results
+
+    def duplicates(self):
+        """삼각형 수/크기/바운딩 박스가 같은 에셋을 중복 후보로 묶음"""
+        groups = {}
+        for path, meta in self.entries.items():
+            key = (
+                meta["triangle_count"],
+                meta["vertex_count"],
+                meta["buffer_bytes"],
+                tuple(round(v, 5) for v in (meta["size"] or [])),
+            )
+            groups.setdefault(key, []).append(path)
+        return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def _scan_glb_files(model_dir, recursive):
+    stack = [model_dir]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.name.lower().endswith(".glb"):
+                    yield entry.path, entry.stat()
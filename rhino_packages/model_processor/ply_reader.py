@@ -0,0 +1,371 @@
+import numpy as np
+
+from ..plan_processor.floor_plan import MassingMesh
+
+try:
+    import Rhino.Geometry as geo
+except ImportError:
+    # 헤드리스 환경에서는 numpy 배열만 생성
+    geo = None
+
+
+# =============================================================================
+# 바이너리 PLY 읽기 (Trellis 가우시안 스플랫 출력, 메모리 매핑)
+# =============================================================================
+
+PLY_TYPES = {
+    "char": "i1",
+    "int8": "i1",
+    "uchar": "u1",
+    "uint8": "u1",
+    "short": "i2",
+    "int16": "i2",
+    "ushort": "u2",
+    "uint16": "u2",
+    "int": "i4",
+    "int32": "i4",
+    "uint": "u4",
+    "uint32": "u4",
+    "float": "f4",
+    "float32": "f4",
+    "double": "f8",
+    "float64": "f8",
+}
+
+PLY_FORMATS = {"binary_little_endian": "<", "binary_big_endian": ">"}
+
+# 0차 구면 조화 계수 → RGB (3D Gaussian Splatting 규약)
+SH_C0 = 0.28209479177387814
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def read_ply_header(ply_path):
+    """
+    PLY 헤더 파싱 → {"format", "header_length", "elements": [(이름, 개수, dtype), ...]}
+
+    list 속성이 있는 요소는 고정 크기가 아니므로 dtype이 None
+    """
+    with open(ply_path, "rb") as f:
+        if f.readline().strip() != b"ply":
+            raise ValueError(f"PLY 파일이 아님: {ply_path}")
+
+        fmt = None
+        elements = []
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError(f"PLY 헤더가 끝나지 않음: {ply_path}")
+            words = line.decode("ascii", "replace").split()
+            if not words or words[0] in ("comment", "obj_info"):
+                continue
+            if words[0] == "end_header":
+                break
+            if words[0] == "format":
+                if words[1] not in PLY_FORMATS:
+                    raise ValueError(f"바이너리 PLY만 지원: {words[1]}")
+                fmt = PLY_FORMATS[words[1]]
+            elif words[0] == "element":
+                elements.append([words[1], int(words[2]), []])
+            elif words[0] == "property":
+                if words[1] == "list":
+                    elements[-1][2] = None
+                elif elements[-1][2] is not None:
+                    elements[-1][2].append((words[2], fmt + PLY_TYPES[words[1]]))
+        header_length = f.tell()
+
+    return {
+        "format": fmt,
+        "header_length": header_length,
+        "elements": [
+            (name, count, np.dtype(fields) if fields is not None else None)
+            for name, count, fields in elements
+        ],
+    }
+
+
+class PlyFile:
+    def __init__(self, ply_path, element="vertex"):
+        """
+        바이너리 PLY의 한 요소(기본: vertex)를 구조화 배열로 메모리 매핑
+
+        self.data는 파일을 가리키는 np.memmap — 필요한 부분만 디스크에서 읽음
+        """
+        self.path = ply_path
+        self.header = read_ply_header(ply_path)
+
+        offset = self.header["header_length"]
+        for name, count, dtype in self.header["elements"]:
+            if dtype is None:
+                raise ValueError(f"list 속성이 있는 요소는 지원하지 않음: {name}")
+            if name == element:
+                break
+            offset += count * dtype.itemsize
+        else:
+            raise ValueError(f"PLY에 {element} 요소가 없음: {ply_path}")
+
+        self.dtype = dtype
+        self.count = count
+        self.data = np.memmap(
+            ply_path, dtype=dtype, mode="r", offset=offset, shape=(count,)
+        )
+
+    @property
+    def properties(self):
+        return list(self.dtype.names)
+
+    @property
+    def is_gaussian(self):
+        return {"opacity", "f_dc_0", "scale_0"} <= set(self.dtype.names)
+
+    def __len__(self):
+        return self.count
+
+    def chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """chunk_size개씩 잘라낸 뷰 (복사 없음)"""
+        for start in range(0, self.count, chunk_size):
+            yield self.data[start : start + chunk_size]
+
+    def close(self):
+        mm = getattr(self.data, "_mmap", None)
+        self.data = None
+        if mm is not None:
+            mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# =============================================================================
+# 청크 단위 속성 변환
+# =============================================================================
+
+
+def chunk_positions(chunk):
+    return np.stack([chunk["x"], chunk["y"], chunk["z"]], axis=1).astype(np.float32)
+
+
+def chunk_opacity(chunk):
+    """가우시안 opacity(logit) → 0~1, 없으면 1"""
+    if "opacity" not in chunk.dtype.names:
+        return np.ones(len(chunk), dtype=np.float32)
+    return (1.0 / (1.0 + np.exp(-chunk["opacity"].astype(np.float32)))).astype(
+        np.float32
+    )
+
+
+def chunk_colors(chunk):
+    """RGB 0~1 (가우시안은 f_dc 계수, 일반 PLY는 red/green/blue)"""
+    names = chunk.dtype.names
+    if "f_dc_0" in names:
+        dc = np.stack([chunk["f_dc_0"], chunk["f_dc_1"], chunk["f_dc_2"]], axis=1)
+        return np.clip(0.5 + SH_C0 * dc.astype(np.float32), 0.0, 1.0)
+    if "red" in names:
+        rgb = np.stack([chunk["red"], chunk["green"], chunk["blue"]], axis=1)
+        return rgb.astype(np.float32) / 255.0
+    return np.full((len(chunk), 3), 0.7, dtype=np.float32)
+
+
+class SplatPoints:
+    def __init__(self, positions, colors, opacity):
+        self.positions = positions  # (N, 3) float32
+        self.colors = colors  # (N, 3) float32, 0~1
+        self.opacity = opacity  # (N,) float32
+
+    def __len__(self):
+        return len(self.positions)
+
+    def to_rhino(self):
+        """라이노 안에서 실행될 때 색이 있는 Rhino.Geometry.PointCloud로 변환"""
+        if geo is None:
+            raise Exception("Rhino is not available.")
+        from System.Drawing import Color
+
+        cloud = geo.PointCloud()
+        rgb = (self.colors * 255).astype(np.uint8).tolist()
+        for (x, y, z), (r, g, b) in zip(self.positions.tolist(), rgb):
+            cloud.Add(geo.Point3d(x, y, z), Color.FromArgb(r, g, b))
+        return cloud
+
+    def to_proxy_mesh(self, voxel_size):
+        """점마다 voxel_size 크기의 정육면체 → MassingMesh (라이노 미리보기용)"""
+        half = voxel_size / 2.0
+        corners = self.positions[:, None, :] + _CUBE_CORNERS[None, :, :] * half
+        faces = _CUBE_FACES[None, :, :] + 8 * np.arange(len(self))[:, None, None]
+        return MassingMesh(corners.reshape(-1, 3), faces.reshape(-1, 3))
+
+    def save_ply(self, path):
+        """x, y, z, red, green, blue, opacity 바이너리 PLY로 저장"""
+        dtype = np.dtype(
+            [
+                ("x", "<f4"),
+                ("y", "<f4"),
+                ("z", "<f4"),
+                ("red", "u1"),
+                ("green", "u1"),
+                ("blue", "u1"),
+                ("opacity", "<f4"),
+            ]
+        )
+        out = np.empty(len(self), dtype=dtype)
+        for i, axis in enumerate("xyz"):
+            out[axis] = self.positions[:, i]
+        rgb = np.rint(self.colors * 255).astype(np.uint8)
+        for i, channel in enumerate(("red", "green", "blue")):
+            out[channel] = rgb[:, i]
+        out["opacity"] = self.opacity
+
+        header = [
+            "ply",
+            "format binary_little_endian 1.0",
+            f"element vertex {len(self)}",
+        ]
+        header += [
+            f"property {_PLY_NAMES[dtype[name].str[1:]]} {name}" for name in dtype.names
+        ]
+        header.append("end_header")
+        with open(path, "wb") as f:
+            f.write(("\n".join(header) + "\n").encode("ascii"))
+            f.write(out.tobytes())
+
+
+_PLY_NAMES = {"f4": "float", "u1": "uchar"}
+
+_CUBE_CORNERS = np.array(
+    [
+        [-1, -1, -1],
+        [1, -1, -1],
+        [1, 1, -1],
+        [-1, 1, -1],
+        [-1, -1, 1],
+        [1, -1, 1],
+        [1, 1, 1],
+        [-1, 1, 1],
+    ],
+    dtype=np.float32,
+)
+_CUBE_FACES = np.array(
+    [
+        [0, 2, 1], [0, 3, 2],  # 아래
+        [4, 5, 6], [4, 6, 7],  # 위
+        [0, 1, 5], [0, 5, 4],
+        [1, 2, 6], [1, 6, 5],
+        [2, 3, 7], [2, 7, 6],
+        [3, 0, 4], [3, 4, 7],
+    ]
+)  # fmt: skip
+
+
+# =============================================================================
+# 다운샘플링 (청크 단위 스트리밍 — 최대 메모리는 결과 크기 + 청크 하나)
+# =============================================================================
+
+# 축마다 21비트 (±약 100만 복셀)
+_VOXEL_BITS = 21
+_VOXEL_OFFSET = 1 << (_VOXEL_BITS - 1)
+
+
+def _voxel_keys(positions, voxel_size):
+    cells = np.floor(positions / voxel_size).astype(np.int64) + _VOXEL_OFFSET
+    if cells.min(initial=0) < 0 or cells.max(initial=0) >= (1 << _VOXEL_BITS):
+        raise ValueError(f"voxel_size가 너무 작음: {voxel_size}")
+    return (cells[:, 0] << (2 * _VOXEL_BITS)) | (cells[:, 1] << _VOXEL_BITS) | cells[:, 2]
+
+
+def voxel_downsample(ply, voxel_size, min_opacity=0.0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    복셀마다 점 하나로 합치기 (opacity 가중 평균 위치/색, 최대 opacity)
+
+    ply: PlyFile 또는 경로
+    """
+    if not isinstance(ply, PlyFile):
+        ply = PlyFile(ply)
+
+    keys = np.zeros(0, dtype=np.int64)
+    weighted = np.zeros((0, 7), dtype=np.float64)  # Σw·xyz, Σw·rgb, Σw
+    max_opacity = np.zeros(0, dtype=np.float32)
+
+    for chunk in ply.chunks(chunk_size):
+        positions = chunk_positions(chunk)
+        opacity = chunk_opacity(chunk)
+        keep = opacity >= min_opacity
+        if not keep.any():
+            continue
+        positions, opacity = positions[keep], opacity[keep]
+        colors = chunk_colors(chunk)[keep]
+
+        w = np.maximum(opacity, 1e-6).astype(np.float64)[:, None]
+        values = np.concatenate([positions * w, colors * w, w], axis=1)
+
+        # 지금까지의 복셀 누적값과 이번 청크를 합쳐서 다시 묶음
+        all_keys = np.concatenate([keys, _voxel_keys(positions, voxel_size)])
+        all_values = np.concatenate([weighted, values])
+        all_opacity = np.concatenate([max_opacity, opacity])
+        keys, inverse = np.unique(all_keys, return_inverse=True)
+        weighted = np.stack(
+            [np.bincount(inverse, all_values[:, i], len(keys)) for i in range(7)], axis=1
+        )
+        max_opacity = np.zeros(len(keys), dtype=np.float32)
+        np.maximum.at(max_opacity, inverse, all_opacity)
+
+    total = weighted[:, 6:7]
+    return SplatPoints(
+        (weighted[:, 0:3] / total).astype(np.float32),
+        (weighted[:, 3:6] / total).astype(np.float32),
+        max_opacity,
+    )
+
+
+def opacity_downsample(
+    ply, min_opacity=0.1, max_points=None, chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """
+    opacity가 min_opacity 이상인 점만 남기고, max_points가 있으면 opacity 상위 N개만
+
+    상위 N개는 청크마다 지금까지의 후보와 합쳐 다시 골라서 메모리를 N 근처로 유지
+    """
+    if not isinstance(ply, PlyFile):
+        ply = PlyFile(ply)
+
+    positions = np.zeros((0, 3), dtype=np.float32)
+    colors = np.zeros((0, 3), dtype=np.float32)
+    opacity = np.zeros(0, dtype=np.float32)
+
+    for chunk in ply.chunks(chunk_size):
+        chunk_opacities = chunk_opacity(chunk)
+        keep = np.flatnonzero(chunk_opacities >= min_opacity)
+        if len(keep) == 0:
+            continue
+        sub = chunk[keep]
+        positions = np.concatenate([positions, chunk_positions(sub)])
+        colors = np.concatenate([colors, chunk_colors(sub)])
+        opacity = np.concatenate([opacity, chunk_opacities[keep]])
+
+        if max_points is not None and len(opacity) > max_points:
+            top = np.argpartition(-opacity, max_points - 1)[:max_points]
+            positions, colors, opacity = positions[top], colors[top], opacity[top]
+
+    return SplatPoints(positions, colors, opacity)
+
+
+def load_splat_preview(
+    ply_path,
+    voxel_size=None,
+    max_points=200000,
+    min_opacity=0.1,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """
+    라이노 미리보기용 점 구름: voxel_size가 있으면 복셀 다운샘플, 없으면 opacity 상위 max_points개
+    """
+    with PlyFile(ply_path) as ply:
+        print(f"☁️  PLY 로드: {ply_path} ({len(ply):,}개 점)")
+        if voxel_size is not None:
+            points = voxel_downsample(ply, voxel_size, min_opacity, chunk_size)
+        else:
+            points = opacity_downsample(ply, min_opacity, max_points, chunk_size)
+    print(f"✅ 다운샘플 완료: {len(points):,}개 점")
+    return points
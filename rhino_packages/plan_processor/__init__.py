@@ -0,0 +1,3 @@
+from .floor_plan import *
+from .room_graph import *
+from .bubble_layout import *
@@ -0,0 +1,288 @@
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .room_graph import RoomGraph, load_room_graph
+
+
+# =============================================================================
+# 버블 다이어그램 배치 (면적 비례 원 + 연결 강도 스프링)
+# =============================================================================
+
+
+def _accumulate(force, index, fx, fy):
+    """np.add.at 대신 bincount로 힘 누적 (대량 쌍에서 훨씬 빠름)"""
+    n = len(force)
+    force[:, 0] += np.bincount(index, weights=fx, minlength=n)
+    force[:, 1] += np.bincount(index, weights=fy, minlength=n)
+
+
+def _pair_force(dx, dy, dist, mass_i, mass_j, reach, repulsion, collision):
+    """쌍별 반발력 크기 (장거리 반발 + 원이 겹칠 때 충돌 반발)"""
+    magnitude = repulsion * mass_i * mass_j / dist
+    if reach is not None:
+        magnitude = magnitude + collision * np.maximum(reach - dist, 0.0)
+    return magnitude * dx / dist, magnitude * dy / dist
+
+
+class BubbleLayout:
+    def __init__(
+        self,
+        graph,
+        iterations=300,
+        spring=1.0,
+        repulsion=0.2,
+        collision=2.0,
+        gravity=0.05,
+        exact_threshold=256,
+    ):
+        """
+        graph: RoomGraph 또는 connection.json 경로/dict
+        exact_threshold: 방 개수가 이보다 많으면 Barnes-Hut 방식(계층 격자) 근사 사용
+        """
+        if not isinstance(graph, RoomGraph):
+            graph = load_room_graph(graph)
+        self.graph = graph
+        self.iterations = iterations
+        self.spring = spring
+        self.repulsion = repulsion
+        self.collision = collision
+        self.gravity = gravity
+        self.exact_threshold = exact_threshold
+
+        # 면적(m²)에 비례하는 원 반지름(m)
+        self.radii = np.sqrt(np.maximum(graph.areas, 1e-6) / np.pi)
+        self.mass = graph.areas / max(graph.areas.mean(), 1e-6)
+
+        # CSR 항목별 시작 방 인덱스 (스프링 힘 계산용)
+        self._edge_src = np.repeat(
+            np.arange(graph.room_count), np.diff(graph.indptr)
+        ).astype(np.int32)
+
+    # -------------------------------------------------------------------------
+    # 힘 계산
+    # -------------------------------------------------------------------------
+
+    def _exact_repulsion(self, pos, force):
+        dx = pos[:, None, 0] - pos[None, :, 0]
+        dy = pos[:, None, 1] - pos[None, :, 1]
+        dist = np.hypot(dx, dy)
+        np.fill_diagonal(dist, np.inf)
+        dist = np.maximum(dist, 1e-6)
+
+        reach = self.radii[:, None] + self.radii[None, :]
+        fx, fy = _pair_force(
+            dx, dy, dist, self.mass[:, None], self.mass[None, :],
+            reach, self.repulsion, self.collision,
+        )
+        force[:, 0] += fx.sum(axis=1)
+        force[:, 1] += fy.sum(axis=1)
+
+    def _barnes_hut_repulsion(self, pos, force):
+        """
+        계층 격자(쿼드트리) 근사 반발력
+
+        각 레벨에서 부모 셀은 이웃이지만 자신과는 떨어진 셀(최대 27개)을 질량 중심 하나로
+        보고 계산하고, 최하위 레벨의 이웃 셀(3x3)만 방끼리 직접 계산 — 모든 쌍이 정확히 한 번씩
+        처리되며 계산량은 O(N log N)
+        """
+        n = len(pos)
+        origin = pos.min(axis=0)
+        extent = max(float((pos.max(axis=0) - origin).max()), 1e-6) * (1 + 1e-9)
+
+        depth = int(np.clip(np.ceil(np.log(n / 4.0) / np.log(4.0)), 2, 10))
+        # 최하위 셀은 가장 큰 두 원이 겹칠 수 있는 거리보다 커야 충돌을 놓치지 않음
+        while depth > 2 and extent / 2 ** depth < 2 * self.radii.max():
+            depth -= 1
+
+        unit = (pos - origin) / extent
+        mass_x = self.mass * pos[:, 0]
+        mass_y = self.mass * pos[:, 1]
+
+        for level in range(2, depth + 1):
+            size = 2 ** level
+            cell = np.minimum((unit * size).astype(np.int64), size - 1)
+            key = cell[:, 0] * size + cell[:, 1]
+            cell_mass = np.bincount(key, weights=self.mass, minlength=size * size)
+            safe_mass = np.where(cell_mass > 0, cell_mass, 1.0)
+            com_x = np.bincount(key, weights=mass_x, minlength=size * size) / safe_mass
+            com_y = np.bincount(key, weights=mass_y, minlength=size * size) / safe_mass
+
+            base = (cell >> 1) * 2 - 2
+            for a in range(6):
+                nx = base[:, 0] + a
+                for b in range(6):
+                    ny = base[:, 1] + b
+                    valid = (
+                        (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+                        & ((np.abs(nx - cell[:, 0]) > 1) | (np.abs(ny - cell[:, 1]) > 1))
+                    )
+                    if not valid.any():
+                        continue
+                    body = np.nonzero(valid)[0]
+                    other = nx[body] * size + ny[body]
+                    m = cell_mass[other]
+                    keep = m > 0
+                    body, other, m = body[keep], other[keep], m[keep]
+
+                    dx = pos[body, 0] - com_x[other]
+                    dy = pos[body, 1] - com_y[other]
+                    dist = np.maximum(np.hypot(dx, dy), 1e-6)
+                    fx, fy = _pair_force(
+                        dx, dy, dist, self.mass[body], m, None, self.repulsion, 0.0
+                    )
+                    _accumulate(force, body, fx, fy)
+
+        # 최하위 레벨 근거리: 이웃 셀의 방들과 직접 계산
+        size = 2 ** depth
+        cell = np.minimum((unit * size).astype(np.int64), size - 1)
+        key = cell[:, 0] * size + cell[:, 1]
+        order = np.argsort(key, kind="stable")
+        sorted_key = key[order]
+
+        for a in (-1, 0, 1):
+            for b in (-1, 0, 1):
+                nx = cell[:, 0] + a
+                ny = cell[:, 1] + b
+                inside = (nx >= 0) & (nx < size) & (ny >= 0) & (ny < size)
+                neighbor_key = np.where(inside, nx * size + ny, -1)
+                start = np.searchsorted(sorted_key, neighbor_key, side="left")
+                end = np.searchsorted(sorted_key, neighbor_key, side="right")
+                counts = np.where(inside, end - start, 0)
+                total = counts.sum()
+                if total == 0:
+                    continue
+
+                body = np.repeat(np.arange(n), counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                other = order[np.repeat(start, counts) + offsets]
+                keep = body != other
+                body, other = body[keep], other[keep]
+
+                dx = pos[body, 0] - pos[other, 0]
+                dy = pos[body, 1] - pos[other, 1]
+                dist = np.maximum(np.hypot(dx, dy), 1e-6)
+                fx, fy = _pair_force(
+                    dx, dy, dist, self.mass[body], self.mass[other],
+                    self.radii[body] + self.radii[other], self.repulsion, self.collision,
+                )
+                _accumulate(force, body, fx, fy)
+
+    def _spring_forces(self, pos, force):
+        """연결된 방은 두 원이 맞닿는 거리로 당김 (strength 비례)"""
+        graph = self.graph
+        src = self._edge_src
+        dst = graph.indices
+        if len(dst) == 0:
+            return
+        dx = pos[dst, 0] - pos[src, 0]
+        dy = pos[dst, 1] - pos[src, 1]
+        dist = np.maximum(np.hypot(dx, dy), 1e-6)
+        rest = self.radii[src] + self.radii[dst]
+        magnitude = self.spring * graph.weights * (dist - rest) / dist
+        _accumulate(force, src, magnitude * dx, magnitude * dy)
+
+    def forces(self, pos):
+        force = np.zeros_like(pos)
+        if len(pos) > self.exact_threshold:
+            self._barnes_hut_repulsion(pos, force)
+        else:
+            self._exact_repulsion(pos, force)
+        self._spring_forces(pos, force)
+        centroid = np.average(pos, axis=0, weights=self.mass)
+        force -= self.gravity * self.mass[:, None] * (pos - centroid)
+        return force
+
+    # -------------------------------------------------------------------------
+    # 풀이
+    # -------------------------------------------------------------------------
+
+    def initial_positions(self, seed=None):
+        """connection.json 원형 배치를 면적 스케일로 옮기고 무작위 흔들기"""
+        rng = np.random.default_rng(seed)
+        n = self.graph.room_count
+        spread = np.sqrt(self.radii.dot(self.radii)) * 2
+
+        base = self.graph.positions - self.graph.positions.mean(axis=0)
+        scale = np.abs(base).max()
+        if scale > 0:
+            base = base / scale * spread
+        return base + rng.normal(scale=spread * 0.5, size=(n, 2))
+
+    def solve(self, seed=None, initial=None):
+        """배치 결과 (N, 2) 위치 배열 반환 — 단위는 미터 (면적 m² 기준)"""
+        pos = (
+            np.array(initial, dtype=float)
+            if initial is not None
+            else self.initial_positions(seed)
+        )
+        start_step = self.radii.mean() * 2
+        for i in range(self.iterations):
+            # 이동량 상한을 선형으로 줄여가며 수렴 (simulated annealing)
+            step = start_step * (1 - i / self.iterations) + start_step * 0.01
+            displacement = self.forces(pos)
+            length = np.maximum(np.hypot(displacement[:, 0], displacement[:, 1]), 1e-9)
+            pos += displacement * (np.minimum(length, step) / length)[:, None]
+        return pos
+
+    def score(self, pos):
+        """작을수록 좋음: 연결 위반 strength 합 + 원 겹침 깊이 합"""
+        penalty = self.graph.score_layouts(pos, radii=self.radii)
+        dx = pos[:, None, 0] - pos[None, :, 0]
+        dy = pos[:, None, 1] - pos[None, :, 1]
+        overlap = self.radii[:, None] + self.radii[None, :] - np.hypot(dx, dy)
+        np.fill_diagonal(overlap, 0.0)
+        return float(penalty + np.maximum(overlap, 0.0).sum() / 2)
+
+    def solve_batch(self, seeds, workers=None):
+        """
+        여러 랜덤 시드를 병렬로 풀어서 점수순으로 정렬
+
+        반환: [(seed, positions, score), ...]
+        """
+        seeds = list(seeds)
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(seeds) <= 1:
+            results = [_solve_seed((self, seed)) for seed in seeds]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(
+                    executor.map(
+                        _solve_seed,
+                        [(self, seed) for seed in seeds],
+                        chunksize=max(1, len(seeds) // (workers * 4)),
+                    )
+                )
+        results.sort(key=lambda r: r[2])
+        return results
+
+
+def _solve_seed(args):
+    layout, seed = args
+    pos = layout.solve(seed=seed)
+    return seed, pos, layout.score(pos)
+
+
+def apply_layout(data, positions, px_per_meter=20.0):
+    """
+    배치 결과를 connection.json 형식의 rooms x/y(px)에 반영한 사본 반환
+
+    원래 배치의 중심을 유지
+    """
+    if isinstance(data, str):
+        with open(data, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    rooms = data.get("rooms", [])
+    center_x = np.mean([room["x"] for room in rooms]) if rooms else 0.0
+    center_y = np.mean([room["y"] for room in rooms]) if rooms else 0.0
+    offset = positions - positions.mean(axis=0)
+
+    result = dict(data)
+    result["rooms"] = [
+        dict(room, x=float(center_x + dx * px_per_meter), y=float(center_y + dy * px_per_meter))
+        for room, (dx, dy) in zip(rooms, offset)
+    ]
+    return result
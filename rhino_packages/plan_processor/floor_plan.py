@@ -0,0 +1,356 @@
+import re
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import Rhino.Geometry as geo
+except ImportError:
+    # 헤드리스 환경에서는 numpy 메시만 생성
+    geo = None
+
+
+# =============================================================================
+# WKT 파싱 (output.json 평면도 형식)
+# =============================================================================
+
+_WKT_KIND = re.compile(r"^\s*([A-Za-z]+)")
+_WKT_RING = re.compile(r"\(([^()]*)\)")
+_WKT_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def parse_wkt_many(wkts):
+    """
+    여러 WKT 문자열을 한 번에 파싱
+
+    모든 좌표 문자열을 이어 붙여 숫자 변환을 한 번에 처리한 뒤 링 단위로 다시 자름
+    반환: [(타입, [링 좌표 (N, 2) ndarray, ...]), ...] — 빈 지오메트리는 링 목록이 비어 있음
+    """
+    kinds = []
+    ring_counts = []
+    point_counts = []
+    dims = []
+    bodies = []
+
+    for wkt in wkts:
+        match = _WKT_KIND.match(wkt)
+        kind = match.group(1).upper() if match else ""
+        if kind not in ("POLYGON", "LINESTRING"):
+            raise ValueError(f"지원하지 않는 WKT 타입: {wkt[:40]}")
+
+        # "LINESTRING EMPTY", "POLYGON (())" 등 좌표가 없는 링은 버림
+        rings = [body for body in _WKT_RING.findall(wkt) if body.strip()]
+        kinds.append(kind)
+        ring_counts.append(len(rings))
+        for body in rings:
+            points = body.split(",")
+            point_counts.append(len(points))
+            dims.append(len(points[0].split()))
+            bodies.append(body)
+
+    numbers = np.array(_WKT_NUMBER.findall(" ".join(bodies)), dtype=float)
+    offsets = np.cumsum([0] + [n * d for n, d in zip(point_counts, dims)])
+
+    parsed = []
+    ring_index = 0
+    for kind, count in zip(kinds, ring_counts):
+        rings = []
+        for _ in range(count):
+            start, end = offsets[ring_index], offsets[ring_index + 1]
+            coords = numbers[start:end].reshape(-1, dims[ring_index])[:, :2]
+            # 폴리곤은 마지막 점(= 첫 점) 제거
+            if kind == "POLYGON" and len(coords) > 1 and np.allclose(coords[0], coords[-1]):
+                coords = coords[:-1]
+            rings.append(coords)
+            ring_index += 1
+        parsed.append((kind, rings))
+    return parsed
+
+
+def parse_wkt(wkt):
+    """WKT 하나 파싱 → (타입, [링 좌표 배열])"""
+    return parse_wkt_many([wkt])[0]
+
+
+class FloorPlan:
+    def __init__(self, rooms, doors, windows):
+        self.rooms = rooms
+        self.doors = doors
+        self.windows = windows
+
+    @classmethod
+    def from_dict(cls, data):
+        rooms = data.get("rooms", [])
+        doors = data.get("doors", [])
+        windows = data.get("windows", [])
+
+        parsed = parse_wkt_many(
+            [r["geom"] for r in rooms]
+            + [d["geom"] for d in doors]
+            + [w["geom"] for w in windows]
+        )
+        parsed_rooms = parsed[: len(rooms)]
+        parsed_doors = parsed[len(rooms) : len(rooms) + len(doors)]
+        parsed_windows = parsed[len(rooms) + len(doors) :]
+
+        def non_empty(items, parsed_items, label):
+            # 좌표가 없는 지오메트리는 건너뜀
+            kept = []
+            for item, (_, rings) in zip(items, parsed_items):
+                if rings:
+                    kept.append((item, rings))
+                else:
+                    name = item.get("room_name") or item.get("connection") or ""
+                    print(f"⚠️  빈 {label} 지오메트리 건너뜀: {name}")
+            return kept
+
+        return cls(
+            rooms=[
+                {"name": r.get("room_name"), "rings": rings}
+                for r, rings in non_empty(rooms, parsed_rooms, "방")
+            ],
+            doors=[
+                {
+                    "connection": d.get("connection"),
+                    "line": rings[0],
+                    "bottom": 0.0,
+                    "top": float(d["height"]),
+                }
+                for d, rings in non_empty(doors, parsed_doors, "문")
+            ],
+            windows=[
+                {
+                    "line": rings[0],
+                    "bottom": float(w["bottom"]),
+                    "top": float(w["top"]),
+                }
+                for w, rings in non_empty(windows, parsed_windows, "창문")
+            ],
+        )
+
+
+def load_floor_plan(source):
+    """output.json 경로 또는 dict → FloorPlan"""
+    if isinstance(source, FloorPlan):
+        return source
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            source = json.load(f)
+    return FloorPlan.from_dict(source)
+
+
+# =============================================================================
+# 벽 추출 및 개구부(문/창) 매칭
+# =============================================================================
+
+
+def extract_walls(plan, precision=3):
+    """방 폴리곤 외곽선을 벽 선분으로 변환 (인접한 방의 공유 벽은 하나로 합침)"""
+    starts = []
+    ends = []
+    for room in plan.rooms:
+        for ring in room["rings"]:
+            starts.append(ring)
+            ends.append(np.roll(ring, -1, axis=0))
+    if not starts:
+        return np.zeros((0, 2, 2))
+
+    a = np.concatenate(starts)
+    b = np.concatenate(ends)
+
+    # 선분 방향 정규화 (사전순으로 작은 점이 시작점)
+    swap = (a[:, 0] > b[:, 0]) | ((a[:, 0] == b[:, 0]) & (a[:, 1] > b[:, 1]))
+    a2 = np.where(swap[:, None], b, a)
+    b2 = np.where(swap[:, None], a, b)
+
+    segments = np.round(np.stack([a2, b2], axis=1), precision)
+    lengths = np.linalg.norm(segments[:, 1] - segments[:, 0], axis=1)
+    segments = segments[lengths > 0]
+    return np.unique(segments.reshape(-1, 4), axis=0).reshape(-1, 2, 2)
+
+
+def match_openings(walls, openings, tolerance):
+    """
+    개구부 선분을 벽에 투영해서 벽별 (t0, t1, z0, z1) 구간 계산
+
+    모든 (벽, 개구부) 쌍을 한 번에 브로드캐스팅으로 계산
+    """
+    result = [[] for _ in range(len(walls))]
+    if len(walls) == 0 or not openings:
+        return result
+
+    p = np.array([o["line"][0] for o in openings])  # (O, 2)
+    q = np.array([o["line"][-1] for o in openings])
+    bottoms = np.array([o["bottom"] for o in openings])
+    tops = np.array([o["top"] for o in openings])
+
+    a = walls[:, 0]
+    d = walls[:, 1] - a
+    length = np.linalg.norm(d, axis=1)
+    u = d / length[:, None]
+
+    rel_p = p[None, :, :] - a[:, None, :]  # (W, O, 2)
+    rel_q = q[None, :, :] - a[:, None, :]
+    t_p = np.einsum("woi,wi->wo", rel_p, u)
+    t_q = np.einsum("woi,wi->wo", rel_q, u)
+    n_p = u[:, None, 0] * rel_p[..., 1] - u[:, None, 1] * rel_p[..., 0]
+    n_q = u[:, None, 0] * rel_q[..., 1] - u[:, None, 1] * rel_q[..., 0]
+
+    t0 = np.clip(np.minimum(t_p, t_q), 0, length[:, None])
+    t1 = np.clip(np.maximum(t_p, t_q), 0, length[:, None])
+    hit = (np.abs(n_p) <= tolerance) & (np.abs(n_q) <= tolerance) & (t1 - t0 > 1e-9)
+
+    for w, o in zip(*np.nonzero(hit)):
+        result[w].append((t0[w, o], t1[w, o], bottoms[o], tops[o]))
+    return result
+
+
+def _solid_cells(length, height, openings):
+    """벽 (t, z) 사각형에서 개구부를 뺀 나머지를 세로 방향으로 합친 셀 목록"""
+    if not openings:
+        return [(0.0, length, 0.0, height)]
+
+    ops = np.array(openings, dtype=float)
+    ops[:, 2:] = np.clip(ops[:, 2:], 0, height)
+    ts = np.unique(np.concatenate([[0.0, length], ops[:, 0], ops[:, 1]]))
+    zs = np.unique(np.concatenate([[0.0, height], ops[:, 2], ops[:, 3]]))
+
+    tc = (ts[:-1] + ts[1:]) / 2
+    zc = (zs[:-1] + zs[1:]) / 2
+    covered = (
+        (tc[None, :, None] > ops[:, 0, None, None])
+        & (tc[None, :, None] < ops[:, 1, None, None])
+        & (zc[None, None, :] > ops[:, 2, None, None])
+        & (zc[None, None, :] < ops[:, 3, None, None])
+    ).any(axis=0)
+
+    cells = []
+    for i in range(len(tc)):
+        solid = ~covered[i]
+        j = 0
+        while j < len(zc):
+            if not solid[j]:
+                j += 1
+                continue
+            k = j
+            while k + 1 < len(zc) and solid[k + 1]:
+                k += 1
+            cells.append((ts[i], ts[i + 1], zs[j], zs[k + 1]))
+            j = k + 1
+    return cells
+
+
+# =============================================================================
+# 메시 생성
+# =============================================================================
+
+# 박스 꼭짓점 순서: (t 선택, 두께 방향 부호, z 선택)
+_BOX_T = np.array([0, 1, 1, 0, 0, 1, 1, 0])
+_BOX_S = np.array([-1, -1, 1, 1, -1, -1, 1, 1])
+_BOX_Z = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+_BOX_FACES = np.array(
+    [
+        [0, 2, 1], [0, 3, 2],
+        [4, 5, 6], [4, 6, 7],
+        [0, 1, 5], [0, 5, 4],
+        [1, 2, 6], [1, 6, 5],
+        [2, 3, 7], [2, 7, 6],
+        [3, 0, 4], [3, 4, 7],
+    ]
+)
+
+
+class MassingMesh:
+    def __init__(self, vertices, faces):
+        self.vertices = vertices  # (V, 3)
+        self.faces = faces  # (F, 3)
+
+    def to_rhino(self):
+        """라이노 안에서 실행될 때 Rhino.Geometry.Mesh로 변환"""
+        if geo is None:
+            raise Exception("Rhino is not available.")
+        mesh = geo.Mesh()
+        for x, y, z in self.vertices.tolist():
+            mesh.Vertices.Add(x, y, z)
+        for a, b, c in self.faces.tolist():
+            mesh.Faces.AddFace(a, b, c)
+        mesh.Normals.ComputeNormals()
+        mesh.Compact()
+        return mesh
+
+    def save_obj(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            np.savetxt(f, self.vertices, fmt="v %.4f %.4f %.4f")
+            np.savetxt(f, self.faces + 1, fmt="f %d %d %d")
+
+
+def boxes_to_mesh(walls, cells, wall_index, thickness):
+    """벽 셀 (t0, t1, z0, z1) 전체를 한 번에 두께 있는 박스로 변환"""
+    if len(cells) == 0:
+        return MassingMesh(np.zeros((0, 3)), np.zeros((0, 3), dtype=int))
+
+    cells = np.asarray(cells, dtype=float)
+    a = walls[wall_index, 0]
+    d = walls[wall_index, 1] - a
+    u = d / np.linalg.norm(d, axis=1)[:, None]
+    n = np.stack([-u[:, 1], u[:, 0]], axis=1)
+
+    t = np.where(_BOX_T[None, :] == 0, cells[:, 0:1], cells[:, 1:2])  # (C, 8)
+    z = np.where(_BOX_Z[None, :] == 0, cells[:, 2:3], cells[:, 3:4])
+    s = _BOX_S[None, :] * (thickness / 2)
+
+    xy = a[:, None, :] + t[..., None] * u[:, None, :] + s[..., None] * n[:, None, :]
+    vertices = np.concatenate([xy, z[..., None]], axis=2).reshape(-1, 3)
+    faces = (_BOX_FACES[None, :, :] + 8 * np.arange(len(cells))[:, None, None]).reshape(-1, 3)
+    return MassingMesh(vertices, faces)
+
+
+def build_massing(source, wall_height=2400.0, thickness=200.0, tolerance=None):
+    """
+    평면도 하나를 벽 매스 메시로 변환 (문/창 개구부 제외)
+
+    source: output.json 경로, dict 또는 FloorPlan
+    """
+    plan = load_floor_plan(source)
+    walls = extract_walls(plan)
+    if tolerance is None:
+        tolerance = thickness
+
+    openings = match_openings(walls, plan.doors + plan.windows, tolerance)
+    lengths = np.linalg.norm(walls[:, 1] - walls[:, 0], axis=1)
+    half = thickness / 2
+
+    cells = []
+    wall_index = []
+    for w, (length, wall_openings) in enumerate(zip(lengths, openings)):
+        for t0, t1, z0, z1 in _solid_cells(length, wall_height, wall_openings):
+            # 벽 끝은 두께의 절반만큼 늘려서 모서리를 닫음
+            if t0 <= 0:
+                t0 = -half
+            if t1 >= length:
+                t1 = length + half
+            cells.append((t0, t1, z0, z1))
+            wall_index.append(w)
+
+    return boxes_to_mesh(walls, cells, np.array(wall_index, dtype=int), thickness)
+
+
+def _build_massing_star(args):
+    source, kwargs = args
+    return build_massing(source, **kwargs)
+
+
+def build_massing_batch(sources, workers=None, **kwargs):
+    """여러 평면도 변형을 일괄 변환 (workers > 1이면 프로세스 병렬)"""
+    if not workers or workers <= 1:
+        return [build_massing(source, **kwargs) for source in sources]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                _build_massing_star,
+                [(source, kwargs) for source in sources],
+                chunksize=max(1, len(sources) // (workers * 4)),
+            )
+        )
@@ -0,0 +1,234 @@
+import json
+import heapq
+from collections import deque
+
+import numpy as np
+
+
+# =============================================================================
+# connection.json 방 인접 그래프 (CSR 배열)
+# =============================================================================
+
+
+class RoomGraph:
+    def __init__(self, rooms, connections):
+        """
+        rooms: connection.json의 rooms 목록
+        connections: connection.json의 connections 목록
+        """
+        self.room_ids = [room["id"] for room in rooms]
+        self.names = [room.get("name", room["id"]) for room in rooms]
+        self.index = {room_id: i for i, room_id in enumerate(self.room_ids)}
+        # 이름으로도 조회할 수 있도록 (이름이 겹치면 첫 방 우선)
+        for i, name in enumerate(self.names):
+            self.index.setdefault(name, i)
+
+        self.areas = np.array([room.get("area", 0.0) for room in rooms], dtype=float)
+        self.positions = np.array(
+            [[room.get("x", 0.0), room.get("y", 0.0)] for room in rooms], dtype=float
+        ).reshape(-1, 2)
+        self.colors = [room.get("color") for room in rooms]
+
+        # 원본 연결 (방향 정보 포함, 제약 검사용)
+        self.edge_from = np.array(
+            [self.index[c["fromRoom"]] for c in connections], dtype=np.int32
+        )
+        self.edge_to = np.array(
+            [self.index[c["toRoom"]] for c in connections], dtype=np.int32
+        )
+        self.edge_strength = np.array(
+            [c.get("strength", 1) for c in connections], dtype=float
+        )
+        self.edge_types = [c.get("relationshipType", "adjacent") for c in connections]
+        directional = np.array(
+            [bool(c.get("isDirectional", False)) for c in connections], dtype=bool
+        )
+
+        # 무방향 연결은 양방향으로 펼쳐서 CSR 구성
+        undirected = ~directional
+        src = np.concatenate([self.edge_from, self.edge_to[undirected]])
+        dst = np.concatenate([self.edge_to, self.edge_from[undirected]])
+        edge_ids = np.concatenate(
+            [np.arange(len(connections)), np.nonzero(undirected)[0]]
+        ).astype(np.int32)
+
+        order = np.lexsort((dst, src))
+        self.indices = dst[order].astype(np.int32)
+        self.edge_ids = edge_ids[order]
+        self.weights = self.edge_strength[self.edge_ids]
+        self.indptr = np.zeros(len(rooms) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=len(rooms)), out=self.indptr[1:])
+
+    @property
+    def room_count(self):
+        return len(self.room_ids)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_from)
+
+    def _idx(self, room):
+        if isinstance(room, (int, np.integer)):
+            return int(room)
+        return self.index[room]
+
+    # -------------------------------------------------------------------------
+    # 조회
+    # -------------------------------------------------------------------------
+
+    def neighbors(self, room, min_strength=None):
+        """이웃 방 id 목록"""
+        i = self._idx(room)
+        start, end = self.indptr[i], self.indptr[i + 1]
+        neighbor_indices = self.indices[start:end]
+        if min_strength is not None:
+            neighbor_indices = neighbor_indices[self.weights[start:end] >= min_strength]
+        return [self.room_ids[j] for j in neighbor_indices]
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def shortest_path(self, source, target, weighted=False):
+        """
+        최단 경로 (방 id 목록, 경로가 없으면 None)
+
+        weighted=True 이면 연결 강도가 클수록 가까운 것으로 보고 1/strength를 비용으로 사용
+        """
+        s, t = self._idx(source), self._idx(target)
+        previous = np.full(self.room_count, -1, dtype=np.int32)
+        visited = np.zeros(self.room_count, dtype=bool)
+
+        if not weighted:
+            visited[s] = True
+            queue = deque([s])
+            while queue:
+                i = queue.popleft()
+                if i == t:
+                    break
+                for j in self.indices[self.indptr[i] : self.indptr[i + 1]]:
+                    if not visited[j]:
+                        visited[j] = True
+                        previous[j] = i
+                        queue.append(j)
+        else:
+            cost = 1.0 / np.maximum(self.weights, 1e-9)
+            distance = np.full(self.room_count, np.inf)
+            distance[s] = 0.0
+            heap = [(0.0, s)]
+            while heap:
+                d, i = heapq.heappop(heap)
+                if visited[i]:
+                    continue
+                visited[i] = True
+                if i == t:
+                    break
+                for k in range(self.indptr[i], self.indptr[i + 1]):
+                    j = self.indices[k]
+                    nd = d + cost[k]
+                    if nd < distance[j]:
+                        distance[j] = nd
+                        previous[j] = i
+                        heapq.heappush(heap, (nd, j))
+
+        if s != t and previous[t] < 0:
+            return None
+        path = [t]
+        while path[-1] != s:
+            path.append(previous[path[-1]])
+        return [self.room_ids[i] for i in reversed(path)]
+
+    def connected_components(self):
+        """연결 요소 라벨 배열 (방향은 무시)"""
+        # 라벨 전파: 각 방을 이웃 중 가장 작은 라벨로 반복 갱신
+        labels = np.arange(self.room_count)
+        src = np.concatenate([self.edge_from, self.edge_to])
+        dst = np.concatenate([self.edge_to, self.edge_from])
+        while True:
+            updated = labels.copy()
+            np.minimum.at(updated, dst, labels[src])
+            updated = updated[updated]  # 포인터 점프로 수렴 가속
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+        _, labels = np.unique(labels, return_inverse=True)
+        return labels
+
+    def components(self):
+        """연결 요소별 방 id 목록"""
+        labels = self.connected_components()
+        groups = [[] for _ in range(labels.max() + 1 if len(labels) else 0)]
+        for room_id, label in zip(self.room_ids, labels):
+            groups[label].append(room_id)
+        return groups
+
+    # -------------------------------------------------------------------------
+    # 제약 검사 (strength 기준)
+    # -------------------------------------------------------------------------
+
+    def check_adjacency(self, realized_pairs, min_strength=1):
+        """
+        생성된 평면의 실제 인접 쌍이 요구 연결을 만족하는지 검사
+
+        realized_pairs: [(방 id 또는 이름, 방 id 또는 이름), ...]
+        반환: 만족하지 못한 연결 목록 (strength 내림차순)
+        """
+        n = self.room_count
+        realized = np.zeros((n, n), dtype=bool)
+        if realized_pairs:
+            pairs = np.array(
+                [(self._idx(a), self._idx(b)) for a, b in realized_pairs], dtype=np.int32
+            )
+            realized[pairs[:, 0], pairs[:, 1]] = True
+            realized[pairs[:, 1], pairs[:, 0]] = True
+
+        required = self.edge_strength >= min_strength
+        missing = required & ~realized[self.edge_from, self.edge_to]
+        violations = [
+            {
+                "from": self.room_ids[self.edge_from[k]],
+                "to": self.room_ids[self.edge_to[k]],
+                "type": self.edge_types[k],
+                "strength": float(self.edge_strength[k]),
+            }
+            for k in np.nonzero(missing)[0]
+        ]
+        violations.sort(key=lambda v: v["strength"], reverse=True)
+        return violations
+
+    def score_layouts(self, positions, radii=None, slack=0.1):
+        """
+        여러 배치안(방 위치)을 한 번에 검사
+
+        positions: (B, N, 2) 또는 (N, 2) — 방 순서는 self.room_ids 기준
+        radii: 방 반지름 (기본값: 면적에 비례하는 원의 반지름, positions와 같은 단위 가정)
+        연결된 두 방 사이 거리가 (r_i + r_j) * (1 + slack)보다 멀면 위반으로 보고
+        위반한 연결의 strength 합을 점수로 반환 (0이면 모두 만족)
+        """
+        positions = np.asarray(positions, dtype=float)
+        single = positions.ndim == 2
+        if single:
+            positions = positions[None]
+        if radii is None:
+            radii = np.sqrt(self.areas / np.pi)
+
+        delta = positions[:, self.edge_from] - positions[:, self.edge_to]  # (B, E, 2)
+        distance = np.linalg.norm(delta, axis=2)
+        limit = (radii[self.edge_from] + radii[self.edge_to]) * (1 + slack)
+        penalty = ((distance > limit) * self.edge_strength).sum(axis=1)
+        return penalty[0] if single else penalty
+
+    def to_dict(self):
+        return {
+            "room_ids": self.room_ids,
+            "indptr": self.indptr.tolist(),
+            "indices": self.indices.tolist(),
+            "weights": self.weights.tolist(),
+        }
+
+
+def load_room_graph(source="connection.json"):
+    """connection.json 경로 또는 dict → RoomGraph"""
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            source = json.load(f)
+    return RoomGraph(source.get("rooms", []), source.get("connections", []))
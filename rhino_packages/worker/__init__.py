@@ -0,0 +1,2 @@
+from .protocol import *
+from .client import *
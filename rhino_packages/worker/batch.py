@@ -0,0 +1,557 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+import replicate
+
+from ..image_processor import (
+    ENHANCE_MODELS,
+    BackgroundRemover,
+    BudgetPlanner,
+    BudgetTracker,
+    FurnitureCropper,
+    ImgToModeling,
+    JobQueue,
+    TilePlan,
+    UploadManager,
+    run_model,
+    upscale,
+)
+
+
+# =============================================================================
+# 헤드리스 일괄 처리 (라이노 없이 캡처 폴더/목록을 단계별로 처리)
+# =============================================================================
+
+# 실행 순서대로 정렬된 단계 이름
+STAGES = ("detect", "crop", "upscale", "background", "3d", "enhance")
+
+# 단계 → 먼저 실행되어야 하는 단계
+STAGE_REQUIRES = {
+    "crop": "detect",
+    "upscale": "crop",
+    "background": "crop",
+    "3d": "background",
+}
+
+# 원격 호출 종류별 기본 동시 실행 수
+DEFAULT_LIMITS = {"gpt": 4, "bria": 4, "3d": 2, "enhance": 2}
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+
+def parse_stages(stages):
+    """"detect,crop,background" 또는 목록 → 실행 순서대로 정렬된 단계 튜플"""
+    if isinstance(stages, str):
+        stages = [s.strip() for s in stages.split(",") if s.strip()]
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError(f"알 수 없는 단계: {stage} (가능: {', '.join(STAGES)})")
+        required = STAGE_REQUIRES.get(stage)
+        if required is not None and required not in stages:
+            raise ValueError(f"'{stage}' 단계에는 '{required}' 단계가 필요합니다.")
+    return tuple(s for s in STAGES if s in stages)
+
+
+def load_items(source):
+    """
+    폴더 / 목록 파일 → [{"image": 경로, "prompt": ..., "room": ...}, ...]
+
+    목록 파일: .json (경로 또는 dict 리스트), .jsonl (한 줄에 dict 하나), 그 외는 한 줄에 경로 하나
+    목록 안의 상대 경로는 목록 파일 위치 기준
+    """
+    if os.path.isdir(source):
+        return [
+            {"image": os.path.join(source, name)}
+            for name in sorted(os.listdir(source))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as f:
+        if source.endswith(".json"):
+            entries = json.load(f)
+        elif source.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = [line.strip() for line in f if line.strip()]
+
+    items = []
+    for entry in entries:
+        item = {"image": entry} if isinstance(entry, str) else dict(entry)
+        item["image"] = os.path.join(base_dir, item["image"])
+        items.append(item)
+    return items
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}시간 {minutes:02d}분"
+    return f"{minutes}분 {seconds:02d}초"
+
+
+class BatchProgress:
+    def __init__(self, total, interval=30.0):
+        """total: 처리할 이미지 수, interval: 진행 상황 출력 주기 (초)"""
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.stage_counts = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._tick, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _tick(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def stage_done(self, stage, count=1):
+        with self._lock:
+            self.stage_counts[stage] = self.stage_counts.get(stage, 0) + count
+
+    def image_done(self, ok=True, skipped=False):
+        with self._lock:
+            self.done += 1
+            if skipped:
+                self.skipped += 1
+            elif not ok:
+                self.failed += 1
+        self.report()
+
+    def throughput(self):
+        """분당 처리한 이미지 수 (건너뛴 이미지 제외)"""
+        elapsed = time.time() - self.started_at
+        processed = self.done - self.skipped
+        return processed / elapsed * 60 if elapsed > 0 else 0.0
+
+    def eta(self):
+        rate = self.throughput()
+        if rate <= 0:
+            return None
+        return (self.total - self.done) / rate * 60
+
+    def report(self):
+        with self._lock:
+            stages = ", ".join(f"{k} {v}" for k, v in self.stage_counts.items())
+            done, failed = self.done, self.failed
+        print(
+            f"📈 {done}/{self.total} (실패 {failed}) | "
+            f"{self.throughput():.2f}장/분 | "
+            f"경과 {_format_seconds(time.time() - self.started_at)} | "
+            f"남은 시간 {_format_seconds(self.eta())}"
+            + (f" | {stages}" if stages else "")
+        )
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        OPENAI_API_KEY,
+        REPLICATE_API_TOKEN,
+        stages=("detect", "crop", "background"),
+        output_dir="batch_output",
+        workers=4,
+        limits=None,
+        upscale_policy="balanced",
+        enhance_model="kontext_dev",
+        prompt=None,
+        backend="hunyuan3d",
+        force=False,
+        tiling=None,
+        room=None,
+        budget=None,
+    ):
+        """
+        stages: 실행할 단계 (STAGES 중에서)
+        workers: 동시에 처리할 이미지 수
+        limits: 원격 호출 종류별 동시 실행 수 {"gpt", "bria", "3d", "enhance"}
+        prompt: enhance 단계 기본 프롬프트 (목록 항목의 "prompt"가 우선)
+        force: False면 결과 파일(result.json)이 있는 이미지는 건너뜀 (중단 후 이어서 실행)
+        tiling: TilePlan — 큰 이미지는 타일로 나눠 인식
+        room: 기본 방 이름/종류 (목록 항목의 "room"이 우선) — 방에 맞는 가구 목록으로 인식
+        budget: BudgetTracker — 예산/마감을 넘을 것 같으면 우선순위 낮은 작업부터 건너뜀
+        """
+        self.stages = parse_stages(stages)
+        self.output_dir = output_dir
+        self.workers = workers
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.upscale_policy = upscale_policy
+        self.enhance_model = enhance_model
+        self.prompt = prompt
+        self.backend = backend
+        self.force = force
+        self.tiling = tiling
+        self.room = room
+        self.budget = budget
+
+        self.open_ai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        self.replicate_client = replicate.Client(api_token=REPLICATE_API_TOKEN)
+        self.uploader = UploadManager(self.replicate_client)
+        # 3D 변환은 배치 전용 큐 (대화형 선점 없이 limits["3d"]개씩)
+        self.job_queue = JobQueue(max_workers=self.limits["3d"], preempt=False)
+        self._semaphores = {
+            key: threading.Semaphore(value) for key, value in self.limits.items()
+        }
+        self.progress = None
+
+    def _limited(self, key, fn, *args, **kwargs):
+        with self._semaphores[key]:
+            return fn(*args, **kwargs)
+
+    def _item_dir(self, item):
+        name = item.get("name") or os.path.splitext(os.path.basename(item["image"]))[0]
+        return os.path.join(self.output_dir, name)
+
+    def _save_images(self, directory, prefix, images):
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for i, image in enumerate(images, 1):
+            path = os.path.join(directory, f"{prefix}_{i:02d}.png")
+            if isinstance(image, bytes):
+                with open(path, "wb") as f:
+                    f.write(image)
+            else:
+                image.save(path, compress_level=1)
+            paths.append(path)
+        return paths
+
+    def process_item(self, item):
+        """이미지 하나를 선택된 단계대로 처리 → 결과 dict (item_dir/result.json에도 저장)"""
+        item_dir = self._item_dir(item)
+        result_path = os.path.join(item_dir, "result.json")
+        if not self.force and os.path.exists(result_path):
+            with open(result_path, "r", encoding="utf-8") as f:
+                return dict(json.load(f), skipped=True)
+
+        image_path = item["image"]
+        room = item.get("room") or self.room
+        record = {"image": image_path, "stages": {}, "status": "succeeded"}
+        cropper = FurnitureCropper(self.open_ai_client, tiling=self.tiling, room=room)
+        budget = self.budget
+        furniture_list, images = [], []
+
+        def timed(stage, fn, *args, **kwargs):
+            start = time.time()
+            value = fn(*args, **kwargs)
+            record["stages"][stage] = {"seconds": round(time.time() - start, 2)}
+            self.progress.stage_done(stage)
+            return value
+
+        if "detect" in self.stages:
+            if budget is not None and not budget.allow("detect"):
+                # result.json을 남기지 않으므로 예산을 늘려 다시 실행하면 이어서 처리
+                print(f"💸 예산 부족 → 건너뜀: {image_path}")
+                return dict(record, status="over_budget", skipped=True)
+            furniture_list = timed(
+                "detect",
+                self._limited,
+                "gpt",
+                cropper.detect,
+                image_path,
+            )
+            # 크롭 순서와 맞추기 위해 면적 내림차순으로 정렬
+            furniture_list = sorted(
+                furniture_list or [], key=lambda x: x.get("area", 0), reverse=True
+            )
+            record["furniture"] = furniture_list
+            if budget is not None:
+                budget.charge("detect", record["stages"]["detect"]["seconds"])
+                budget.planner.history.record_objects(
+                    cropper.profile.room_type, len(furniture_list)
+                )
+
+        if "crop" in self.stages and furniture_list:
+            images = timed(
+                "crop",
+                cropper.crop_furniture_centered_filtered,
+                image_path,
+                furniture_list,
+                save=False,
+            )
+            record["crops"] = self._save_images(
+                os.path.join(item_dir, "crops"), "crop", images
+            )
+
+        if "upscale" in self.stages and images:
+
+            def upscale_one(image, furniture):
+                policy = self.upscale_policy
+                if budget is not None:
+                    policy = budget.upscale_policy(policy)
+                    # 원격 업스케일 비용을 잡지 못하면 로컬 업스케일로 낮춤
+                    if policy != "fast" and not budget.allow("upscale", furniture):
+                        policy = "fast"
+                start = time.time()
+                value = self._limited(
+                    "bria",
+                    upscale,
+                    self.replicate_client,
+                    image,
+                    uploader=self.uploader,
+                    policy=policy,
+                )
+                if budget is not None and policy != "fast":
+                    budget.charge("upscale", time.time() - start)
+                return value
+
+            images = timed(
+                "upscale",
+                lambda: [
+                    upscale_one(image, furniture)
+                    for image, furniture in zip(images, furniture_list)
+                ],
+            )
+
+        if "background" in self.stages and images:
+            remover = BackgroundRemover(self.replicate_client)
+
+            def remove_all():
+                removed = []
+                for index, image in enumerate(images):
+                    furniture = (
+                        furniture_list[index] if index < len(furniture_list) else None
+                    )
+                    if budget is not None and not budget.allow("background", furniture):
+                        print(f"   💸 예산 부족 → 배경 제거 건너뜀 ({index + 1})")
+                        continue
+                    start = time.time()
+                    try:
+                        ok, data = self._limited(
+                            "bria", remover.remove_background_per_file, image
+                        )
+                    except Exception as e:
+                        print(f"   ⚠️  배경 제거 실패 ({index + 1}): {e}")
+                        continue
+                    finally:
+                        if budget is not None:
+                            budget.charge("background", time.time() - start)
+                    if ok:
+                        removed.append((index, data))
+                return removed
+
+            removed = timed("background", remove_all)
+            images = [data for _, data in removed]
+            furniture_list = [
+                furniture_list[i] for i, _ in removed if i < len(furniture_list)
+            ]
+            record["background_removed"] = self._save_images(
+                os.path.join(item_dir, "nobg"), "nobg", images
+            )
+
+        if "3d" in self.stages and images and budget is not None:
+            # 방에 배정된 개수만큼 중요한 가구부터 (나머지는 2D 결과만 남김)
+            selected = budget.select_models(room, furniture_list)
+            record["skipped_models"] = len(images) - len(selected)
+            images = [images[i] for i in selected]
+            furniture_list = [furniture_list[i] for i in selected]
+
+        if "3d" in self.stages and images:
+            modeler = ImgToModeling(
+                self.replicate_client,
+                job_queue=self.job_queue,
+                interactive=False,
+                backend=self.backend,
+            )
+            record["models"] = timed(
+                "3d",
+                modeler.process,
+                images,
+                output_dir=os.path.join(item_dir, "models"),
+                furniture_list=furniture_list,
+            ) or []
+
+        if "enhance" in self.stages:
+            prompt = item.get("prompt") or self.prompt
+            if not prompt:
+                raise ValueError("enhance 단계에는 프롬프트가 필요합니다 (--prompt).")
+            model, build_input = ENHANCE_MODELS[self.enhance_model]
+
+            def enhance():
+                image_url = self.uploader.url_for(image_path, model=model)
+                return run_model(
+                    self.replicate_client, model, build_input(image_url, prompt)
+                ).data
+
+            data = timed("enhance", self._limited, "enhance", enhance)
+            record["enhanced"] = self._save_images(
+                os.path.join(item_dir, "enhanced"), self.enhance_model, [data]
+            )
+
+        os.makedirs(item_dir, exist_ok=True)
+        with open(result_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False, indent=2)
+        return record
+
+    def run(self, items, report_interval=30.0):
+        """전체 목록을 workers개씩 동시에 처리 → 결과 dict 목록 (입력 순서)"""
+        print("=" * 70)
+        print(f"🚚 일괄 처리 시작: {len(items)}장")
+        print(f"🧩 단계: {' → '.join(self.stages)}")
+        print(f"⚙️  이미지 동시 처리 {self.workers}개, 원격 호출 제한 {self.limits}")
+        print(f"📁 출력: {self.output_dir}")
+        print("=" * 70)
+
+        self.progress = BatchProgress(len(items), interval=report_interval)
+        self.progress.start()
+        results = [None] * len(items)
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {
+                    executor.submit(self.process_item, item): i
+                    for i, item in enumerate(items)
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                        self.progress.image_done(
+                            skipped=results[i].get("skipped", False)
+                        )
+                    except Exception as e:
+                        print(f"❌ {items[i]['image']} 처리 실패: {e}")
+                        results[i] = {
+                            "image": items[i]["image"],
+                            "status": "failed",
+                            "error": str(e),
+                        }
+                        self.progress.image_done(ok=False)
+        finally:
+            self.progress.stop()
+            # 중단(Ctrl+C 등)된 경우 남은 원격 작업 취소
+            self.job_queue.cancel_all()
+            if self.budget is not None:
+                self.budget.summary()
+
+        print("=" * 70)
+        print(
+            f"🎉 일괄 처리 완료: 성공 {len(items) - self.progress.failed}장, "
+            f"실패 {self.progress.failed}장 "
+            f"({_format_seconds(time.time() - self.progress.started_at)})"
+        )
+        print("=" * 70)
+        return results
+
+
+def _parse_limits(values):
+    limits = {}
+    for value in values or []:
+        key, _, count = value.partition("=")
+        if key not in DEFAULT_LIMITS or not count.isdigit():
+            raise argparse.ArgumentTypeError(f"잘못된 제한: {value} (예: bria=4)")
+        limits[key] = int(count)
+    return limits
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="캡처 이미지 일괄 처리 (라이노 없이 실행)")
+    parser.add_argument("source", help="이미지 폴더 또는 목록 파일 (.json/.jsonl/.txt)")
+    parser.add_argument("-o", "--output-dir", default="batch_output")
+    parser.add_argument(
+        "--stages",
+        default="detect,crop,background",
+        help=f"실행할 단계 (쉼표 구분): {','.join(STAGES)}",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="동시에 처리할 이미지 수")
+    parser.add_argument(
+        "--limit",
+        action="append",
+        metavar="KIND=N",
+        help="원격 호출 종류별 동시 실행 수 (gpt, bria, 3d, enhance)",
+    )
+    parser.add_argument("--upscale-policy", default="balanced")
+    parser.add_argument(
+        "--enhance-model", default="kontext_dev", choices=ENHANCE_MODELS
+    )
+    parser.add_argument("--prompt", help="enhance 단계 기본 프롬프트")
+    parser.add_argument("--backend", default="hunyuan3d", help="3D 백엔드")
+    parser.add_argument("--room", help="기본 방 이름/종류 (목록 항목의 room이 우선)")
+    parser.add_argument(
+        "--tile-size",
+        type=int,
+        default=0,
+        help="0보다 크면 큰 이미지는 이 크기의 타일로 나눠 인식",
+    )
+    parser.add_argument(
+        "--budget-usd", type=float, help="전체 실행 최대 비용 (USD) — 넘지 않도록 3D 개수 조절"
+    )
+    parser.add_argument("--deadline-min", type=float, help="전체 실행 마감 (분)")
+    parser.add_argument(
+        "--connection",
+        help="connection.json — 캡처의 방을 connection.json 방 이름에 맞춤 "
+        "(--plan-only면 캡처가 없는 방도 계획)",
+    )
+    parser.add_argument(
+        "--plan-only", action="store_true", help="예산 계획만 출력하고 실행하지 않음"
+    )
+    parser.add_argument("--report-interval", type=float, default=30.0)
+    parser.add_argument("--force", action="store_true", help="이미 처리한 이미지도 다시 처리")
+    args = parser.parse_args(argv)
+
+    items = load_items(args.source)
+    if not items:
+        print(f"❌ 처리할 이미지가 없습니다: {args.source}")
+        return 1
+
+    workers, limits = args.workers, _parse_limits(args.limit)
+    budget = None
+    if args.budget_usd is not None or args.deadline_min is not None or args.plan_only:
+        planner = BudgetPlanner(max_concurrency=args.workers)
+        plan = planner.plan(
+            [item.get("room") or args.room for item in items],
+            budget_usd=args.budget_usd,
+            deadline=args.deadline_min * 60 if args.deadline_min is not None else None,
+            upscale="upscale" in args.stages,
+            connection=args.connection,
+            include_uncaptured=args.plan_only,
+        )
+        plan.summary()
+        if args.plan_only:
+            return 0
+        budget = BudgetTracker(plan, planner)
+        # 마감에 맞춘 동시 실행 수 사용
+        workers = plan.concurrency
+        limits["3d"] = plan.concurrency
+
+    runner = BatchRunner(
+        os.environ.get("OPENAI_API_KEY"),
+        os.environ.get("REPLICATE_API_TOKEN"),
+        stages=args.stages,
+        output_dir=args.output_dir,
+        workers=workers,
+        limits=limits,
+        upscale_policy=args.upscale_policy,
+        enhance_model=args.enhance_model,
+        prompt=args.prompt,
+        backend=args.backend,
+        force=args.force,
+        tiling=TilePlan(tile_size=args.tile_size) if args.tile_size > 0 else None,
+        room=args.room,
+        budget=budget,
+    )
+    results = runner.run(items, report_interval=args.report_interval)
+    return 1 if any(r["status"] == "failed" for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
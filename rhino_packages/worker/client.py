@@ -0,0 +1,244 @@
+import time
+import socket
+import itertools
+import threading
+import subprocess
+
+from .protocol import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    WorkerError,
+    pack_buffer,
+    recv_message,
+    release_blocks,
+    send_message,
+    unpack_buffer,
+)
+
+
+# =============================================================================
+# 라이노 쪽 워커 클라이언트 (표준 라이브러리만 사용)
+# =============================================================================
+
+
+class PendingCall:
+    def __init__(self, fn, *args, **kwargs):
+        """백그라운드 스레드에서 fn 실행 — UI 스레드는 done()으로 확인만"""
+        self.value = None
+        self.error = None
+        self.started_at = time.time()
+        self._done = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(fn, args, kwargs), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, fn, args, kwargs):
+        try:
+            self.value = fn(*args, **kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise TimeoutError("워커 응답 대기 시간 초과")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started_at
+
+
+class WorkerClient:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=900):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._sock = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.create_connection((self.host, self.port), timeout=5)
+            self._sock.settimeout(self.timeout)
+        return self._sock
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+    def _request(self, message):
+        """연결 하나로 요청/응답 (끊겨 있으면 한 번 다시 연결)"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    sock = self._connect()
+                    send_message(sock, message)
+                    return recv_message(sock)
+                except (ConnectionError, OSError):
+                    if self._sock is not None:
+                        self._sock.close()
+                        self._sock = None
+                    if attempt:
+                        raise
+
+    def call(self, method, params=None, buffers=()):
+        """
+        원격 메서드 호출 → (결과 dict, 출력 bytes 목록)
+
+        입력 버퍼는 공유 메모리(작으면 메시지)로 넘기고, 응답을 받은 뒤 정리
+        """
+        packed = [pack_buffer(data) for data in buffers]
+        try:
+            response = self._request(
+                {
+                    "id": next(self._ids),
+                    "method": method,
+                    "params": params or {},
+                    "buffers": [descriptor for descriptor, _ in packed],
+                }
+            )
+        finally:
+            release_blocks([block for _, block in packed])
+
+        if not response.get("ok"):
+            raise WorkerError(response.get("error", "워커 오류"))
+
+        descriptors = response.get("buffers", [])
+        outputs = [unpack_buffer(d) for d in descriptors]
+        shared = [d["shm"] for d in descriptors if "shm" in d]
+        if shared:
+            self._request(
+                {
+                    "id": next(self._ids),
+                    "method": "release",
+                    "params": {"names": shared},
+                }
+            )
+        return response.get("result"), outputs
+
+    def call_async(self, method, params=None, buffers=()):
+        """UI 스레드를 막지 않는 호출 → PendingCall (Grasshopper 재계산 때 done()으로 확인)"""
+        # 호출마다 별도 연결 (긴 작업이 ping 등 다른 요청을 막지 않도록)
+        client = WorkerClient(self.host, self.port, self.timeout)
+        return PendingCall(client.call, method, params, buffers)
+
+    # -------------------------------------------------------------------------
+    # 편의 메서드
+    # -------------------------------------------------------------------------
+
+    def ping(self):
+        result, _ = self.call("ping")
+        return result
+
+    def is_alive(self):
+        try:
+            self.ping()
+            return True
+        except (OSError, WorkerError):
+            return False
+
+    def process_1(
+        self, image, stream=False, upscale_policy=None, camera=None, room=None
+    ):
+        """
+        캡처 이미지(bytes) → 배경 제거된 가구 이미지 bytes 목록
+
+        camera: 카메라 키 — 같은 카메라로 다시 캡처하면 바뀐 가구만 다시 처리
+        room: 방 이름 ("거실", "안방화장실" ...) — 방에 맞는 가구 목록으로 인식
+        """
+        _, images = self.call(
+            "process_1",
+            {
+                "stream": stream,
+                "upscale_policy": upscale_policy,
+                "camera": camera,
+                "room": room,
+            },
+            [image],
+        )
+        return images
+
+    def process_2(self, selected_images, upscale_policy=None):
+        """선택된 이미지 → 생성된 GLB 파일 경로 목록"""
+        result, _ = self.call(
+            "process_2", {"upscale_policy": upscale_policy}, selected_images
+        )
+        return result["files"]
+
+    def upscale(self, image, policy=None):
+        _, images = self.call("upscale", {"policy": policy}, [image])
+        return images[0]
+
+    def enhance(self, image, prompt, model="kontext_dev", options=None):
+        _, images = self.call(
+            "enhance",
+            {"model": model, "prompt": prompt, "options": options or {}},
+            [image],
+        )
+        return images[0]
+
+    def stats(self):
+        result, _ = self.call("stats")
+        return result
+
+    def shutdown(self):
+        self._request({"id": next(self._ids), "method": "shutdown"})
+        self.close()
+
+
+_worker_client = None
+
+
+def get_worker_client(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """프로세스(라이노) 전체에서 공유하는 클라이언트 — 컴포넌트가 다시 계산돼도 연결 유지"""
+    global _worker_client
+    if _worker_client is None or (_worker_client.host, _worker_client.port) != (
+        host,
+        port,
+    ):
+        _worker_client = WorkerClient(host, port)
+    return _worker_client
+
+
+def ensure_worker(
+    python_exe="python", host=DEFAULT_HOST, port=DEFAULT_PORT, wait=30.0, cwd=None
+):
+    """
+    워커가 떠 있지 않으면 별도 프로세스로 실행하고 응답할 때까지 대기 → WorkerClient
+
+    python_exe: 의존성(openai, replicate 등)이 설치된 파이썬 실행 파일
+    """
+    client = get_worker_client(host, port)
+    if client.is_alive():
+        return client
+
+    print(f"🚀 워커 실행: {python_exe} -m rhino_packages.worker.server --port {port}")
+    subprocess.Popen(
+        [
+            python_exe,
+            "-m",
+            "rhino_packages.worker.server",
+            "--host",
+            host,
+            "--port",
+            str(port),
+        ],
+        cwd=cwd,
+    )
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        if client.is_alive():
+            return client
+        time.sleep(0.5)
+    raise WorkerError(f"워커가 {wait}초 안에 시작되지 않았습니다.")
@@ -0,0 +1,85 @@
+import json
+import base64
+import struct
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # 공유 메모리를 쓸 수 없는 환경에서는 버퍼를 메시지에 포함
+    shared_memory = None
+
+
+# =============================================================================
+# 로컬 워커 통신 규약 (길이 + JSON 메시지, 큰 버퍼는 공유 메모리)
+# =============================================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# 이보다 작은 버퍼는 공유 메모리를 만들지 않고 메시지에 포함
+INLINE_LIMIT = 64 * 1024
+
+_LENGTH = struct.Struct(">I")
+
+
+class WorkerError(Exception):
+    pass
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("워커 연결이 끊어졌습니다.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_message(sock, message):
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def recv_message(sock):
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return json.loads(_recv_exact(sock, length).decode("utf-8"))
+
+
+def pack_buffer(data):
+    """
+    bytes → (설명 dict, 공유 메모리 블록 또는 None)
+
+    공유 메모리 블록은 만든 쪽이 상대가 다 읽은 뒤에 close/unlink 해야 함
+    """
+    data = memoryview(data)
+    if shared_memory is None or data.nbytes < INLINE_LIMIT:
+        return {"inline": base64.b64encode(data).decode("ascii")}, None
+
+    block = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    block.buf[: data.nbytes] = data
+    return {"shm": block.name, "size": data.nbytes}, block
+
+
+def unpack_buffer(descriptor):
+    """설명 dict → bytes (공유 메모리는 복사한 뒤 바로 닫음)"""
+    if "inline" in descriptor:
+        return base64.b64decode(descriptor["inline"])
+
+    block = shared_memory.SharedMemory(name=descriptor["shm"])
+    try:
+        return bytes(block.buf[: descriptor["size"]])
+    finally:
+        block.close()
+
+
+def release_blocks(blocks):
+    for block in blocks:
+        if block is None:
+            continue
+        block.close()
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import socketserver
+
+from ..image_processor import (
+    ENCODING_REPORT,
+    ENHANCE_MODELS,
+    ImageProcessor,
+    UploadManager,
+    get_job_queue,
+    run_model,
+    upscale,
+)
+from .protocol import (
+    DEFAULT_HOST,
+    DEFAULT_PORT,
+    pack_buffer,
+    recv_message,
+    release_blocks,
+    send_message,
+    unpack_buffer,
+)
+
+
+# =============================================================================
+# 로컬 워커 프로세스 (클라이언트/캐시/연결을 유지한 채 라이노 요청 처리)
+# =============================================================================
+
+
+class WorkerState:
+    def __init__(self, OPENAI_API_KEY, REPLICATE_API_TOKEN, speculative_budget=0):
+        start = time.time()
+        self.processor = ImageProcessor(
+            OPENAI_API_KEY, REPLICATE_API_TOKEN, speculative_budget=speculative_budget
+        )
+        self.uploader = UploadManager(self.processor.replicate_client)
+        self.started_at = time.time()
+        self.requests = 0
+        self._outputs = {}  # 공유 메모리 이름 → 블록 (클라이언트가 release할 때까지 유지)
+        self._lock = threading.Lock()
+        print(f"🔥 워커 준비 완료 ({time.time() - start:.2f}초)")
+
+    # -------------------------------------------------------------------------
+    # 메서드 (params, 입력 버퍼 목록) → (결과, 출력 버퍼 목록)
+    # -------------------------------------------------------------------------
+
+    def ping(self, params, buffers):
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "requests": self.requests,
+        }, []
+
+    def process_1(self, params, buffers):
+        images = self.processor.process_1(
+            buffers[0],
+            stream=params.get("stream", False),
+            upscale_policy=params.get("upscale_policy"),
+            camera=params.get("camera"),
+            room=params.get("room"),
+        )
+        return {"count": len(images or [])}, list(images or [])
+
+    def process_2(self, params, buffers):
+        files = self.processor.process_2(
+            buffers, upscale_policy=params.get("upscale_policy")
+        )
+        return {"files": files or []}, []
+
+    def upscale(self, params, buffers):
+        data = upscale(
+            self.processor.replicate_client,
+            buffers[0],
+            uploader=self.uploader,
+            policy=params.get("policy"),
+        )
+        return {}, [data]
+
+    def enhance(self, params, buffers):
+        model, build_input = ENHANCE_MODELS[params["model"]]
+        image = self.uploader.url_for(buffers[0], model=model)
+        result = run_model(
+            self.processor.replicate_client,
+            model,
+            build_input(image, params["prompt"], **params.get("options", {})),
+        )
+        return {"timing": result.timing()}, [result.data]
+
+    def stats(self, params, buffers):
+        return {
+            "uploads": self.uploader.stats(),
+            "encoding_bytes_saved": ENCODING_REPORT.bytes_saved,
+            "job_queue": get_job_queue().stats(),
+            "shared_outputs": len(self._outputs),
+        }, []
+
+    def release(self, params, buffers):
+        with self._lock:
+            blocks = [
+                self._outputs.pop(name, None) for name in params.get("names", [])
+            ]
+        release_blocks(blocks)
+        return {"released": sum(1 for b in blocks if b is not None)}, []
+
+    METHODS = (
+        "ping",
+        "process_1",
+        "process_2",
+        "upscale",
+        "enhance",
+        "stats",
+        "release",
+    )
+
+    def handle(self, request):
+        method = request.get("method")
+        if method not in self.METHODS:
+            return {
+                "id": request.get("id"),
+                "ok": False,
+                "error": f"알 수 없는 메서드: {method}",
+            }
+
+        start = time.time()
+        try:
+            buffers = [unpack_buffer(d) for d in request.get("buffers", [])]
+            params = request.get("params") or {}
+            result, outputs = getattr(self, method)(params, buffers)
+        except Exception as e:
+            print(f"❌ {method} 실패: {e}")
+            return {"id": request.get("id"), "ok": False, "error": str(e)}
+
+        descriptors = []
+        with self._lock:
+            self.requests += 1
+            for data in outputs:
+                descriptor, block = pack_buffer(data)
+                if block is not None:
+                    self._outputs[block.name] = block
+                descriptors.append(descriptor)
+
+        if method not in ("ping", "release"):
+            elapsed = time.time() - start
+            print(f"✅ {method} 완료 ({elapsed:.2f}초, 출력 {len(outputs)}개)")
+        return {
+            "id": request.get("id"),
+            "ok": True,
+            "result": result,
+            "buffers": descriptors,
+        }
+
+    def close(self):
+        with self._lock:
+            blocks, self._outputs = list(self._outputs.values()), {}
+        release_blocks(blocks)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        state = self.server.state
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            if request.get("method") == "shutdown":
+                send_message(
+                    self.request, {"id": request.get("id"), "ok": True, "result": {}}
+                )
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+            send_message(self.request, state.handle(request))
+
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, state, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        super().__init__((host, port), _Handler)
+        self.state = state
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, speculative_budget=0):
+    """API 키는 환경변수 OPENAI_API_KEY / REPLICATE_API_TOKEN에서 읽음"""
+    state = WorkerState(
+        os.environ.get("OPENAI_API_KEY"),
+        os.environ.get("REPLICATE_API_TOKEN"),
+        speculative_budget=speculative_budget,
+    )
+    server = WorkerServer(state, host, port)
+    print(f"🛰️  워커 대기 중: {host}:{port} (pid {os.getpid()})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        state.close()
+        print("👋 워커 종료")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="라이노 이미지 처리 로컬 워커")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speculative-budget", type=int, default=0)
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.speculative_budget)
+
+
+if __name__ == "__main__":
+    sys.exit(main())